@@ -1,14 +1,50 @@
 import streamlit as st
 import streamlit.components.v1 as components
-import json
-import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
-
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import OneHotEncoder
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import classification_report
+import functools
+import hashlib
+import inspect
+import itertools
+import os
+import io
+import threading
+import time
+import tracemalloc
+
+# scikit-learn, matplotlib e altair são importados só onde são usados: o
+# primeiro carregamento da página não paga por eles
+from eyetracking.analysis import (
+    COLOR,
+    POSITION,
+    attention_by,
+    attention_tables,
+    estimate_dt_ms,
+    load_session,
+    sampling_stats,
+    valid_samples,
+)
+from eyetracking.batch import analyze_batch, find_sessions
+from eyetracking.columnar import write_columnar
+from eyetracking.fixations import (
+    IDT_DISPERSION_PX,
+    IVT_VELOCITY_PX_S,
+    MAX_GAP_MS,
+    MIN_DURATION_MS,
+    detect_fixations,
+    fixation_attention,
+)
+from eyetracking.heatmap import SIGMA_BINS, GazeHistogram, gaussian_smooth, has_spread, plot_heatmap
+from eyetracking.incremental import IncrementalSession
+from eyetracking.live import LiveSession
+from eyetracking.trajectory import DEFAULT_POINTS, Trajectory
+from eyetracking.model import PREDICTION, TARGET, label_high_attention, predict_attention
+from eyetracking.model_store import ModelStore
+from eyetracking.pipeline import MIN_TRAIN_ROWS
+from eyetracking.profiling import Profiler, activate, staged
+from eyetracking.resampling import CONFIDENCE, N_RESAMPLES, compare_attention
+from eyetracking.resources import MAX_UPLOAD_MB, MB, MemoryBudgetError, SessionBudget, SharedCache, estimate_nbytes
+from eyetracking.session_store import SessionStore
+from eyetracking.smoothing import smooth_session
+from eyetracking.trials import TrialIndex, trial_metrics, trial_summary
 
 st.set_page_config(page_title="Eye Tracking com WebGazer", layout="wide")
 
@@ -24,387 +60,640 @@ No final, você pode **baixar um arquivo JSON** com todos os dados coletados
 para análise em Python/IA.
 """)
 
-html_code = """
-<!DOCTYPE html>
-<html>
-<head>
-  <meta charset="UTF-8">
-  <script src="https://webgazer.cs.brown.edu/webgazer.js"></script>
-  <style>
-    html, body {
-      margin: 0;
-      padding: 0;
-      overflow: hidden;
-      width: 100%;
-      height: 100%;
-      background-color: #111;
-      color: #fff;
-      font-family: Arial, sans-serif;
-    }
-
-    #ponto {
-      width: 16px;
-      height: 16px;
-      background-color: #ff0000;
-      border-radius: 50%;
-      position: absolute;
-      pointer-events: none;
-      transform: translate(-50%, -50%);
-      z-index: 9999;
-    }
-
-    .stimulusCircle {
-      width: 80px;
-      height: 80px;
-      border-radius: 50%;
-      position: absolute;
-      transform: translate(-50%, -50%);
-      z-index: 5000;
-    }
-
-    #topBar {
-      position: fixed;
-      top: 0;
-      left: 0;
-      right: 0;
-      height: 40px;
-      background: rgba(0,0,0,0.7);
-      display: flex;
-      align-items: center;
-      justify-content: space-between;
-      padding: 0 10px;
-      z-index: 10000;
-      font-size: 14px;
-      gap: 8px;
-    }
-
-    #buttonsBox {
-      display: flex;
-      gap: 6px;
-    }
-
-    .topBtn {
-      padding: 5px 10px;
-      background: #28a745;
-      border: none;
-      border-radius: 4px;
-      color: #fff;
-      cursor: pointer;
-      font-size: 13px;
-    }
-
-    .topBtn:hover {
-      background: #218838;
-    }
-
-    #info {
-      font-size: 12px;
-      opacity: 0.8;
-      flex: 1;
-    }
-
-    #resultsPanel {
-      position: fixed;
-      bottom: 0;
-      left: 0;
-      right: 0;
-      max-height: 35%;
-      background: rgba(0,0,0,0.85);
-      padding: 10px;
-      font-size: 13px;
-      overflow-y: auto;
-      z-index: 9000;
-      border-top: 1px solid #333;
-    }
-
-    #resultsPanel h3, #resultsPanel h4 {
-      margin: 4px 0;
-    }
-
-    #resultsPanel ul {
-      margin: 2px 0 6px 16px;
-      padding: 0;
-    }
-  </style>
-</head>
-<body>
-
-  <div id="topBar">
-    <div id="info">
-      Olhe para os três círculos coloridos. Eles ficam 5 segundos visíveis em posições fixas (triângulo) e depois somem por 2 segundos antes do próximo teste.
-      Clique em pontos da tela (olhando para eles) para ajudar na calibração.
-    </div>
-    <div id="buttonsBox">
-      <button class="topBtn" id="analyzeBtn">Ver análise atual</button>
-      <button class="topBtn" id="downloadBtn">Baixar JSON</button>
-    </div>
-  </div>
-
-  <div id="ponto"></div>
-
-  <!-- Três círculos de estímulo -->
-  <div class="stimulusCircle" id="circle0"></div>
-  <div class="stimulusCircle" id="circle1"></div>
-  <div class="stimulusCircle" id="circle2"></div>
-
-  <!-- Painel para exibir análise parcial -->
-  <div id="resultsPanel"></div>
-
-  <script>
-    // ==========================
-    // CONFIGURAÇÃO DO EXPERIMENTO
-    // ==========================
-
-    const COLORS = ["red", "green", "blue", "yellow", "cyan", "magenta", "orange", "purple"];
-
-    const NUM_CIRCLES = 3;
-
-    // 5 segundos visíveis, 2 segundos apagados
-    const STIMULUS_VISIBLE_MS = 5000;
-    const STIMULUS_BLANK_MS   = 2000;
-
-    const STIMULUS_DIAMETER = 80;
-
-    // offsets fixos em forma de triângulo em torno do centro (dx, dy)
-    const TRIANGLE_OFFSETS = [
-      { dx: 0,    dy: -150, label: "topo" },
-      { dx: -130, dy:  75,  label: "baixo-esquerda" },
-      { dx: 130,  dy:  75,  label: "baixo-direita" }
-    ];
-
-    // ==========================
-    // VARIÁVEIS DE ESTADO
-    // ==========================
-
-    let currentStimuli = [];   // [{id, color, x, y, position}, ...]
-    let stimulusIdCounter = 0;
-    let gazeData = [];
-    let stimuliVisible = false;
-
-    const ponto = document.getElementById('ponto');
-    const circles = [
-      document.getElementById('circle0'),
-      document.getElementById('circle1'),
-      document.getElementById('circle2'),
-    ];
-    const downloadBtn = document.getElementById('downloadBtn');
-    const analyzeBtn = document.getElementById('analyzeBtn');
-    const resultsPanel = document.getElementById('resultsPanel');
-
-    // ==========================
-    // FUNÇÕES AUXILIARES
-    // ==========================
-
-    function pickDistinctColors(n) {
-      const shuffled = COLORS.slice().sort(() => Math.random() - 0.5);
-      return shuffled.slice(0, n);
-    }
-
-    // posiciona os 3 círculos em triângulo fixo, apenas trocando as cores
-    function showStimuli() {
-      const w = window.innerWidth;
-      const h = window.innerHeight;
-
-      const centerX = w / 2;
-      const centerY = h / 2;
-
-      const colors = pickDistinctColors(NUM_CIRCLES);
-
-      currentStimuli = [];
-
-      for (let i = 0; i < NUM_CIRCLES; i++) {
-        const circle = circles[i];
-        const offset = TRIANGLE_OFFSETS[i];
-
-        const x = centerX + offset.dx;
-        const y = centerY + offset.dy;
-        const color = colors[i];
-
-        circle.style.left = x + "px";
-        circle.style.top  = y + "px";
-        circle.style.backgroundColor = color;
-        circle.style.display = "block";
-
-        currentStimuli.push({
-          id: stimulusIdCounter++,
-          color: color,
-          x: x,
-          y: y,
-          position: offset.label,
-          startTime: Date.now()
-        });
-      }
-
-      stimuliVisible = true;
-    }
-
-    function hideStimuli() {
-      for (const circle of circles) {
-        circle.style.display = "none";
-      }
-      stimuliVisible = false;
-    }
-
-    function findNearestStimulus(gazeX, gazeY) {
-      if (!stimuliVisible || !currentStimuli || currentStimuli.length === 0) return null;
-
-      let nearest = null;
-      let minDistSq = Infinity;
-
-      for (const s of currentStimuli) {
-        const dx = gazeX - s.x;
-        const dy = gazeY - s.y;
-        const distSq = dx * dx + dy * dy;
-        if (distSq < minDistSq) {
-          minDistSq = distSq;
-          nearest = s;
-        }
-      }
-
-      return nearest;
-    }
-
-    // ciclo: 5s ON (triângulo visível) -> 2s OFF (sem círculos) -> repete
-    function startStimulusCycle() {
-      showStimuli();  // aparece triângulo com novas cores
-
-      setTimeout(() => {
-        hideStimuli();  // some
-        setTimeout(() => {
-          startStimulusCycle(); // próximo teste
-        }, STIMULUS_BLANK_MS);
-      }, STIMULUS_VISIBLE_MS);
-    }
-
-    // ==========================
-    // INICIALIZAÇÃO DO WEBGAZER
-    // ==========================
-
-    function startExperiment() {
-      window.saveDataAcrossSessions = true;
-
-      webgazer
-        .setRegression('ridge')
-        .setTracker('clmtrackr')
-        .setGazeListener(function(data, timestamp) {
-          if (!data) return;
-
-          const gazeX = data.x;
-          const gazeY = data.y;
-
-          // Atualiza o ponto vermelho
-          ponto.style.left = gazeX + "px";
-          ponto.style.top  = gazeY + "px";
-
-          // Só associa a um círculo se eles estiverem visíveis
-          const nearest = findNearestStimulus(gazeX, gazeY);
-
-          gazeData.push({
-            x: gazeX,
-            y: gazeY,
-            timestamp: timestamp || Date.now(),
-            nearestStimulusId: nearest ? nearest.id : null,
-            nearestStimulusColor: nearest ? nearest.color : null,
-            nearestPosition: nearest ? nearest.position : null
-          });
-        })
-        .begin()
-        .then(() => {
-          console.log("WebGazer iniciado");
-          webgazer.addMouseEventListeners();   // ajuda na calibração
-          webgazer.showPredictionPoints(false);
-
-          // inicia o ciclo dos estímulos
-          startStimulusCycle();
-        })
-        .catch(err => {
-          console.error("Erro ao iniciar WebGazer:", err);
-        });
-    }
-
-    // iniciar assim que possível
-    startExperiment();
-
-    // ==========================
-    // ANÁLISE PARCIAL NO BOTÃO
-    // ==========================
-
-    analyzeBtn.addEventListener('click', function() {
-      if (!gazeData || gazeData.length === 0) {
-        resultsPanel.innerHTML = "<p>Nenhuma amostra registrada ainda. Aguarde alguns segundos de experimento.</p>";
-        return;
-      }
-
-      // Considerar apenas amostras com alvo definido
-      const valid = gazeData.filter(s => s.nearestStimulusColor !== null && s.nearestPosition !== null);
-
-      if (valid.length === 0) {
-        resultsPanel.innerHTML = "<p>Ainda não há amostras com estímulos visíveis associados.</p>";
-        return;
-      }
-
-      const total = valid.length;
-
-      const byColor = {};
-      const byPos = {};
-
-      for (const s of valid) {
-        const c = s.nearestStimulusColor;
-        const p = s.nearestPosition;
-
-        if (!byColor[c]) byColor[c] = 0;
-        byColor[c]++;
-
-        if (!byPos[p]) byPos[p] = 0;
-        byPos[p]++;
-      }
-
-      let html = "<h3>Resumo parcial do experimento</h3>";
-      html += `<p>Total de amostras com alvo associado: <strong>${total}</strong></p>`;
-
-      html += "<h4>Atenção por cor</h4><ul>";
-      for (const c in byColor) {
-        const n = byColor[c];
-        const perc = (n / total * 100).toFixed(1);
-        html += `<li><strong>${c}</strong>: ${n} amostras (${perc}%)</li>`;
-      }
-      html += "</ul>";
-
-      html += "<h4>Atenção por posição do triângulo</h4><ul>";
-      for (const p in byPos) {
-        const n = byPos[p];
-        const perc = (n / total * 100).toFixed(1);
-        html += `<li><strong>${p}</strong>: ${n} amostras (${perc}%)</li>`;
-      }
-      html += "</ul>";
-
-      resultsPanel.innerHTML = html;
-    });
-
-    // ==========================
-    // DOWNLOAD DOS DADOS EM JSON
-    // ==========================
-
-    downloadBtn.addEventListener('click', function() {
-      const blob = new Blob([JSON.stringify(gazeData, null, 2)], {type: "application/json"});
-      const url = URL.createObjectURL(blob);
-      const a = document.createElement("a");
-      a.href = url;
-      a.download = "gaze_data_experimento.json";
-      document.body.appendChild(a);
-      a.click();
-      document.body.removeChild(a);
-      URL.revokeObjectURL(url);
-    });
-  </script>
-</body>
-</html>
-"""
+# -------------------------------------------------------------------
+# DIAGNÓSTICO DE DESEMPENHO
+# -------------------------------------------------------------------
+# Com o diagnóstico ligado, cada etapa da análise (leitura, limpeza, groupby,
+# fixações, mapa de calor, modelo...) registra seu tempo e, opcionalmente, o
+# pico de memória. As abas podem interromper o script com st.stop(), então o
+# painel fica no topo da barra lateral e é redesenhado ao fim de cada etapa.
+REDESENHOS_DIAGNOSTICO = itertools.count()
+
+
+def painel_diagnostico(area, profiler, amostragem):
+    """Desenha em ``area`` as etapas medidas até agora e o botão de exportação."""
+    ao_vivo = st.session_state.get("sessao_ao_vivo")
+    navegador = ao_vivo.sampling if ao_vivo is not None else None
+    with area.container():
+        with st.expander("Diagnóstico de desempenho", expanded=True):
+            st.caption("Etapas executadas nesta execução do script; resultados vindos do cache não aparecem.")
+            tabela = profiler.table()
+            if tabela.empty:
+                st.write("Nenhuma etapa medida ainda.")
+            else:
+                st.dataframe(tabela, hide_index=True)
+            if "sessao" in amostragem:
+                a = amostragem["sessao"]
+                st.write(
+                    f"Sessão analisada: **{a['taxa_hz']:.1f} Hz**, jitter {a['jitter_ms']:.1f} ms "
+                    f"(maior intervalo: {a['maior_intervalo_ms']:.0f} ms)"
+                )
+            if navegador:
+                st.write(
+                    f"WebGazer ao vivo: **{navegador['taxa_hz']:.1f} Hz**, jitter {navegador['jitter_ms']:.1f} ms"
+                )
+            # Um key por redesenho: o botão pode aparecer várias vezes no mesmo rerun
+            st.download_button(
+                "Baixar diagnóstico (JSON)",
+                data=profiler.to_json(
+                    amostragem_sessao=amostragem.get("sessao"), amostragem_navegador=navegador
+                ),
+                file_name="diagnostico_desempenho.json",
+                mime="application/json",
+                key=f"diagnostico_json_{next(REDESENHOS_DIAGNOSTICO)}",
+            )
+
+
+@st.cache_resource
+def sessoes_medindo_memoria():
+    """Sessões com o pico de memória ligado, compartilhadas entre todas as sessões do processo."""
+    return {"trava": threading.Lock(), "sessoes": set()}
+
+
+def medir_memoria_na_sessao(ligar):
+    """Liga ou desliga a medição de memória desta sessão.
+
+    O tracemalloc vale para o processo inteiro: ele só para quando nenhuma
+    sessão aberta precisa dele, para não zerar o pico de outro participante
+    no meio de uma execução.
+    """
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    sessao = ctx.session_id if ctx is not None else None
+    estado = sessoes_medindo_memoria()
+    with estado["trava"]:
+        sessoes = estado["sessoes"]
+        if ligar:
+            sessoes.add(sessao)
+        else:
+            sessoes.discard(sessao)
+        # Sessões fechadas com a opção ligada não seguram o tracemalloc
+        if Runtime.exists():
+            runtime = Runtime.instance()
+            sessoes.intersection_update({s for s in sessoes if s == sessao or runtime.is_active_session(s)})
+        if sessoes and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not sessoes and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+diagnostico_ativo = st.sidebar.toggle("Diagnóstico de desempenho", key="diagnostico_ativo")
+diagnostico_memoria = st.sidebar.checkbox(
+    "Medir pico de memória (tracemalloc, mais lento)",
+    key="diagnostico_memoria",
+    disabled=not diagnostico_ativo,
+    help="O tracemalloc vale para o processo inteiro: deixa todas as sessões abertas mais lentas.",
+)
+area_diagnostico = st.sidebar.empty()
+# Taxa de amostragem da sessão carregada na aba de análise (para o painel)
+amostragem_diagnostico = {}
+
+medir_memoria = diagnostico_ativo and diagnostico_memoria
+medir_memoria_na_sessao(medir_memoria)
+if diagnostico_ativo:
+    perfil = Profiler(
+        memory=medir_memoria,
+        on_update=lambda p: painel_diagnostico(area_diagnostico, p, amostragem_diagnostico),
+    )
+    activate(perfil)
+    painel_diagnostico(area_diagnostico, perfil, amostragem_diagnostico)
+else:
+    activate(None)
+
+# -------------------------------------------------------------------
+# MEMÓRIA COMPARTILHADA E POR SESSÃO
+# -------------------------------------------------------------------
+# Todos os participantes usam o mesmo processo. Sessões lidas, modelos e as
+# estruturas derivadas de cada sessão (grade do mapa de calor, trajetória...)
+# ficam em um único cache LRU limitado em bytes, com chave pelo hash do
+# conteúdo: o mesmo arquivo enviado por dois participantes é lido uma vez.
+# O que pertence só a esta sessão (arquivos enviados, resultados guardados em
+# st.session_state, buffer ao vivo) é cobrado de um orçamento por sessão
+# (eyetracking.resources).
+RESULTADOS_DA_SESSAO = {"busca": "busca de hiperparâmetros", "resultado_lote": "análise em lote"}
+
+
+@st.cache_resource
+def cache_compartilhado():
+    return SharedCache()
+
+
+def em_cache_compartilhado(aviso=None):
+    """Como ``st.cache_resource``, mas no cache compartilhado limitado em bytes.
+
+    A chave é o nome da função e os argumentos cujo nome não começa com
+    ``_`` (a mesma convenção do Streamlit). ``aviso`` aparece só ao criar.
+    """
+    def decorador(func):
+        nomes = list(inspect.signature(func).parameters)
+
+        @functools.wraps(func)
+        def envoltorio(*args):
+            chave = (func.__name__,) + tuple(a for nome, a in zip(nomes, args) if not nome.startswith("_"))
+            cache = cache_compartilhado()
+            if aviso is None or chave in cache:
+                return cache.get_or_create(chave, lambda: func(*args))
+            with st.spinner(aviso):
+                return cache.get_or_create(chave, lambda: func(*args))
+
+        return envoltorio
+
+    return decorador
+
+
+def orcamento_da_sessao():
+    if "orcamento" not in st.session_state:
+        st.session_state["orcamento"] = SessionBudget()
+    return st.session_state["orcamento"]
+
+
+def painel_memoria(area):
+    orcamento = orcamento_da_sessao()
+    cache = cache_compartilhado().stats()
+    with area.container():
+        st.caption(
+            f"Memória desta sessão: {orcamento.nbytes / MB:.1f} de {orcamento.max_bytes / MB:.0f} MB · "
+            f"cache compartilhado: {cache['memoria_mb']:.0f} de {cache['limite_mb']:.0f} MB "
+            f"({cache['entradas']} itens, {cache['taxa_acerto']:.0%} de acertos)"
+        )
+        if orcamento.items:
+            st.dataframe(orcamento.table(), hide_index=True)
+
+
+def cobrar(nome, nbytes):
+    """Cobra ``nbytes`` do orçamento da sessão; ``False`` (com aviso) se não couber."""
+    try:
+        orcamento_da_sessao().charge(nome, nbytes)
+    except MemoryBudgetError as e:
+        st.error(str(e))
+        return False
+    finally:
+        painel_memoria(area_memoria)
+    return True
+
+
+def conferir_upload(chave, arquivos):
+    """``arquivos`` enviados no widget ``chave``, ou ``None`` se não couberem no orçamento."""
+    nome = f"arquivos enviados ({chave})"
+    if not arquivos:
+        orcamento_da_sessao().release(nome)
+        painel_memoria(area_memoria)
+        return arquivos
+    lista = arquivos if isinstance(arquivos, list) else [arquivos]
+    return arquivos if cobrar(nome, sum(f.size for f in lista)) else None
+
+
+# Todos os participantes usam o mesmo servidor: ler diretórios dele só vale
+# dentro da raiz configurada nesta variável (sem ela, só arquivos enviados)
+DIRETORIO_SESSOES = os.environ.get("EYETRACKING_DIRETORIO_SESSOES")
+
+
+def sessoes_do_servidor(rotulo, chave):
+    """Sessões de um subdiretório de ``DIRETORIO_SESSOES`` escolhido no widget ``chave``.
+
+    Devolve ``[]`` sem a variável, sem diretório informado ou se o diretório
+    não existir ou sair da raiz. Arquivos que apontam para fora da raiz
+    (links simbólicos) ficam de fora.
+    """
+    if not DIRETORIO_SESSOES:
+        return []
+    raiz = os.path.realpath(DIRETORIO_SESSOES)
+    relativo = st.text_input(f"{rotulo} (caminho dentro de {raiz})", key=chave)
+    if not relativo:
+        return []
+    diretorio = os.path.realpath(os.path.join(raiz, relativo))
+    if os.path.commonpath([raiz, diretorio]) != raiz or not os.path.isdir(diretorio):
+        st.error(f"Diretório não encontrado em {raiz}: {relativo}")
+        return []
+    return [
+        path for path in find_sessions([diretorio])
+        if os.path.commonpath([raiz, os.path.realpath(path)]) == raiz
+    ]
+
+
+area_memoria = st.sidebar.empty()
+if st.sidebar.button("Liberar resultados desta sessão", key="liberar_memoria"):
+    for chave, nome in RESULTADOS_DA_SESSAO.items():
+        guardado = st.session_state.pop(chave, None)
+        if chave == "busca" and guardado is not None:
+            guardado[1].cancel()
+        orcamento_da_sessao().release(nome)
+painel_memoria(area_memoria)
+
+# -------------------------------------------------------------------
+# EXPERIMENTO (COMPONENTE COM CANAL AO VIVO)
+# -------------------------------------------------------------------
+# A página do experimento fica em frontend/index.html e é servida como
+# componente: além de rodar o WebGazer, ela envia as amostras ao Python em
+# lotes, a cada INTERVALO_ENVIO_MS, que entram em um buffer circular da sessão.
+PASTA_FRONTEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend")
+experimento_webgazer = components.declare_component("experimento_webgazer", path=PASTA_FRONTEND)
+INTERVALO_ENVIO_MS = 500
+# Limite da cópia local no navegador (colunas tipadas, ~24 bytes por amostra);
+# acima dele as amostras mais antigas são descartadas. 0 = sem limite.
+LIMITE_AMOSTRAS_NAVEGADOR = 1_000_000
+# Filtros de eyetracking.smoothing (os mesmos no navegador e na análise)
+ROTULOS_FILTRO = {None: "Nenhuma", "one_euro": "One-Euro", "kalman": "Kalman", "median": "Mediana"}
+
+
+def sessao_ao_vivo():
+    """``LiveSession`` desta sessão do navegador (criada na primeira chamada)."""
+    if "sessao_ao_vivo" not in st.session_state:
+        st.session_state["sessao_ao_vivo"] = LiveSession()
+        cobrar("sessão ao vivo", st.session_state["sessao_ao_vivo"].buffer.nbytes)
+    return st.session_state["sessao_ao_vivo"]
+
+
+def npz_ao_vivo(ao_vivo):
+    """Amostras retidas no buffer ao vivo, em ``.npz`` (gerado só no clique)."""
+    destino = io.BytesIO()
+    write_columnar(ao_vivo.buffer.frame(), destino)
+    return destino.getvalue()
+
+
+@st.fragment
+def painel_experimento():
+    """Experimento + painel ao vivo; reexecuta sozinho a cada lote recebido."""
+    ao_vivo = sessao_ao_vivo()
+    # Processa o último valor antes de desenhar o componente, para que o
+    # "ack" enviado de volta já confirme os lotes recebidos neste rerun
+    novas = ao_vivo.receive(st.session_state.get("experimento"))
+
+    manter_local = st.checkbox(
+        "Manter cópia local no navegador (necessária para Baixar JSON/NPZ na tela do experimento)",
+        value=True,
+        key="manter_local",
+    )
+    col_filtro, col_rotular = st.columns(2)
+    filtro = col_filtro.selectbox(
+        "Suavização do ponto do olhar", list(ROTULOS_FILTRO), format_func=ROTULOS_FILTRO.get, key="filtro_ao_vivo"
+    )
+    rotular = col_rotular.checkbox(
+        "Associar o estímulo pelo olhar suavizado",
+        key="rotular_suavizado",
+        disabled=filtro is None,
+        help="As amostras são gravadas sem suavização; só a escolha do estímulo mais próximo muda.",
+    )
+    experimento_webgazer(
+        sessao=ao_vivo.session_id,
+        ack=ao_vivo.last_seq,
+        manter_local=manter_local,
+        limite_local=LIMITE_AMOSTRAS_NAVEGADOR,
+        intervalo_ms=INTERVALO_ENVIO_MS,
+        suavizacao=filtro and {"filtro": filtro, "rotular": rotular},
+        key="experimento",
+        default=None,
+    )
+
+    buffer = ao_vivo.buffer
+    st.markdown("### Sessão ao vivo")
+    if buffer.total == 0:
+        st.info("Aguardando as primeiras amostras do experimento...")
+        return
+
+    col_total, col_retidas, col_dt = st.columns(3)
+    col_total.metric("Amostras recebidas", buffer.total)
+    col_retidas.metric("Amostras no buffer", f"{len(buffer)} / {buffer.capacity}")
+    col_dt.metric("Intervalo médio", f"{buffer.dt_ms():.1f} ms")
+
+    tabelas = buffer.attention_tables()
+    col_cor, col_posicao = st.columns(2)
+    col_cor.write("Atenção por cor:")
+    col_cor.dataframe(tabelas["cor"], hide_index=True)
+    col_posicao.write("Atenção por posição:")
+    col_posicao.dataframe(tabelas["posicao"], hide_index=True)
+
+    st.download_button(
+        "Baixar NPZ da sessão ao vivo",
+        data=lambda: npz_ao_vivo(ao_vivo),
+        file_name="gaze_data_ao_vivo.npz",
+        mime="application/octet-stream",
+        on_click="ignore",
+        key="baixar_ao_vivo",
+    )
+
+    # A aba de análise acompanha a sessão ao vivo: atualiza o app inteiro
+    if novas and st.session_state.get("analise_ao_vivo"):
+        st.rerun()
+
+
+# -------------------------------------------------------------------
+# INGESTÃO COMPARTILHADA
+# -------------------------------------------------------------------
+# As sessões lidas ficam no cache compartilhado (limitado em bytes); ao
+# exceder o limite, as menos usadas são descartadas.
+
+
+@em_cache_compartilhado("Lendo sessão...")
+def carregar_sessao(hash_conteudo, _conteudo):
+    """Lê e limpa uma sessão a partir dos bytes do upload.
+
+    A chave do cache é apenas ``hash_conteudo``; os bytes não são re-hasheados
+    pelo Streamlit. O DataFrame devolvido é compartilhado entre as abas e
+    entre reruns, portanto não deve ser modificado in-place.
+
+    A leitura é incremental (``eyetracking.read_session``): x/y, timestamp e
+    nearestStimulusId já saem com dtypes numéricos compactos e cor/posição
+    como categóricas, o que substitui o ``pd.to_numeric`` da limpeza básica.
+    Arquivos ``.npz`` (botão "Baixar NPZ" ou ``python -m eyetracking converter``)
+    não são decodificados: as colunas são visões diretas sobre os bytes.
+    Arquivos ``.etz`` (botão "Baixar compacto") são descomprimidos e
+    decodificados de forma vetorizada (``eyetracking.compact``).
+
+    Retorna ``(df, posicao_reconstruida)``.
+    """
+    return load_session(_conteudo)
+
+
+@staged("hash do upload")
+def hash_do_upload(conteudo):
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+def sessao_do_upload(uploaded_file):
+    """Devolve ``(hash_conteudo, df, posicao_reconstruida)`` do arquivo enviado.
+
+    O hash identifica a sessão nos demais caches derivados dela.
+    """
+    conteudo = uploaded_file.getvalue()
+    hash_conteudo = hash_do_upload(conteudo)
+    return (hash_conteudo,) + carregar_sessao(hash_conteudo, conteudo)
+
+
+def sessao_incremental(uploaded_file):
+    """``(hash_conteudo, IncrementalSession)`` do arquivo enviado na aba de análise.
+
+    Quando o mesmo arquivo é enviado de novo depois de crescer, só as
+    amostras novas são lidas e somadas às tabelas de atenção e ao dt
+    (``eyetracking.incremental``). Qualquer outro arquivo é lido do zero pelo
+    cache compartilhado, como em ``sessao_do_upload``.
+    """
+    conteudo = uploaded_file.getvalue()
+    hash_conteudo = hash_do_upload(conteudo)
+    sessao = st.session_state.setdefault("sessao_incremental", IncrementalSession())
+    sessao.update(conteudo, hash_conteudo, load=lambda c: carregar_sessao(hash_conteudo, c))
+    if sessao.last_update == "incremental":
+        # As partes acrescentadas são só desta sessão (a leitura completa fica no cache compartilhado)
+        cobrar("sessão incremental", estimate_nbytes(sessao))
+    elif sessao.last_update == "completa":
+        orcamento_da_sessao().release("sessão incremental")
+    return hash_conteudo, sessao
+
+
+def erro_colunas_ausentes(colunas):
+    st.error(
+        f"As seguintes colunas necessárias não estão no JSON: {colunas}. "
+        "Verifique se o experimento rodou na versão mais recente do HTML."
+    )
+    st.stop()
+
+
+# -------------------------------------------------------------------
+# BANCO LOCAL DE SESSÕES
+# -------------------------------------------------------------------
+# Sessões importadas uma vez em um SQLite local (eyetracking.session_store).
+# Cada chamada abre a própria conexão: o SQLite não compartilha conexões
+# entre as threads das sessões do Streamlit.
+ROTULOS_AGRUPAMENTO = {"participante": "Participante", COLOR: "Cor", POSITION: "Posição", "sessao": "Sessão"}
+
+
+def sessoes_do_banco():
+    """Sessões guardadas no banco local (uma linha por sessão)."""
+    with SessionStore() as banco:
+        return banco.sessions()
+
+
+@em_cache_compartilhado("Lendo sessão do banco local...")
+def carregar_sessao_do_banco(hash_conteudo, sessao_id):
+    """Amostras de uma sessão do banco, no mesmo formato de ``carregar_sessao``."""
+    with SessionStore() as banco:
+        return banco.samples(sessao_id)
+
+
+def sessao_do_banco(sessao):
+    """``(hash_conteudo, df, posicao_reconstruida)`` de uma linha de ``sessoes_do_banco``.
+
+    O hash é o do arquivo original, então os caches derivados (fixações,
+    mapa de calor...) são os mesmos de quando o arquivo é enviado.
+    """
+    df = carregar_sessao_do_banco(sessao["hash"], int(sessao["sessao"]))
+    return sessao["hash"], df, bool(sessao["posicao_reconstruida"])
+
+
+@st.cache_data(max_entries=16, show_spinner="Detectando fixações...")
+def fixacoes_da_sessao(hash_conteudo, _df, metodo, limiar, duracao_min_ms, lacuna_max_ms):
+    """Fixações da sessão ``hash_conteudo`` para um conjunto de parâmetros."""
+    param_limiar = "velocity_threshold" if metodo == "ivt" else "dispersion_threshold"
+    _, fixacoes = detect_fixations(
+        _df, metodo, **{param_limiar: limiar}, min_duration_ms=duracao_min_ms, max_gap_ms=lacuna_max_ms
+    )
+    return fixacoes
+
+
+@em_cache_compartilhado("Suavizando o olhar...")
+def sessao_suavizada(hash_conteudo, _df, filtro, reassociar):
+    """Sessão com x/y suavizados (e, com ``reassociar``, o estímulo mais próximo refeito)."""
+    return smooth_session(_df, filtro, relabel_nearest=reassociar)
+
+
+@em_cache_compartilhado()
+def indice_de_ensaios(hash_conteudo, _df):
+    """Início e fim de cada ensaio da sessão (construído uma vez por sessão)."""
+    return TrialIndex(_df)
+
+
+@st.cache_data(max_entries=16, show_spinner="Calculando métricas por ensaio...")
+def metricas_dos_ensaios(hash_conteudo, _df, raio):
+    """Métricas por ensaio; com ``raio``, as AOIs são círculos em volta de cada estímulo."""
+    from eyetracking.aoi import estimate_center, relabel, triangle_layout
+
+    df = _df
+    if raio:
+        df = relabel(_df, triangle_layout(*estimate_center(valid_samples(_df)), raio))
+    return trial_metrics(df, indice_de_ensaios(hash_conteudo, _df))
+
+
+@st.cache_data(max_entries=16, show_spinner="Reamostrando os ensaios (bootstrap e permutação)...")
+def intervalos_dos_ensaios(chave, _estimulos, reamostras):
+    """Intervalos de confiança e comparações da atenção por ensaio (``chave`` identifica ``_estimulos``)."""
+    return compare_attention(_estimulos, n_resamples=reamostras)
+
+
+def mostrar_intervalos(resultados):
+    """Tabelas de ``compare_attention`` por cor e por posição."""
+    for col, titulo in ((COLOR, "cor"), (POSITION, "posição")):
+        if col not in resultados:
+            continue
+        intervalos, comparacoes = resultados[col]
+        st.write(f"Atenção por ensaio (s) por {titulo}, com intervalo de {CONFIDENCE:.0%}:")
+        st.dataframe(intervalos)
+        st.write(f"Diferenças entre pares ({titulo}) e p-valores da permutação (Holm: corrigido):")
+        st.dataframe(comparacoes)
+
+
+@em_cache_compartilhado("Preparando mapa de calor...")
+def grade_heatmap(hash_conteudo, _df):
+    """Histogramas da sessão por cor + posição (uma passada sobre as amostras)."""
+    return GazeHistogram(_df)
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def imagem_heatmap(hash_conteudo, _df, cores, posicoes, estimulo, suavizacao):
+    """PNG do mapa de calor para um filtro; não depende do tamanho da sessão."""
+    grade = grade_heatmap(hash_conteudo, _df)
+    densidade = gaussian_smooth(grade.counts(cores, posicoes, estimulo), suavizacao)
+    return figura_heatmap(densidade, grade)
+
+
+@staged("mapa de calor: imagem (matplotlib)")
+def figura_heatmap(densidade, grade):
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(8, max(2.0, 8 * grade.shape[0] / grade.shape[1])))
+    plot_heatmap(densidade, grade.extent, ax=ax)
+    imagem = io.BytesIO()
+    fig.savefig(imagem, format="png", bbox_inches="tight", dpi=100)
+    plt.close(fig)
+    return imagem.getvalue()
+
+
+@em_cache_compartilhado()
+def trajetoria_da_sessao(hash_conteudo, _df):
+    """x/y/timestamp da sessão ordenados por tempo."""
+    return Trajectory(_df)
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def janela_trajetoria(hash_conteudo, _df, inicio_s, fim_s, metodo, pontos):
+    """Amostras reduzidas e períodos com estímulo de uma janela (em s desde o início)."""
+    trajetoria = trajetoria_da_sessao(hash_conteudo, _df)
+    t0 = trajetoria.start + inicio_s * 1000.0
+    t1 = trajetoria.start + fim_s * 1000.0
+    amostras = trajetoria.window(t0, t1, n_points=pontos, method=metodo)
+    estimulos = trajetoria.spans_in(t0, t1)
+    amostras["t_s"] = (amostras["timestamp"] - trajetoria.start) / 1000.0
+    estimulos["inicio_s"] = (estimulos["inicio"] - trajetoria.start) / 1000.0
+    estimulos["fim_s"] = (estimulos["fim"] - trajetoria.start) / 1000.0
+    return amostras, estimulos
+
+
+def graficos_trajetoria(amostras, estimulos):
+    """Gráficos x(t)/y(t) com os períodos de estímulo e do caminho 2D."""
+    import altair as alt
+
+    faixas = alt.Chart(estimulos).mark_rect(color="gray", opacity=0.2).encode(x="inicio_s:Q", x2="fim_s:Q")
+    linhas = (
+        alt.Chart(amostras)
+        .transform_fold(["x", "y"], as_=["eixo", "px"])
+        .mark_line(strokeWidth=1)
+        .encode(x=alt.X("t_s:Q", title="tempo (s)"), y=alt.Y("px:Q", title="posição (px)"), color="eixo:N")
+    )
+    caminho = (
+        alt.Chart(amostras)
+        .mark_line(strokeWidth=1, opacity=0.7)
+        .encode(
+            x=alt.X("x:Q", title="x (px)"),
+            y=alt.Y("y:Q", title="y (px)", scale=alt.Scale(reverse=True)),
+            order="t_s:Q",
+        )
+    )
+    return faixas + linhas, caminho
+
+
+@st.cache_resource
+def repositorio_modelos():
+    """Modelos treinados em disco, compartilhados entre sessões e reinícios do app.
+
+    Os modelos em uso também ficam no cache compartilhado: uma leitura do disco
+    (ou um treino) por tabela, para todas as sessões.
+    """
+    return ModelStore(cache=cache_compartilhado())
+
+
+@st.cache_data(max_entries=8, show_spinner="Preparando os dados da busca...")
+def dados_busca(hash_conteudo, _df, _agg_rotulada, nivel):
+    from eyetracking.search import search_data
+
+    return search_data(_df, _agg_rotulada, nivel)
+
+
+def painel_busca(hash_conteudo, df, agg_rotulada):
+    """Validação cruzada e busca de hiperparâmetros em segundo plano.
+
+    A busca roda em um pool de processos; enquanto ela não termina, este
+    painel (um fragmento) se atualiza sozinho a cada segundo e o resto do
+    app continua respondendo.
+    """
+    from eyetracking.search import DEFAULT_FOLDS, MODELS, SearchJob
+
+    busca = st.session_state.get("busca")
+    rodando = busca is not None and not busca[1].done
+
+    col_dados, col_modelos = st.columns(2)
+    nivel = col_dados.radio(
+        "Dados",
+        ["agg", "amostras"],
+        format_func={"agg": "Tabela cor + posição", "amostras": "Uma linha por amostra"}.get,
+        key="busca_nivel",
+    )
+    modelos = col_modelos.multiselect("Modelos", list(MODELS), default=list(MODELS), key="busca_modelos")
+    col_folds, col_modo, col_iter = st.columns(3)
+    n_folds = col_folds.number_input("Folds (k)", 2, 20, DEFAULT_FOLDS, key="busca_folds")
+    modo = col_modo.radio("Busca", ["Grade completa", "Aleatória"], key="busca_modo")
+    n_iter = col_iter.number_input(
+        "Combinações por modelo", 1, 100, 5, key="busca_iter", disabled=modo != "Aleatória"
+    )
+
+    col_iniciar, col_cancelar = st.columns(2)
+    if col_iniciar.button("Iniciar busca", disabled=rodando or not modelos, key="busca_iniciar"):
+        X, y = dados_busca(hash_conteudo, df, agg_rotulada, nivel)
+        if not cobrar(RESULTADOS_DA_SESSAO["busca"], estimate_nbytes((X, y))):
+            return
+        try:
+            job = SearchJob(X, y, models=modelos, n_splits=n_folds, n_iter=n_iter if modo == "Aleatória" else None)
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            st.session_state["busca"] = (hash_conteudo, job)
+            # Rerun completo para o fragmento passar a se atualizar sozinho
+            st.rerun()
+    if col_cancelar.button("Cancelar", disabled=not rodando, key="busca_cancelar"):
+        busca[1].cancel()
+
+    if busca is None or busca[0] != hash_conteudo:
+        return
+    job = busca[1]
+    if job.done:
+        estado = "cancelada" if job.cancelled else "concluída"
+        st.progress(1.0, text=f"Busca {estado}: {job.completed}/{job.total} folds em {job.elapsed:.1f} s")
+    else:
+        st.progress(job.completed / job.total, text=f"{job.completed}/{job.total} folds ({job.elapsed:.0f} s)")
+    for erro in job.errors[:3]:
+        st.error(erro)
+    ranking = job.summary()
+    if not ranking.empty:
+        st.write(f"Candidatos (média dos folds concluídos; {job.n_splits} folds por candidato):")
+        st.dataframe(ranking.drop(columns="candidato"), hide_index=True)
+
+    # Terminou durante uma atualização automática: rerun completo para parar o relógio
+    if job.done and st.session_state.pop("busca_atualizando", False):
+        st.rerun()
+
+
+def tabela_cor_posicao(df):
+    """Tabela cor + posição (amostras e tempo de atenção) de uma sessão."""
+    df_valid = valid_samples(df)
+    return attention_by(df_valid, [COLOR, POSITION], estimate_dt_ms(df_valid) / 1000.0)
+
 
 # -------------------------------------------------------------------
 # TABS
 # -------------------------------------------------------------------
-tab_exp, tab_analise, tab_ia = st.tabs(["🧪 Experimento", "📊 Análise dos dados", "🤖 Análise com IA"])
+tab_exp, tab_analise, tab_ia, tab_lote, tab_banco = st.tabs(
+    ["🧪 Experimento", "📊 Análise dos dados", "🤖 Análise com IA", "👥 Análise em lote", "🗄️ Banco de sessões"]
+)
 
 # ==========================
 # TAB 1 – EXPERIMENTO
@@ -415,108 +704,332 @@ with tab_exp:
     - Ajuste a posição do rosto para que o rastreamento funcione bem.  
     - Observe os três círculos coloridos a cada ciclo.  
     - Use o botão **Baixar JSON** na barra superior da tela do experimento
-      para salvar os dados em um arquivo.
+      para salvar os dados em um arquivo. O botão **Baixar NPZ** salva as
+      mesmas amostras em formato colunar binário, menor e mais rápido de ler.
+    - As amostras também chegam ao vivo aqui no app: o painel abaixo do
+      experimento mostra a atenção por cor e posição enquanto ele roda.
     """)
-    components.html(html_code, height=800)
+    painel_experimento()
 
 # ==========================
 # TAB 2 – ANÁLISE DOS DADOS
 # ==========================
 with tab_analise:
     st.subheader("Upload e análise básica dos dados")
-    st.write("Após rodar o experimento e baixar o arquivo `gaze_data_experimento.json`, envie-o abaixo.")
+    st.write(
+        "Após rodar o experimento e baixar o arquivo `gaze_data_experimento.json` "
+        "(ou `gaze_data_experimento.npz`/`.etz`), envie-o abaixo."
+    )
+
+    uploaded_file = st.file_uploader(
+        "Envie o arquivo JSON, NPZ ou ETZ gerado pelo experimento",
+        type=["json", "npz", "etz"],
+        key="file_analise",
+        max_upload_size=MAX_UPLOAD_MB,
+    )
+    uploaded_file = conferir_upload("file_analise", uploaded_file)
+
+    analise_ao_vivo = st.toggle(
+        "Analisar a sessão ao vivo (quando nenhum arquivo for enviado)", key="analise_ao_vivo"
+    )
 
-    uploaded_file = st.file_uploader("Envie o arquivo JSON gerado pelo experimento", type=["json"], key="file_analise")
+    sessoes_banco = sessoes_do_banco().set_index("sessao", drop=False)
+    sessao_banco = None
+    if not sessoes_banco.empty:
+        sessao_banco = st.selectbox(
+            "...ou abra uma sessão do banco local (quando nenhum arquivo for enviado)",
+            [None] + sessoes_banco.index.tolist(),
+            format_func=lambda i: "—" if i is None else (
+                f"{sessoes_banco.at[i, 'participante']} · {os.path.basename(sessoes_banco.at[i, 'arquivo'] or '?')}"
+                f" · {sessoes_banco.at[i, 'amostras']} amostras"
+            ),
+            key="sessao_banco",
+        )
 
+    sessao = None
+    # Estado incremental do arquivo enviado (tabelas de atenção sem reagregar a sessão)
+    incremental = None
     if uploaded_file is not None:
         try:
-            data = json.load(uploaded_file)
+            hash_upload, incremental = sessao_incremental(uploaded_file)
+        except KeyError as e:
+            erro_colunas_ausentes(e.args[0])
         except Exception as e:
-            st.error(f"Erro ao ler o JSON: {e}")
+            st.error(f"Erro ao ler o arquivo: {e}")
             st.stop()
+        sessao = (hash_upload, incremental.frame(), incremental.position_rebuilt)
+        if incremental.last_update == "incremental":
+            st.caption(
+                f"Arquivo atualizado: {incremental.new_samples} amostras novas lidas e somadas às "
+                f"{incremental.n_samples - incremental.new_samples} já analisadas."
+            )
 
-        if not data:
+        with st.expander("Guardar esta sessão no banco local"):
+            participante = st.text_input(
+                "Participante", value=os.path.splitext(uploaded_file.name)[0], key="banco_participante"
+            )
+            if st.button("Guardar no banco", key="banco_guardar"):
+                try:
+                    with SessionStore() as banco:
+                        sessao_id, nova = banco.ingest(
+                            uploaded_file.getvalue(),
+                            participant=participante,
+                            name=uploaded_file.name,
+                            hash_conteudo=sessao[0],
+                        )
+                except KeyError as e:
+                    st.error(f"As seguintes colunas necessárias não estão no arquivo: {e.args[0]}.")
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    st.success(f"Sessão {sessao_id} " + ("guardada." if nova else "já estava no banco."))
+    elif sessao_banco is not None:
+        sessao = sessao_do_banco(sessoes_banco.loc[sessao_banco])
+    elif analise_ao_vivo:
+        ao_vivo = sessao_ao_vivo()
+        if ao_vivo.buffer.total == 0:
+            st.info("Nenhuma amostra recebida ainda. Inicie o experimento na primeira aba.")
+        else:
+            # Uma chave por estado do buffer, para os caches derivados (fixações)
+            hash_ao_vivo = f"ao-vivo-{ao_vivo.session_id}-{ao_vivo.buffer.total}"
+            sessao = (hash_ao_vivo, ao_vivo.buffer.frame(), False)
+
+    if sessao is not None:
+        hash_sessao, df, posicao_reconstruida = sessao
+
+        if df.empty:
             st.error("O arquivo JSON está vazio. Rode o experimento novamente e baixe um novo arquivo.")
             st.stop()
 
-        df = pd.DataFrame(data)
-        
+        col_filtro, col_reassociar = st.columns(2)
+        filtro_analise = col_filtro.selectbox(
+            "Suavizar o olhar antes da análise",
+            list(ROTULOS_FILTRO),
+            format_func=ROTULOS_FILTRO.get,
+            key="filtro_analise",
+        )
+        reassociar = col_reassociar.checkbox(
+            "Refazer o estímulo mais próximo pelo olhar suavizado",
+            key="reassociar_suavizado",
+            disabled=filtro_analise is None,
+            help="Usa o centro da janela estimado pela mediana do olhar.",
+        )
+        if filtro_analise is not None:
+            df = sessao_suavizada(hash_sessao, df, filtro_analise, reassociar)
+            if reassociar:
+                # A associação ao estímulo mudou: as tabelas são refeitas a partir das amostras
+                incremental = None
+            # Os caches derivados (fixações, mapa de calor...) separam as versões suavizadas
+            hash_sessao = f"{hash_sessao}-{filtro_analise}" + ("-reassociada" if reassociar else "")
+
         st.write("Pré-visualização das primeiras amostras:")
         st.dataframe(df.head())
         st.write("Colunas encontradas:", list(df.columns))
 
-        # ----- LIMPEZA BÁSICA -----
-        for col in ["x", "y", "timestamp"]:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors="coerce")
-
-        # Reconstruir nearestPosition se não existir (a partir do padrão do triângulo)
-        if "nearestPosition" not in df.columns and "nearestStimulusId" in df.columns:
+        if posicao_reconstruida:
             st.info("Coluna 'nearestPosition' não encontrada. Reconstruindo a partir de 'nearestStimulusId' (mod 3).")
 
-            def map_pos_from_id(id_):
-                try:
-                    r = int(id_) % 3
-                except (TypeError, ValueError):
-                    return None
-                if r == 0:
-                    return "topo"
-                elif r == 1:
-                    return "baixo-esquerda"
-                else:
-                    return "baixo-direita"
-
-            df["nearestPosition"] = df["nearestStimulusId"].apply(map_pos_from_id)
-
-        required_cols = ["nearestStimulusColor", "timestamp"]
-        if "nearestPosition" in df.columns:
-            required_cols.append("nearestPosition")
-
-        missing = [c for c in required_cols if c not in df.columns]
-        if missing:
-            st.error(
-                f"As seguintes colunas necessárias não estão no JSON: {missing}. "
-                "Verifique se o experimento rodou na versão mais recente do HTML."
-            )
-            st.stop()
+        if incremental is not None:
+            num_validas = incremental.attention.n_valid
+        else:
+            try:
+                df_valid = valid_samples(df, require_position=False)
+            except KeyError as e:
+                erro_colunas_ausentes(e.args[0])
+            num_validas = len(df_valid)
 
-        df_valid = df.dropna(subset=required_cols).copy()
-        st.write(f"Total de amostras válidas (com estímulo associado): **{len(df_valid)}**")
+        st.write(f"Total de amostras válidas (com estímulo associado): **{num_validas}**")
 
-        if len(df_valid) == 0:
+        if num_validas == 0:
             st.error("Nenhuma amostra válida encontrada com estímulo associado.")
             st.stop()
 
+        if incremental is not None:
+            amostragem_diagnostico["sessao"] = amostragem = incremental.sampling_stats()
+            dt_medio_ms = incremental.dt_ms()
+            tabelas = incremental.attention_tables()
+        else:
+            amostragem_diagnostico["sessao"] = amostragem = sampling_stats(df)
+            dt_medio_ms = estimate_dt_ms(df_valid)
+            tabelas = attention_tables(df_valid, dt_medio_ms / 1000.0)
+
         # ----- ATENÇÃO POR COR -----
         st.markdown("### Atenção por cor")
 
-        samples_by_color = df_valid.groupby("nearestStimulusColor")["timestamp"].count()
+        por_cor = tabelas["cor"].set_index(COLOR)
         st.write("Número de amostras por cor:")
-        st.write(samples_by_color)
+        st.write(por_cor["num_samples"])
 
-        # Estimativa de dt médio
-        df_sorted = df_valid.sort_values("timestamp")
-        dt = df_sorted["timestamp"].diff().dropna()
-        dt_medio_ms = dt.mean() if not dt.empty else 30.0
-        dt_medio_s = dt_medio_ms / 1000.0
         st.write(f"Intervalo médio estimado entre amostras: **{dt_medio_ms:.2f} ms**")
+        st.write(
+            f"Taxa de amostragem obtida: **{amostragem['taxa_hz']:.1f} Hz** "
+            f"(jitter: {amostragem['jitter_ms']:.1f} ms; maior intervalo: {amostragem['maior_intervalo_ms']:.0f} ms)"
+        )
 
-        attention_time_color_s = samples_by_color * dt_medio_s
         st.write("Tempo estimado de atenção por cor (segundos):")
-        st.write(attention_time_color_s)
+        st.write(por_cor["tempo_atencao_s"])
 
         # ----- ATENÇÃO POR POSIÇÃO -----
-        if "nearestPosition" in df_valid.columns:
+        if "posicao" in tabelas:
             st.markdown("### Atenção por posição do triângulo")
 
-            samples_by_pos = df_valid.groupby("nearestPosition")["timestamp"].count()
-            attention_time_pos_s = samples_by_pos * dt_medio_s
+            por_posicao = tabelas["posicao"].set_index(POSITION)
 
             st.write("Número de amostras por posição:")
-            st.write(samples_by_pos)
+            st.write(por_posicao["num_samples"])
 
             st.write("Tempo estimado de atenção por posição (segundos):")
-            st.write(attention_time_pos_s)
+            st.write(por_posicao["tempo_atencao_s"])
+
+        # ----- FIXAÇÕES E SACADAS -----
+        st.markdown("### Fixações e sacadas")
+        st.write(
+            "Amostras em movimento rápido (sacadas e ruído do WebGazer) não contam como atenção: "
+            "aqui só entram as amostras agrupadas em fixações."
+        )
+
+        col_metodo, col_limiar, col_duracao, col_lacuna = st.columns(4)
+        metodo = col_metodo.selectbox(
+            "Algoritmo",
+            ["ivt", "idt"],
+            format_func=lambda m: {"ivt": "I-VT (velocidade)", "idt": "I-DT (dispersão)"}[m],
+            key="fix_metodo",
+        )
+        if metodo == "ivt":
+            limiar_fix = col_limiar.number_input(
+                "Velocidade máxima (px/s)", min_value=1.0, value=IVT_VELOCITY_PX_S, step=50.0, key="fix_vel"
+            )
+        else:
+            limiar_fix = col_limiar.number_input(
+                "Dispersão máxima (px)", min_value=1.0, value=IDT_DISPERSION_PX, step=10.0, key="fix_disp"
+            )
+        duracao_min = col_duracao.number_input(
+            "Duração mínima (ms)", min_value=0.0, value=MIN_DURATION_MS, step=10.0, key="fix_dur"
+        )
+        lacuna_max = col_lacuna.number_input(
+            "Lacuna máxima entre amostras (ms)", min_value=1.0, value=MAX_GAP_MS, step=10.0, key="fix_gap"
+        )
+
+        fixacoes = fixacoes_da_sessao(hash_sessao, df, metodo, limiar_fix, duracao_min, lacuna_max)
+        st.write(
+            f"Fixações detectadas: **{len(fixacoes)}** "
+            f"(tempo total em fixação: **{fixacoes['duracao_ms'].sum() / 1000.0:.2f} s**)"
+        )
+
+        if COLOR in fixacoes.columns and fixacoes[COLOR].notna().any():
+            st.write("Fixações por cor:")
+            st.dataframe(fixation_attention(fixacoes, [COLOR]))
+        if POSITION in fixacoes.columns and fixacoes[POSITION].notna().any():
+            st.write("Fixações por posição:")
+            st.dataframe(fixation_attention(fixacoes, [POSITION]))
+
+        # ----- ENSAIOS -----
+        st.markdown("### Ensaios")
+        st.write(
+            "Cada apresentação do triângulo é um ensaio. Latência: tempo desde o início do ensaio "
+            "até o primeiro olhar em cada estímulo; permanência: tempo com o olhar nele."
+        )
+        raio_ensaios = st.number_input(
+            "Raio das AOIs em volta dos estímulos (px; 0 = estímulo mais próximo, como no navegador)",
+            min_value=0.0,
+            value=100.0,
+            step=10.0,
+            key="ensaios_raio",
+        )
+        ensaios, ensaios_estimulos = metricas_dos_ensaios(hash_sessao, df, raio_ensaios)
+        if ensaios.empty:
+            st.info("Nenhum ensaio encontrado (a sessão não tem nearestStimulusId).")
+        else:
+            olhados = int(ensaios["primeira_posicao"].notna().sum())
+            latencia = ensaios["latencia_primeiro_olhar_ms"].mean() if olhados else float("nan")
+            st.write(
+                f"Ensaios: **{len(ensaios)}** (com olhar em algum estímulo: {olhados}; "
+                f"latência média até o primeiro olhar: **{latencia:.0f} ms**; "
+                f"trocas de estímulo por ensaio: {ensaios['trocas'].mean():.1f})"
+            )
+            if not raio_ensaios:
+                st.caption("Sem raio, toda amostra já está em algum estímulo e o primeiro olhar tem latência 0.")
+            st.write("Por cor:")
+            st.dataframe(trial_summary(ensaios_estimulos, COLOR))
+            st.write("Por posição:")
+            st.dataframe(trial_summary(ensaios_estimulos, POSITION))
+            if st.toggle("Intervalos de confiança e comparações entre estímulos", key="ensaios_ic"):
+                reamostras = st.number_input(
+                    "Reamostragens (bootstrap e permutação)",
+                    min_value=100,
+                    max_value=100_000,
+                    value=N_RESAMPLES,
+                    step=1000,
+                    key="ensaios_reamostras",
+                )
+                mostrar_intervalos(
+                    intervalos_dos_ensaios((hash_sessao, raio_ensaios), ensaios_estimulos, int(reamostras))
+                )
+            with st.expander("Métricas de cada ensaio"):
+                st.dataframe(ensaios)
+
+        # ----- MAPA DE CALOR -----
+        st.markdown("### Mapa de calor do olhar")
+        if not has_spread(df):
+            st.info("Sem variação em x ou y nas amostras: não há mapa de calor a desenhar.")
+        else:
+            grade = grade_heatmap(hash_sessao, df)
+
+            col_cores, col_posicoes, col_estimulo, col_suav = st.columns(4)
+            cores_heat = col_cores.multiselect("Cores", grade.colors, key="heat_cores")
+            posicoes_heat = col_posicoes.multiselect("Posições", grade.positions, key="heat_posicoes")
+            estimulo_heat = col_estimulo.selectbox(
+                "Estímulo (nearestStimulusId)",
+                [None] + grade.stimulus_ids.tolist(),
+                format_func=lambda i: "Todos" if i is None else str(i),
+                key="heat_estimulo",
+            )
+            suavizacao = col_suav.slider(
+                "Suavização (células)", min_value=0.0, max_value=8.0, value=SIGMA_BINS, step=0.5, key="heat_sigma"
+            )
+
+            st.image(
+                imagem_heatmap(
+                    hash_sessao,
+                    df,
+                    tuple(cores_heat) or None,
+                    tuple(posicoes_heat) or None,
+                    estimulo_heat,
+                    suavizacao,
+                )
+            )
+            st.caption(
+                f"Grade de {grade.shape[1]} x {grade.shape[0]} células de {grade.bin_size:.1f} px; "
+                "sem filtro, entram também as amostras sem estímulo associado."
+            )
+
+        # ----- TRAJETÓRIA -----
+        st.markdown("### Trajetória do olhar")
+        trajetoria = trajetoria_da_sessao(hash_sessao, df)
+        duracao_s = max((trajetoria.end - trajetoria.start) / 1000.0, 0.001)
+
+        col_janela, col_metodo_traj = st.columns([3, 1])
+        inicio_s, fim_s = col_janela.slider(
+            "Janela de tempo (s)", min_value=0.0, max_value=duracao_s, value=(0.0, duracao_s), key="traj_janela"
+        )
+        metodo_traj = col_metodo_traj.radio(
+            "Redução",
+            ["lttb", "minmax"],
+            format_func=lambda m: {"lttb": "LTTB", "minmax": "mín/máx"}[m],
+            key="traj_metodo",
+        )
+
+        amostras_traj, estimulos_traj = janela_trajetoria(
+            hash_sessao, df, inicio_s, fim_s, metodo_traj, DEFAULT_POINTS
+        )
+        st.write(
+            f"Mostrando **{len(amostras_traj)}** amostras da janela "
+            "(faixas cinza: estímulos na tela)."
+        )
+
+        linhas, caminho = graficos_trajetoria(amostras_traj, estimulos_traj)
+        st.altair_chart(linhas)
+        st.altair_chart(caminho)
 
 # ==========================
 # TAB 3 – ANÁLISE COM IA
@@ -532,124 +1045,320 @@ with tab_ia:
     - treinar um modelo **RandomForestClassifier** para prever essa classificação.
     """)
 
-    uploaded_file_ia = st.file_uploader(
-        "Envie novamente o JSON (ou o mesmo usado na aba anterior) para análise com IA:",
-        type=["json"],
-        key="file_ia",
-    )
-
-    if uploaded_file_ia is not None:
-        try:
-            data_ia = json.load(uploaded_file_ia)
-        except Exception as e:
-            st.error(f"Erro ao ler o JSON: {e}")
-            st.stop()
-
-        if not data_ia:
-            st.error("O arquivo JSON está vazio.")
-            st.stop()
-
-        df_ia = pd.DataFrame(data_ia)
+    # A seção de previsão fica abaixo, mas roda antes: o treino usa st.stop()
+    area_treino = st.container()
+    area_prever = st.container()
 
-        # Conversão numérica
-        for col in ["x", "y", "timestamp"]:
-            if col in df_ia.columns:
-                df_ia[col] = pd.to_numeric(df_ia[col], errors="coerce")
-
-        # Reconstruir nearestPosition, se faltar
-        if "nearestPosition" not in df_ia.columns and "nearestStimulusId" in df_ia.columns:
-            def map_pos_from_id_ia(id_):
+    with area_prever:
+        st.markdown("### Prever em uma nova sessão")
+        st.write(
+            "Aplica um modelo já treinado (guardado no repositório de modelos) "
+            "à tabela cor + posição de outra sessão, sem treinar de novo."
+        )
+        modelos_salvos = repositorio_modelos().entries()
+        if not modelos_salvos:
+            st.info("Nenhum modelo salvo ainda. Treine um modelo acima.")
+        else:
+            escolhido = st.selectbox(
+                "Modelo",
+                modelos_salvos,
+                format_func=lambda e: f"{e.get('arquivo', '?')} · {e.get('criado_em', '')} · {e['chave'][:12]}",
+                key="modelo_prever",
+            )
+            arquivo_prever = st.file_uploader(
+                "Sessão (JSON/NPZ/ETZ) para prever:", type=["json", "npz", "etz"], key="file_prever", max_upload_size=MAX_UPLOAD_MB
+            )
+            arquivo_prever = conferir_upload("file_prever", arquivo_prever)
+            if arquivo_prever is not None:
                 try:
-                    r = int(id_) % 3
-                except (TypeError, ValueError):
-                    return None
-                if r == 0:
-                    return "topo"
-                elif r == 1:
-                    return "baixo-esquerda"
+                    _, df_prever, _ = sessao_do_upload(arquivo_prever)
+                    agg_prever = tabela_cor_posicao(df_prever)
+                except KeyError as e:
+                    st.error(f"As seguintes colunas necessárias não estão no arquivo: {e.args[0]}.")
+                except Exception as e:
+                    st.error(f"Erro ao ler o arquivo: {e}")
                 else:
-                    return "baixo-direita"
-
-            df_ia["nearestPosition"] = df_ia["nearestStimulusId"].apply(map_pos_from_id_ia)
-
-        required_cols_ia = ["nearestStimulusColor", "nearestPosition", "timestamp"]
-        missing_ia = [c for c in required_cols_ia if c not in df_ia.columns]
-        if missing_ia:
-            st.error(
-                f"As seguintes colunas necessárias não estão no JSON: {missing_ia}. "
-                "Verifique se o experimento rodou na versão correta."
-            )
-            st.stop()
-
-        df_ia_valid = df_ia.dropna(subset=required_cols_ia).copy()
-        if len(df_ia_valid) == 0:
-            st.error("Nenhuma amostra válida encontrada para IA.")
-            st.stop()
-
-        # Estima dt médio
-        df_ia_sorted = df_ia_valid.sort_values("timestamp")
-        dt_ia = df_ia_sorted["timestamp"].diff().dropna()
-        dt_medio_ms_ia = dt_ia.mean() if not dt_ia.empty else 30.0
-        dt_medio_s_ia = dt_medio_ms_ia / 1000.0
-
-        st.write(f"Intervalo médio estimado entre amostras: **{dt_medio_ms_ia:.2f} ms**")
-
-        # Agregar por cor + posição
-        group_cols = ["nearestStimulusColor", "nearestPosition"]
-        agg = (
-            df_ia_valid.groupby(group_cols)["timestamp"]
-            .count()
-            .reset_index(name="num_samples")
+                    if agg_prever.empty:
+                        st.error("Nenhuma amostra válida encontrada para prever.")
+                    else:
+                        modelo_salvo = repositorio_modelos().load(escolhido["chave"])
+                        previsto = predict_attention(modelo_salvo, agg_prever)
+                        # Rótulo da própria sessão (mediana), só para comparação
+                        previsto[TARGET] = label_high_attention(previsto)[0][TARGET]
+                        st.dataframe(previsto[[COLOR, POSITION, "tempo_atencao_s", PREDICTION, TARGET]])
+                        acerto = (previsto[PREDICTION] == previsto[TARGET]).mean()
+                        st.write(f"Concordância com o rótulo pela mediana desta sessão: **{acerto:.0%}**")
+
+    with area_treino:
+        uploaded_file_ia = st.file_uploader(
+            "Envie novamente o JSON/NPZ/ETZ (ou o mesmo usado na aba anterior) para análise com IA:",
+            type=["json", "npz", "etz"],
+            key="file_ia",
+            max_upload_size=MAX_UPLOAD_MB,
         )
+        uploaded_file_ia = conferir_upload("file_ia", uploaded_file_ia)
+
+        if uploaded_file_ia is not None:
+            try:
+                hash_ia, df_ia, _ = sessao_do_upload(uploaded_file_ia)
+            except Exception as e:
+                st.error(f"Erro ao ler o arquivo: {e}")
+                st.stop()
+
+            if df_ia.empty:
+                st.error("O arquivo JSON está vazio.")
+                st.stop()
+
+            try:
+                df_ia_valid = valid_samples(df_ia)
+            except KeyError as e:
+                st.error(
+                    f"As seguintes colunas necessárias não estão no JSON: {e.args[0]}. "
+                    "Verifique se o experimento rodou na versão correta."
+                )
+                st.stop()
+
+            if len(df_ia_valid) == 0:
+                st.error("Nenhuma amostra válida encontrada para IA.")
+                st.stop()
+
+            dt_medio_ms_ia = estimate_dt_ms(df_ia_valid)
+            st.write(f"Intervalo médio estimado entre amostras: **{dt_medio_ms_ia:.2f} ms**")
+
+            # Agregar por cor + posição
+            agg = attention_by(df_ia_valid, [COLOR, POSITION], dt_medio_ms_ia / 1000.0)
+
+            st.markdown("### Tabela agregada por cor + posição")
+            st.dataframe(agg)
+
+            if len(agg) < MIN_TRAIN_ROWS:
+                st.warning("Poucos pontos agregados para treinar um modelo de IA de forma significativa.")
+                st.stop()
+
+            # Definir rótulo de alta atenção (>= mediana)
+            agg, limiar = label_high_attention(agg)
+
+            st.write(f"Limiar de alta atenção (mediana do tempo): **{limiar:.2f} s**")
+            st.write("Tabela com rótulo de alta atenção (1) / baixa atenção (0):")
+            st.dataframe(agg[[COLOR, POSITION, "tempo_atencao_s", "alta_atencao"]])
+
+            modelo, chave_modelo, do_repositorio = repositorio_modelos().get_or_train(
+                agg, arquivo=uploaded_file_ia.name
+            )
+            if do_repositorio:
+                st.caption(f"Modelo `{chave_modelo[:12]}` reaproveitado do repositório (sem novo treino).")
+            else:
+                st.caption(f"Modelo `{chave_modelo[:12]}` treinado e salvo no repositório.")
+
+            if modelo["holdout"]:
+                st.markdown("### Relatório de classificação (IA)")
+            else:
+                st.warning("Poucos exemplos agregados para uma divisão treino/teste robusta. O modelo será treinado e avaliado sobre os mesmos dados (apenas demonstração).")
+                st.markdown("### Relatório de classificação (treino = teste)")
+            st.text(modelo["relatorio"])
+
+            st.markdown("### Validação cruzada e busca de hiperparâmetros")
+            st.write(
+                "Avalia vários modelos e combinações de hiperparâmetros com k-fold "
+                "estratificado, em processos separados. Os resultados aparecem à "
+                "medida que os folds terminam; o restante do app continua utilizável."
+            )
+            busca = st.session_state.get("busca")
+            atualizar = busca is not None and not busca[1].done
+            st.session_state["busca_atualizando"] = atualizar
+            st.fragment(painel_busca, run_every=1.0 if atualizar else None)(hash_ia, df_ia, agg)
 
-        agg["tempo_atencao_s"] = agg["num_samples"] * dt_medio_s_ia
-
-        st.markdown("### Tabela agregada por cor + posição")
-        st.dataframe(agg)
-
-        if len(agg) < 2:
-            st.warning("Poucos pontos agregados para treinar um modelo de IA de forma significativa.")
-            st.stop()
-
-        # Definir rótulo de alta atenção (>= mediana)
-        limiar = agg["tempo_atencao_s"].median()
-        agg["alta_atencao"] = (agg["tempo_atencao_s"] >= limiar).astype(int)
+            st.success("Análise com IA concluída.")
 
-        st.write(f"Limiar de alta atenção (mediana do tempo): **{limiar:.2f} s**")
-        st.write("Tabela com rótulo de alta atenção (1) / baixa atenção (0):")
-        st.dataframe(agg[["nearestStimulusColor", "nearestPosition", "tempo_atencao_s", "alta_atencao"]])
+# ==========================
+# TAB 4 – ANÁLISE EM LOTE
+# ==========================
+with tab_lote:
+    st.subheader("Análise de vários participantes")
+    st.write("""
+    Envie vários arquivos de sessão (um por participante) ou informe um diretório
+    no servidor com arquivos `.json`/`.npz`/`.etz`. Cada sessão é limpa e agregada em um
+    processo separado, usando todos os núcleos disponíveis; o nome do arquivo
+    identifica o participante.
+    """)
 
-        # Preparar features e rótulos
-        X_cat = agg[["nearestStimulusColor", "nearestPosition"]]
-        y = agg["alta_atencao"]
+    uploaded_files_lote = st.file_uploader(
+        "Envie os arquivos JSON/NPZ/ETZ dos participantes",
+        type=["json", "npz", "etz"],
+        accept_multiple_files=True,
+        key="files_lote",
+        max_upload_size=MAX_UPLOAD_MB,
+    )
+    uploaded_files_lote = conferir_upload("files_lote", uploaded_files_lote)
+    sessoes_lote = sessoes_do_servidor("...ou informe um diretório com as sessões", "dir_lote")
+
+    fontes, nomes, chave_lote = [], [], []
+    for f in uploaded_files_lote or []:
+        conteudo = f.getvalue()
+        fontes.append(conteudo)
+        nomes.append(f.name)
+        chave_lote.append((f.name, hashlib.sha256(conteudo).hexdigest()))
+    for path in sessoes_lote:
+        fontes.append(path)
+        nomes.append(path)
+        info = os.stat(path)
+        chave_lote.append((path, info.st_mtime_ns, info.st_size))
+    chave_lote = tuple(chave_lote)
+
+    if fontes:
+        st.write(f"Sessões selecionadas: **{len(fontes)}**")
+
+        if st.button("Analisar lote", key="btn_lote"):
+            barra = st.progress(0.0, text="Processando sessões...")
+            resultado = analyze_batch(
+                fontes,
+                names=nomes,
+                progress=lambda feitas, total: barra.progress(feitas / total, text=f"{feitas}/{total} sessões"),
+            )
+            if cobrar(RESULTADOS_DA_SESSAO["resultado_lote"], estimate_nbytes(resultado)):
+                st.session_state["resultado_lote"] = (chave_lote, resultado)
 
-        # One-hot encoding
-        enc = OneHotEncoder(sparse_output=False)
-        X_encoded = enc.fit_transform(X_cat)
+        resultado_lote = st.session_state.get("resultado_lote")
+        if resultado_lote is not None and resultado_lote[0] == chave_lote:
+            lote = resultado_lote[1]
 
-        # Garantir tamanho mínimo pro train_test_split
-        if len(agg) < 4:
-            st.warning("Poucos exemplos agregados para uma divisão treino/teste robusta. O modelo será treinado e avaliado sobre os mesmos dados (apenas demonstração).")
+            if not lote["erros"].empty:
+                st.warning("Algumas sessões não puderam ser analisadas:")
+                st.dataframe(lote["erros"])
 
-            clf = RandomForestClassifier(n_estimators=100, random_state=42)
-            clf.fit(X_encoded, y)
-            y_pred = clf.predict(X_encoded)
+            if lote["resumo"].empty:
+                st.error("Nenhuma sessão válida no lote.")
+                st.stop()
 
-            report = classification_report(y, y_pred)
-            st.markdown("### Relatório de classificação (treino = teste)")
-            st.text(report)
+            st.markdown("### Resumo por participante")
+            st.dataframe(lote["resumo"])
 
-        else:
-            X_train, X_test, y_train, y_test = train_test_split(
-                X_encoded, y, test_size=0.3, random_state=42
+            st.markdown("### Tempo estimado de atenção por cor (segundos)")
+            st.dataframe(
+                lote["cor"].pivot_table(
+                    index="participante", columns="nearestStimulusColor", values="tempo_atencao_s", fill_value=0
+                )
             )
 
-            clf = RandomForestClassifier(n_estimators=100, random_state=42)
-            clf.fit(X_train, y_train)
-            y_pred = clf.predict(X_test)
+            if not lote["posicao"].empty:
+                st.markdown("### Tempo estimado de atenção por posição (segundos)")
+                st.dataframe(
+                    lote["posicao"].pivot_table(
+                        index="participante", columns="nearestPosition", values="tempo_atencao_s", fill_value=0
+                    )
+                )
+
+                st.markdown("### Tabela agregada por cor + posição (todos os participantes)")
+                st.dataframe(lote["agg"])
+
+            if not lote["ensaios"].empty:
+                st.markdown("### Intervalos de confiança e comparações (atenção por ensaio)")
+                st.write(
+                    "Bootstrap com os ensaios reamostrados dentro de cada participante; as diferenças "
+                    "entre pares são testadas trocando os rótulos dos ensaios de cada participante."
+                )
+                reamostras_lote = st.number_input(
+                    "Reamostragens (bootstrap e permutação)",
+                    min_value=100,
+                    max_value=100_000,
+                    value=N_RESAMPLES,
+                    step=1000,
+                    key="lote_reamostras",
+                )
+                if st.toggle("Calcular", key="lote_ic"):
+                    mostrar_intervalos(intervalos_dos_ensaios(chave_lote, lote["ensaios"], int(reamostras_lote)))
 
-            report = classification_report(y_test, y_pred)
-            st.markdown("### Relatório de classificação (IA)")
-            st.text(report)
+# ==========================
+# TAB 5 – BANCO DE SESSÕES
+# ==========================
+with tab_banco:
+    st.subheader("Banco local de sessões")
+    st.write("""
+    As sessões importadas aqui ficam em um banco SQLite local, com índices por
+    sessão, estímulo e tempo, e não precisam ser enviadas de novo: a aba de
+    análise abre qualquer sessão guardada e as consultas abaixo são agregadas
+    no próprio banco, sem reler os arquivos.
+    """)
 
-        st.success("Análise com IA concluída.")
+    arquivos_banco = st.file_uploader(
+        "Importar arquivos JSON/NPZ/ETZ",
+        type=["json", "npz", "etz"],
+        accept_multiple_files=True,
+        key="files_banco",
+        max_upload_size=MAX_UPLOAD_MB,
+    )
+    arquivos_banco = conferir_upload("files_banco", arquivos_banco)
+    sessoes_banco = sessoes_do_servidor("...ou importar um diretório com as sessões", "dir_banco")
+    if st.button("Importar", key="btn_importar", disabled=not (arquivos_banco or sessoes_banco)):
+        fontes_banco = [(f.getvalue(), f.name) for f in arquivos_banco or []]
+        fontes_banco += [(path, path) for path in sessoes_banco]
+        barra = st.progress(0.0, text="Importando sessões...")
+        novas, erros = 0, []
+        with SessionStore() as banco:
+            for i, (fonte, nome) in enumerate(fontes_banco):
+                try:
+                    novas += banco.ingest(fonte, name=nome)[1]
+                except (KeyError, ValueError) as e:
+                    erros.append(f"{nome}: {e}")
+                barra.progress((i + 1) / len(fontes_banco), text=f"{i + 1}/{len(fontes_banco)} sessões")
+        st.success(
+            f"{novas} sessões importadas; {len(fontes_banco) - novas - len(erros)} já estavam no banco."
+        )
+        for erro in erros:
+            st.warning(erro)
+
+    sessoes = sessoes_do_banco()
+    if sessoes.empty:
+        st.info("Nenhuma sessão no banco ainda.")
+    else:
+        st.markdown("### Sessões guardadas")
+        st.dataframe(sessoes.drop(columns="hash"), hide_index=True)
+
+        st.markdown("### Atenção agregada")
+        with SessionStore() as banco:
+            cores_banco, posicoes_banco = banco.colors(), banco.positions()
+        col_part, col_cor, col_pos = st.columns(3)
+        filtro_participantes = col_part.multiselect(
+            "Participantes", sorted(sessoes["participante"].unique()), key="banco_filtro_participantes"
+        )
+        filtro_cores = col_cor.multiselect("Cores", cores_banco, key="banco_filtro_cores")
+        filtro_posicoes = col_pos.multiselect("Posições", posicoes_banco, key="banco_filtro_posicoes")
+
+        col_por, col_inicio, col_fim = st.columns([2, 1, 1])
+        agrupar_por = col_por.multiselect(
+            "Agrupar por",
+            list(ROTULOS_AGRUPAMENTO),
+            default=["participante", COLOR],
+            format_func=ROTULOS_AGRUPAMENTO.get,
+            key="banco_agrupar",
+        )
+        inicio_banco = col_inicio.number_input("Desde (s)", min_value=0.0, value=None, key="banco_inicio")
+        fim_banco = col_fim.number_input("Até (s)", min_value=0.0, value=None, key="banco_fim")
+
+        inicio_consulta = time.perf_counter()
+        with SessionStore() as banco:
+            atencao_banco = banco.attention(
+                by=agrupar_por,
+                participants=filtro_participantes,
+                colors=filtro_cores,
+                positions=filtro_posicoes,
+                start_ms=None if inicio_banco is None else inicio_banco * 1000.0,
+                end_ms=None if fim_banco is None else fim_banco * 1000.0,
+            )
+        st.caption(
+            f"Agregado no SQLite em {(time.perf_counter() - inicio_consulta) * 1000:.0f} ms "
+            "(tempo desde o primeiro registro de cada sessão, não o timestamp bruto do WebGazer)."
+        )
+        st.dataframe(atencao_banco, hide_index=True)
+
+        with st.expander("Remover uma sessão do banco"):
+            remover = st.selectbox(
+                "Sessão",
+                sessoes["sessao"].tolist(),
+                format_func=lambda i: f"{i} · {sessoes.set_index('sessao').at[i, 'participante']}",
+                key="banco_remover",
+            )
+            if st.button("Remover", key="btn_remover"):
+                with SessionStore() as banco:
+                    banco.delete(int(remover))
+                st.rerun()
@@ -0,0 +1,21 @@
+"""Análise das sessões de eye-tracking coletadas pelo experimento WebGazer."""
+
+from eyetracking.analysis import load_session
+from eyetracking.columnar import is_columnar, read_columnar, write_columnar
+from eyetracking.compact import is_compact, read_compact, write_compact
+from eyetracking.ingest import POSITIONS, position_from_id, read_session
+from eyetracking.pipeline import run_pipeline
+
+__all__ = [
+    "POSITIONS",
+    "is_columnar",
+    "is_compact",
+    "load_session",
+    "position_from_id",
+    "read_columnar",
+    "read_compact",
+    "read_session",
+    "run_pipeline",
+    "write_columnar",
+    "write_compact",
+]
@@ -0,0 +1,3 @@
+from eyetracking.cli import main
+
+main()
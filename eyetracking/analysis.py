@@ -0,0 +1,136 @@
+"""Etapas da análise de uma sessão: leitura, limpeza, dt e agregações.
+
+Não dependem do Streamlit: as abas do app, a análise em lote e a linha de
+comando (``python -m eyetracking``) usam as mesmas funções.
+"""
+
+import io
+import os
+
+import numpy as np
+
+from eyetracking.columnar import is_columnar, read_columnar
+from eyetracking.compact import is_compact, read_compact
+from eyetracking.ingest import position_from_id, read_session
+from eyetracking.profiling import stage, staged
+
+COLOR = "nearestStimulusColor"
+POSITION = "nearestPosition"
+
+# dt usado quando não há amostras suficientes para estimá-lo
+DEFAULT_DT_MS = 30.0
+
+
+def load_session(source, start=0):
+    """Lê uma sessão JSON, ``.npz`` ou ``.etz`` a partir de um caminho ou de bytes.
+
+    Retorna ``(df, posicao_reconstruida)``; ``posicao_reconstruida`` indica se
+    ``nearestPosition`` foi reconstruída a partir de ``nearestStimulusId``.
+    ``start`` (só ``.npz``/``.etz``) lê apenas as amostras a partir dessa linha.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            head = f.read(4)
+        if is_columnar(head):
+            df = read_columnar(source, start)
+        elif is_compact(head):
+            df = read_compact(source, start)
+        else:
+            with open(source, "rb") as f:
+                df = _read_json(f, start)
+    elif is_columnar(source):
+        df = read_columnar(source, start)
+    elif is_compact(source):
+        df = read_compact(source, start)
+    else:
+        df = _read_json(io.BytesIO(source), start)
+
+    if df.empty:
+        return df, False
+
+    # Reconstruir nearestPosition se não existir (a partir do padrão do triângulo)
+    posicao_reconstruida = False
+    if POSITION not in df.columns and "nearestStimulusId" in df.columns:
+        with stage("reconstrução da posição"):
+            df[POSITION] = position_from_id(df["nearestStimulusId"])
+        posicao_reconstruida = True
+
+    return df, posicao_reconstruida
+
+
+def _read_json(fp, start):
+    if start:
+        raise ValueError("Leitura a partir de uma linha só existe para .npz e .etz.")
+    return read_session(fp)
+
+
+@staged("limpeza (dropna)")
+def valid_samples(df, require_position=True):
+    """Amostras com estímulo associado (sem nulos nas colunas necessárias).
+
+    Levanta ``KeyError`` com a lista de colunas ausentes, se houver.
+    """
+    required_cols = [COLOR, "timestamp"]
+    if require_position or POSITION in df.columns:
+        required_cols.append(POSITION)
+
+    missing = [c for c in required_cols if c not in df.columns]
+    if missing:
+        raise KeyError(missing)
+
+    return df.dropna(subset=required_cols)
+
+
+@staged("estimativa do dt")
+def estimate_dt_ms(df_valid):
+    """Intervalo médio entre amostras consecutivas (ms).
+
+    A média das diferenças entre timestamps ordenados é uma soma telescópica,
+    ``(max - min) / (n - 1)``, então não é preciso ordenar a coluna.
+    """
+    t = df_valid["timestamp"].to_numpy(np.float64)
+    if len(t) < 2:
+        return DEFAULT_DT_MS
+    return float((t.max() - t.min()) / (len(t) - 1))
+
+
+@staged("taxa de amostragem")
+def sampling_stats(df):
+    """Taxa de amostragem obtida e jitter, a partir dos timestamps gravados.
+
+    Usa todas as amostras com timestamp (com ou sem estímulo). O jitter é o
+    desvio padrão dos intervalos entre amostras consecutivas.
+    """
+    t = np.sort(df["timestamp"].to_numpy(np.float64, na_value=np.nan))
+    t = t[np.isfinite(t)]
+    dt = np.diff(t) if len(t) > 1 else np.array([np.nan])
+    mean = float(dt.mean())
+    return {
+        "amostras": len(t),
+        "taxa_hz": 1000.0 / mean if mean > 0 else float("nan"),
+        "dt_medio_ms": mean,
+        "jitter_ms": float(dt.std()),
+        "dt_p95_ms": float(np.percentile(dt, 95)),
+        "maior_intervalo_ms": float(dt.max()),
+    }
+
+
+def attention_by(df_valid, group_cols, dt_s):
+    """Número de amostras e tempo estimado de atenção por grupo."""
+    with stage(f"groupby {' + '.join(group_cols)}"):
+        table = (
+            df_valid.groupby(group_cols, observed=True)["timestamp"]
+            .count()
+            .reset_index(name="num_samples")
+        )
+        table["tempo_atencao_s"] = table["num_samples"] * dt_s
+        return table
+
+
+def attention_tables(df_valid, dt_s):
+    """Tabelas de atenção por cor, por posição e por cor + posição."""
+    tables = {"cor": attention_by(df_valid, [COLOR], dt_s)}
+    if POSITION in df_valid.columns:
+        tables["posicao"] = attention_by(df_valid, [POSITION], dt_s)
+        tables["agg"] = attention_by(df_valid, [COLOR, POSITION], dt_s)
+    return tables
@@ -0,0 +1,301 @@
+"""Áreas de interesse (AOIs) e reclassificação das amostras gravadas.
+
+No navegador, cada amostra recebe o estímulo mais próximo entre os três do
+triângulo, sem distância máxima. Este módulo permite reclassificar sessões
+já gravadas com outras áreas: círculos, retângulos e polígonos em pixels da
+página, definidos em uma lista de dicionários (ou em um arquivo JSON)::
+
+    [
+        {"nome": "topo", "forma": "circulo", "centro": [960, 390], "raio": 60},
+        {"nome": "menu", "forma": "retangulo", "limites": [0, 0, 1920, 40]},
+        {"nome": "logo", "forma": "poligono", "vertices": [[0, 0], [90, 0], [45, 80]]}
+    ]
+
+A busca usa uma grade uniforme: cada AOI é registrada nas células que sua
+caixa envolvente cobre, e cada amostra só é testada contra as AOIs da sua
+célula. Com AOIs sobrepostas, vence a AOI de centro mais próximo (o mesmo
+critério do navegador). Todas as etapas são vetorizadas, em blocos de
+amostras.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from eyetracking.analysis import COLOR, POSITION
+from eyetracking.ingest import ID_COLUMN, POSITIONS
+from eyetracking.profiling import staged
+
+SHAPES = ("circulo", "retangulo", "poligono")
+CIRCLE, RECT, POLYGON = range(3)
+
+# Geometria do experimento (TRIANGLE_OFFSETS em frontend/index.html)
+TRIANGLE_OFFSETS = {"topo": (0, -150), "baixo-esquerda": (-130, 75), "baixo-direita": (130, 75)}
+STIMULUS_RADIUS_PX = 40.0
+NUM_CIRCLES = len(POSITIONS)
+
+CHUNK_SAMPLES = 1 << 18
+
+
+def estimate_center(df_valid):
+    """Centro da janela estimado pela mediana do olhar durante os estímulos.
+
+    O centro do triângulo coincide com o centro da janela do experimento.
+    """
+    return float(df_valid["x"].median()), float(df_valid["y"].median())
+
+
+def triangle_layout(center_x, center_y, radius=STIMULUS_RADIUS_PX):
+    """AOIs circulares nas posições do triângulo do experimento.
+
+    O centro é o centro da janela do experimento (``innerWidth / 2``,
+    ``innerHeight / 2``). Com ``radius=np.inf`` reproduz a regra do navegador
+    (estímulo mais próximo, sem distância máxima).
+    """
+    return [
+        {"nome": label, "forma": "circulo", "centro": [center_x + dx, center_y + dy], "raio": radius}
+        for label, (dx, dy) in TRIANGLE_OFFSETS.items()
+    ]
+
+
+class AOISet:
+    """Conjunto de AOIs com índice em grade para classificação em massa."""
+
+    def __init__(self, specs, cell_size=None):
+        specs = list(specs)
+        if not specs:
+            raise ValueError("Nenhuma AOI definida.")
+        self.names = [str(s["nome"]) for s in specs]
+        self.colors = [s.get("cor") for s in specs]
+
+        n = len(specs)
+        self.kind = np.empty(n, dtype=np.int8)
+        self.center = np.empty((n, 2))
+        self.radius = np.zeros(n)
+        self.bounds = np.empty((n, 4))  # x0, y0, x1, y1
+        polygons = {}
+        for i, spec in enumerate(specs):
+            shape = spec.get("forma")
+            if shape == "circulo":
+                cx, cy = map(float, spec["centro"])
+                r = float(spec["raio"])
+                self.kind[i] = CIRCLE
+                self.center[i] = cx, cy
+                self.radius[i] = r
+                self.bounds[i] = cx - r, cy - r, cx + r, cy + r
+            elif shape == "retangulo":
+                x0, y0, x1, y1 = map(float, spec["limites"])
+                x0, x1 = min(x0, x1), max(x0, x1)
+                y0, y1 = min(y0, y1), max(y0, y1)
+                self.kind[i] = RECT
+                self.center[i] = (x0 + x1) / 2, (y0 + y1) / 2
+                self.bounds[i] = x0, y0, x1, y1
+            elif shape == "poligono":
+                vertices = np.asarray(spec["vertices"], dtype=np.float64)
+                if vertices.ndim != 2 or vertices.shape[1] != 2 or len(vertices) < 3:
+                    raise ValueError(f"AOI {self.names[i]!r}: o polígono precisa de 3 ou mais vértices [x, y].")
+                self.kind[i] = POLYGON
+                self.center[i] = vertices.mean(axis=0)
+                self.bounds[i] = *vertices.min(axis=0), *vertices.max(axis=0)
+                polygons[i] = vertices
+            else:
+                raise ValueError(f"AOI {self.names[i]!r}: forma deve ser uma de {SHAPES}, não {shape!r}.")
+
+        # Polígonos com o mesmo número de vértices (repete o último; arestas
+        # degeneradas não cruzam o raio do teste par/ímpar)
+        self.polygon_row = np.full(n, -1, dtype=np.intp)
+        width = max((len(v) for v in polygons.values()), default=0)
+        self.polygons = np.empty((len(polygons), width, 2))
+        for row, (i, vertices) in enumerate(polygons.items()):
+            self.polygon_row[i] = row
+            self.polygons[row, :len(vertices)] = vertices
+            self.polygons[row, len(vertices):] = vertices[-1]
+
+        self._build_grid(cell_size)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _build_grid(self, cell_size):
+        # Com raio infinito (regra do navegador) a grade tem uma célula só
+        bounds = self.bounds.copy()
+        unbounded = ~np.isfinite(bounds).all(axis=1)
+        self.unbounded = np.flatnonzero(unbounded)
+        finite = bounds[~unbounded]
+
+        if len(finite) == 0:
+            self.origin = np.zeros(2)
+            self.cell = 1.0
+            self.shape = (1, 1)
+            self.cell_keys = np.empty(0, dtype=np.int64)
+            self.cell_start = np.zeros(1, dtype=np.intp)
+            self.cell_aois = np.empty(0, dtype=np.intp)
+            return
+
+        extent = np.maximum(finite[:, 2] - finite[:, 0], finite[:, 3] - finite[:, 1])
+        if cell_size is None:
+            # Uma AOI típica cobre poucas células
+            cell_size = max(float(np.median(extent)), 1.0)
+        self.cell = float(cell_size)
+        self.origin = finite[:, :2].min(axis=0)
+        top = finite[:, 2:].max(axis=0)
+        self.shape = tuple(int(v) + 1 for v in np.floor((top - self.origin) / self.cell))
+
+        aois = np.flatnonzero(~unbounded)
+        lo = np.floor((finite[:, :2] - self.origin) / self.cell).astype(np.int64)
+        hi = np.floor((finite[:, 2:] - self.origin) / self.cell).astype(np.int64)
+        nx, ny = hi[:, 0] - lo[:, 0] + 1, hi[:, 1] - lo[:, 1] + 1
+        counts = nx * ny
+
+        # Expande cada AOI nas células (ix, iy) da sua caixa envolvente
+        owner = np.repeat(np.arange(len(aois)), counts)
+        k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        ix = lo[owner, 0] + k // ny[owner]
+        iy = lo[owner, 1] + k % ny[owner]
+        keys = ix * self.shape[1] + iy
+
+        order = np.argsort(keys, kind="stable")
+        keys, owner = keys[order], aois[owner[order]]
+        self.cell_keys, first = np.unique(keys, return_index=True)
+        self.cell_start = np.append(first, len(keys))
+        self.cell_aois = owner
+
+    def _candidates(self, x, y):
+        """Pares (amostra, AOI) em que a amostra cai na célula da AOI."""
+        sample = np.empty(0, dtype=np.intp)
+        aoi = np.empty(0, dtype=np.intp)
+        if len(self.cell_keys):
+            ix = np.floor((x - self.origin[0]) / self.cell)
+            iy = np.floor((y - self.origin[1]) / self.cell)
+            inside = np.flatnonzero((ix >= 0) & (ix < self.shape[0]) & (iy >= 0) & (iy < self.shape[1]))
+            keys = ix[inside].astype(np.int64) * self.shape[1] + iy[inside].astype(np.int64)
+
+            pos = np.minimum(np.searchsorted(self.cell_keys, keys), len(self.cell_keys) - 1)
+            found = self.cell_keys[pos] == keys
+            inside, pos = inside[found], pos[found]
+            start = self.cell_start[pos]
+            counts = self.cell_start[pos + 1] - start
+
+            sample = np.repeat(inside, counts)
+            k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            aoi = self.cell_aois[np.repeat(start, counts) + k]
+
+        if len(self.unbounded):
+            sample = np.concatenate([sample, np.repeat(np.arange(len(x)), len(self.unbounded))])
+            aoi = np.concatenate([aoi, np.tile(self.unbounded, len(x))])
+        return sample, aoi
+
+    def _contains(self, px, py, aoi):
+        """Teste exato de cada par (ponto, AOI)."""
+        kind = self.kind[aoi]
+        hit = np.zeros(len(aoi), dtype=bool)
+
+        sel = kind == CIRCLE
+        a = aoi[sel]
+        hit[sel] = (px[sel] - self.center[a, 0]) ** 2 + (py[sel] - self.center[a, 1]) ** 2 <= self.radius[a] ** 2
+
+        sel = kind == RECT
+        b = self.bounds[aoi[sel]]
+        hit[sel] = (px[sel] >= b[:, 0]) & (px[sel] <= b[:, 2]) & (py[sel] >= b[:, 1]) & (py[sel] <= b[:, 3])
+
+        sel = np.flatnonzero(kind == POLYGON)
+        if len(sel):
+            v = self.polygons[self.polygon_row[aoi[sel]]]       # (pares, vértices, 2)
+            w = np.roll(v, 1, axis=1)
+            qx, qy = px[sel, None], py[sel, None]
+            crosses = (v[..., 1] > qy) != (w[..., 1] > qy)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                x_cross = (w[..., 0] - v[..., 0]) * (qy - v[..., 1]) / (w[..., 1] - v[..., 1]) + v[..., 0]
+            hit[sel] = (np.count_nonzero(crosses & (qx < x_cross), axis=1) % 2) == 1
+        return hit
+
+    def assign(self, x, y, chunk_samples=CHUNK_SAMPLES):
+        """Índice da AOI de cada ponto (-1 = fora de todas; NaN fica fora)."""
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        out = np.full(len(x), -1, dtype=np.int64)
+        for lo in range(0, len(x), chunk_samples):
+            cx, cy = x[lo:lo + chunk_samples], y[lo:lo + chunk_samples]
+            sample, aoi = self._candidates(cx, cy)
+            px, py = cx[sample], cy[sample]
+            hit = self._contains(px, py, aoi)
+            sample, aoi, px, py = sample[hit], aoi[hit], px[hit], py[hit]
+
+            # Entre as AOIs que contêm o ponto, a de centro mais próximo; só
+            # os pontos dentro de mais de uma AOI precisam ser ordenados
+            shared = np.zeros(len(cx) + 1, dtype=np.int64)
+            np.add.at(shared, sample + 1, 1)
+            multi = shared[sample + 1] > 1
+            out[lo + sample[~multi]] = aoi[~multi]
+            if multi.any():
+                sample, aoi, px, py = sample[multi], aoi[multi], px[multi], py[multi]
+                dist = (px - self.center[aoi, 0]) ** 2 + (py - self.center[aoi, 1]) ** 2
+                order = np.lexsort((aoi, dist, sample))
+                sample, aoi = sample[order], aoi[order]
+                first = np.ones(len(sample), dtype=bool)
+                first[1:] = sample[1:] != sample[:-1]
+                out[lo + sample[first]] = aoi[first]
+        return out
+
+
+def load_aois(source, cell_size=None):
+    """``AOISet`` a partir de um caminho de JSON, de uma lista de dicionários ou de um ``AOISet``."""
+    if isinstance(source, AOISet):
+        return source
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, encoding="utf-8") as f:
+            source = json.load(f)
+    return AOISet(source, cell_size=cell_size)
+
+
+def _cycle_colors(df):
+    """Cor de cada (ciclo de estímulos, posição) observada na sessão.
+
+    Os ids dos estímulos são sequenciais, ``NUM_CIRCLES`` por ciclo, na ordem
+    de ``POSITIONS``; então ``id // 3`` é o ciclo.
+    """
+    labeled = df[[ID_COLUMN, COLOR, POSITION]].dropna()
+    cycles = labeled[ID_COLUMN].to_numpy(np.int64) // NUM_CIRCLES
+    table = pd.DataFrame({"ciclo": cycles, POSITION: labeled[POSITION].astype(str).to_numpy(),
+                          COLOR: labeled[COLOR].astype(str).to_numpy()})
+    return table.drop_duplicates(["ciclo", POSITION]).set_index(["ciclo", POSITION])[COLOR]
+
+
+@staged("reclassificação por AOIs")
+def relabel(df, aois, only_visible=True):
+    """Cópia de ``df`` com ``nearestPosition``/``nearestStimulusColor`` refeitos pelas AOIs.
+
+    ``nearestPosition`` passa a ser o nome da AOI que contém a amostra (nulo
+    fora de todas). A cor vem do campo ``cor`` da AOI, se houver; senão, é a
+    cor que o estímulo daquela posição tinha no ciclo da amostra (lida das
+    próprias amostras da sessão, então só funciona com AOIs nomeadas como as
+    posições do triângulo). Com ``only_visible=True``, amostras gravadas sem
+    estímulo na tela (``nearestStimulusId`` nulo) ficam sem AOI.
+
+    O resultado entra direto em ``valid_samples``/``attention_tables`` e em
+    ``detect_fixations``.
+    """
+    aois = load_aois(aois)
+    idx = aois.assign(df["x"].to_numpy(np.float64, na_value=np.nan), df["y"].to_numpy(np.float64, na_value=np.nan))
+
+    has_id = ID_COLUMN in df.columns
+    if only_visible and has_id:
+        idx[df[ID_COLUMN].isna().to_numpy()] = -1
+
+    names = np.asarray(aois.names, dtype=object)
+    out = df.copy()
+    position = np.where(idx >= 0, names[np.maximum(idx, 0)], None)
+    out[POSITION] = pd.Categorical(position, categories=sorted(set(aois.names)))
+
+    fixed = np.asarray(aois.colors, dtype=object)
+    color = np.where(idx >= 0, fixed[np.maximum(idx, 0)], None)
+    missing = (idx >= 0) & pd.isna(color)
+    if missing.any() and has_id and COLOR in df.columns and POSITION in df.columns:
+        ids = df[ID_COLUMN].to_numpy(np.int64, na_value=-NUM_CIRCLES)[missing]
+        keys = pd.MultiIndex.from_arrays([ids // NUM_CIRCLES, position[missing]])
+        color[missing] = _cycle_colors(df).reindex(keys).to_numpy(dtype=object)
+    color[pd.isna(color)] = None
+    out[COLOR] = pd.Categorical(color, categories=sorted({c for c in color if c is not None}))
+    return out
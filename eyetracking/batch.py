@@ -0,0 +1,145 @@
+"""Análise em lote de várias sessões (um arquivo por participante).
+
+Cada sessão é lida, limpa e agregada em um processo separado
+(``ProcessPoolExecutor``); só as tabelas agregadas, pequenas, voltam para o
+processo principal, onde são concatenadas com a coluna ``participante``. A
+tabela ``ensaios`` tem a atenção de cada estímulo em cada ensaio
+(``eyetracking.trials``), usada nos intervalos de confiança e testes entre
+participantes (``eyetracking.resampling``).
+
+Pela linha de comando::
+
+    python -m eyetracking lote pasta_ou_arquivos... [-o pasta_saida] [-j N]
+"""
+
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from eyetracking.pipeline import run_pipeline
+from eyetracking.trials import trial_metrics
+
+PARTICIPANT = "participante"
+SESSION_EXTENSIONS = (".json", ".npz", ".etz")
+TABLES = ("cor", "posicao", "agg", "ensaios")
+
+
+def find_sessions(paths):
+    """Expande diretórios em arquivos de sessão (``.json``/``.npz``/``.etz``), em ordem."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(SESSION_EXTENSIONS):
+                    found.append(os.path.join(path, name))
+        else:
+            found.append(path)
+    return found
+
+
+def participant_names(names):
+    """Rótulo de cada participante a partir do nome do arquivo (sem repetição)."""
+    labels = []
+    used = {}
+    for name in names:
+        label = os.path.splitext(os.path.basename(name))[0]
+        used[label] = used.get(label, 0) + 1
+        labels.append(label if used[label] == 1 else f"{label}_{used[label]}")
+    return labels
+
+
+def analyze_session(participant, source, aois=None):
+    """Processa uma sessão; roda dentro dos processos do pool.
+
+    ``source`` é um caminho ou os bytes do arquivo; ``aois`` segue
+    ``run_pipeline``. Retorna um dicionário com o resumo da sessão e as
+    tabelas de atenção, ou com ``erro``.
+    """
+    try:
+        result = run_pipeline(source, train=False, aois=aois)
+        _, estimulos = trial_metrics(result["df"])
+    except KeyError as e:
+        return {PARTICIPANT: participant, "erro": f"colunas ausentes: {e.args[0]}"}
+    except Exception as e:
+        return {PARTICIPANT: participant, "erro": str(e)}
+
+    return {
+        PARTICIPANT: participant,
+        "resumo": {
+            PARTICIPANT: participant,
+            "amostras": len(result["df"]),
+            "amostras_validas": len(result["df_valid"]),
+            "dt_medio_ms": result["dt_medio_ms"],
+        },
+        "tabelas": dict(result["tabelas"], ensaios=estimulos),
+    }
+
+
+def _analyze_item(item):
+    return analyze_session(*item)
+
+
+def _tagged(frame, participant):
+    frame = frame.copy()
+    frame.insert(0, PARTICIPANT, participant)
+    # Categorias diferentes entre sessões: concatena como texto
+    for col in frame.columns:
+        if isinstance(frame[col].dtype, pd.CategoricalDtype):
+            frame[col] = frame[col].astype(str)
+    return frame
+
+
+def merge_results(results):
+    """Junta os resultados por participante em tabelas únicas.
+
+    Retorna um dicionário com ``resumo``, ``cor``, ``posicao``, ``agg``,
+    ``ensaios`` (todas com a coluna ``participante``) e ``erros``.
+    """
+    merged = {"resumo": pd.DataFrame([r["resumo"] for r in results if "resumo" in r])}
+    for name in TABLES:
+        parts = [_tagged(r["tabelas"][name], r[PARTICIPANT]) for r in results if name in r.get("tabelas", {})]
+        merged[name] = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+    merged["erros"] = pd.DataFrame(
+        [{PARTICIPANT: r[PARTICIPANT], "erro": r["erro"]} for r in results if "erro" in r],
+        columns=[PARTICIPANT, "erro"],
+    )
+    return merged
+
+
+def analyze_batch(sources, names=None, max_workers=None, progress=None, aois=None):
+    """Analisa várias sessões em paralelo e devolve as tabelas combinadas.
+
+    ``sources`` são caminhos ou bytes; ``names`` (opcional) dá o nome de cada
+    arquivo, usado como rótulo do participante (para caminhos, o padrão é o
+    próprio caminho). ``max_workers`` segue ``ProcessPoolExecutor`` (padrão:
+    número de núcleos). ``progress(concluidas, total)`` é chamado a cada
+    sessão processada. ``aois`` (definições, não ``AOISet``) reclassifica
+    todas as sessões com as mesmas áreas de interesse.
+    """
+    sources = list(sources)
+    if names is None:
+        names = [str(s) for s in sources]
+    if isinstance(aois, (str, os.PathLike)):
+        with open(aois, encoding="utf-8") as f:
+            aois = json.load(f)
+    items = [(name, source, aois) for name, source in zip(participant_names(names), sources)]
+    workers = min(max_workers or os.cpu_count() or 1, len(items))
+
+    results = []
+    if workers <= 1:
+        for item in items:
+            results.append(_analyze_item(item))
+            if progress:
+                progress(len(results), len(items))
+    else:
+        # "spawn" evita herdar via fork as threads do servidor do Streamlit
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            for result in pool.map(_analyze_item, items):
+                results.append(result)
+                if progress:
+                    progress(len(results), len(items))
+    return merge_results(results)
@@ -0,0 +1,197 @@
+"""Benchmark das etapas da análise em sessões sintéticas de vários tamanhos.
+
+Para cada escala (número de amostras), gera uma sessão com
+``eyetracking.synthetic`` (a mesma semente gera os mesmos dados em todas as
+revisões) e mede:
+
+- ``leitura (.npz)`` e ``leitura (JSON)`` (o JSON só até ``JSON_MAX_SAMPLES``);
+- ``limpeza``: ``valid_samples``;
+- ``agregação``: dt e tabelas de atenção por cor, posição e cor + posição;
+- ``AOIs``: reclassificação pelas AOIs do triângulo;
+- ``treino``: rótulo e ``train_attention_model`` (tabela cor + posição);
+- ``treino por amostra``: ``train_sample_model`` com uma época.
+
+Cada etapa roda ``repeats`` vezes (tempo mediano e mínimo) e mais uma vez
+sob ``tracemalloc`` para o pico de memória, que não entra nos tempos. Os
+resultados levam a revisão do git e podem ser acrescentados a um arquivo
+JSONL para comparar revisões::
+
+    python -m eyetracking benchmark [-n 10000 100000 1000000] [-r 3] [-o benchmark.jsonl]
+    python -m eyetracking benchmark --comparar benchmark.jsonl
+"""
+
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+
+import pandas as pd
+
+from eyetracking.profiling import profile, stage
+
+SCALES = (10**4, 10**5, 10**6, 10**7)
+REPEATS = 3
+# Acima disso o JSON teria gigabytes; a leitura do JSON é pulada
+JSON_MAX_SAMPLES = 10**6
+STAGES = (
+    "leitura (.npz)",
+    "leitura (JSON)",
+    "limpeza",
+    "agregação",
+    "AOIs",
+    "treino",
+    "treino por amostra",
+)
+
+
+def revision(path=None):
+    """Revisão do git do pacote (``+`` no fim se houver mudanças não gravadas)."""
+    path = path or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        out = subprocess.run(
+            ["git", "describe", "--always", "--dirty=+"], capture_output=True, text=True, check=True, cwd=path
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecida"
+    return out.stdout.strip()
+
+
+def dataset(data_dir, n_samples, seed=0, ext="npz"):
+    """Caminho da sessão sintética de ``n_samples`` em ``data_dir`` (gerada se faltar)."""
+    from eyetracking.synthetic import write_synthetic
+
+    path = os.path.join(data_dir, f"sintetico_{n_samples}_s{seed}.{ext}")
+    if not os.path.exists(path):
+        write_synthetic(path + ".tmp." + ext, n_samples, seed=seed)
+        os.replace(path + ".tmp." + ext, path)
+    return path
+
+
+def _stages(paths):
+    """Funções de cada etapa; cada uma usa o resultado das anteriores."""
+    from eyetracking.analysis import attention_tables, estimate_dt_ms, load_session, valid_samples
+    from eyetracking.aoi import relabel, triangle_layout
+    from eyetracking.model import label_high_attention, train_attention_model
+    from eyetracking.sample_model import train_sample_model
+    from eyetracking.synthetic import window_center
+
+    state = {}
+
+    def read_npz():
+        state["df"], _ = load_session(paths["npz"])
+
+    def read_json():
+        load_session(paths["json"])
+
+    def clean():
+        state["df_valid"] = valid_samples(state["df"])
+
+    def aggregate():
+        df_valid = state["df_valid"]
+        state["agg"] = attention_tables(df_valid, estimate_dt_ms(df_valid) / 1000.0)["agg"]
+
+    def aois():
+        relabel(state["df"], triangle_layout(*window_center()))
+
+    def train():
+        agg_rotulada, _ = label_high_attention(state["agg"])
+        train_attention_model(agg_rotulada)
+
+    def train_samples():
+        train_sample_model([paths["npz"]], epochs=1, center=window_center())
+
+    funcs = {
+        "leitura (.npz)": read_npz,
+        "leitura (JSON)": read_json if "json" in paths else None,
+        "limpeza": clean,
+        "agregação": aggregate,
+        "AOIs": aois,
+        "treino": train,
+        "treino por amostra": train_samples,
+    }
+    return {name: funcs[name] for name in STAGES if funcs[name] is not None}
+
+
+def run_benchmark(scales=SCALES, repeats=REPEATS, memory=True, data_dir=None, seed=0, progress=None):
+    """Mede as etapas em cada escala. Retorna um DataFrame com uma linha por (escala, etapa).
+
+    ``data_dir`` guarda as sessões geradas para as próximas execuções
+    (padrão: diretório temporário, apagado no fim). ``progress(escala,
+    etapa)`` é chamado antes de cada etapa.
+    """
+    with tempfile.TemporaryDirectory(prefix="eyetracking-bench-") as tmpdir:
+        data_dir = data_dir or tmpdir
+        os.makedirs(data_dir, exist_ok=True)
+        common = {
+            "revisao": revision(),
+            "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "maquina": platform.platform(),
+            "processadores": os.cpu_count(),
+        }
+        rows = []
+        for n in scales:
+            paths = {"npz": dataset(data_dir, n, seed)}
+            if n <= JSON_MAX_SAMPLES:
+                paths["json"] = dataset(data_dir, n, seed, ext="json")
+            for name, func in _stages(paths).items():
+                if progress:
+                    progress(n, name)
+                times = []
+                for _ in range(repeats):
+                    gc.collect()
+                    start = time.perf_counter()
+                    func()
+                    times.append(time.perf_counter() - start)
+                peak = None
+                if memory:
+                    gc.collect()
+                    with profile(memory=True) as profiler:
+                        with stage(name):
+                            func()
+                    peak = profiler.records[name]["pico_mb"]
+                median = statistics.median(times)
+                rows.append(dict(
+                    common,
+                    escala=n,
+                    etapa=name,
+                    tempo_s=median,
+                    tempo_min_s=min(times),
+                    amostras_por_s=n / median if median > 0 else float("inf"),
+                    pico_mb=peak,
+                    repeticoes=repeats,
+                ))
+        return pd.DataFrame(rows)
+
+
+def save_results(results, path):
+    """Acrescenta os resultados a ``path`` (uma linha JSON por escala e etapa)."""
+    with open(path, "a", encoding="utf-8") as f:
+        for row in results.to_dict("records"):
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+def load_results(path):
+    return pd.read_json(path, lines=True)
+
+
+def comparison(results, metric="tempo_s"):
+    """``metric`` por escala e etapa, uma coluna por revisão (na ordem em que rodaram).
+
+    Com mais de uma revisão, ``razao`` é a última dividida pela anterior
+    (abaixo de 1: ficou mais rápido ou mais leve). Cada revisão usa sua
+    execução mais recente.
+    """
+    results = results.sort_values("data")
+    order = list(dict.fromkeys(results["revisao"]))
+    latest = results.drop_duplicates(["revisao", "escala", "etapa"], keep="last")
+    table = latest.pivot(index=["escala", "etapa"], columns="revisao", values=metric)
+    stage_order = {name: i for i, name in enumerate(STAGES)}
+    table = table[order].sort_index(key=lambda idx: idx.map(stage_order) if idx.name == "etapa" else idx)
+    if len(order) > 1:
+        table["razao"] = table[order[-1]] / table[order[-2]]
+    return table
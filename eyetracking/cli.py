@@ -0,0 +1,510 @@
+"""Linha de comando: ``python -m eyetracking <comando> ...``.
+
+Comandos:
+
+- ``analisar``: pipeline completo de uma sessão (tabelas e classificador)
+- ``lote``: várias sessões em paralelo, com saída em CSV (e, com ``--ic``,
+  intervalos de confiança e comparações da atenção por ensaio)
+- ``converter``: JSON -> ``.npz`` colunar ou ``.etz`` compacto
+- ``prever``: aplica um modelo salvo a uma sessão, sem treinar
+- ``treinar-amostras``: classificador por amostra, treinado em blocos
+- ``buscar``: validação cruzada e busca de hiperparâmetros em paralelo
+- ``inicializacao``: tempo de partida a frio do app Streamlit
+- ``sintetico``: gera uma sessão sintética de qualquer tamanho
+- ``benchmark``: mede as etapas da análise em várias escalas
+- ``importar``: guarda sessões no banco local (SQLite)
+- ``consultar``: atenção agregada no banco local, por participante, cor,
+  posição ou intervalo de tempo
+- ``carga``: várias sessões simultâneas do app, para dimensionar o servidor
+"""
+
+import argparse
+import os
+import sys
+
+from eyetracking.analysis import COLOR, POSITION
+from eyetracking.resources import SESSION_BUDGET_MB, SHARED_CACHE_MB
+
+
+def _cmd_analisar(args):
+    if not args.perfil:
+        _analisar(args)
+        return
+    from eyetracking.analysis import sampling_stats
+    from eyetracking.profiling import profile
+
+    with profile(memory=args.memoria) as profiler:
+        result = _analisar(args)
+    print("\nTempo por etapa:")
+    print(profiler.table().to_string(index=False))
+    with open(args.perfil, "w", encoding="utf-8") as f:
+        f.write(profiler.to_json(sessao=args.sessao, amostragem=sampling_stats(result["df"])))
+    print(args.perfil)
+
+
+def _analisar(args):
+    from eyetracking.pipeline import run_pipeline
+
+    store = None
+    if args.salvar_modelo and not args.sem_modelo:
+        from eyetracking.model_store import ModelStore
+
+        store = ModelStore()
+    try:
+        result = run_pipeline(
+            args.sessao,
+            train=not args.sem_modelo,
+            aois=args.aois,
+            model_store=store,
+            smoothing=args.suavizar,
+            relabel_smoothed=args.reassociar,
+        )
+    except KeyError as e:
+        sys.exit(f"Colunas necessárias ausentes: {e.args[0]}")
+    except ValueError as e:
+        sys.exit(str(e))
+
+    tabelas = result["tabelas"]
+    print(f"Amostras: {len(result['df'])} (válidas: {len(result['df_valid'])})")
+    if args.suavizar:
+        print(f"Olhar suavizado ({args.suavizar})" + (", estímulo mais próximo refeito." if args.reassociar else "."))
+    if result["posicao_reconstruida"]:
+        print("nearestPosition reconstruída a partir de nearestStimulusId (mod 3).")
+    print(f"Intervalo médio estimado entre amostras: {result['dt_medio_ms']:.2f} ms")
+    print("\nTempo estimado de atenção por cor (s):")
+    print(tabelas["cor"].set_index(COLOR)["tempo_atencao_s"].to_string())
+    print("\nTempo estimado de atenção por posição (s):")
+    print(tabelas["posicao"].set_index(POSITION)["tempo_atencao_s"].to_string())
+
+    if args.fixacoes:
+        from eyetracking.fixations import detect_fixations, fixation_attention
+
+        _, fixacoes = detect_fixations(result["df"], args.fixacoes)
+        tabelas["fixacoes_cor"] = fixation_attention(fixacoes, [COLOR])
+        tabelas["fixacoes_posicao"] = fixation_attention(fixacoes, [POSITION])
+        print(f"\nFixações ({args.fixacoes.upper()}): {len(fixacoes)}")
+        print(tabelas["fixacoes_cor"].to_string(index=False))
+        print(tabelas["fixacoes_posicao"].to_string(index=False))
+
+    if args.ensaios:
+        from eyetracking.trials import trial_metrics, trial_summary
+
+        tabelas["ensaios"], tabelas["ensaios_estimulos"] = trial_metrics(result["df"])
+        tabelas["ensaios_cor"] = trial_summary(tabelas["ensaios_estimulos"], COLOR)
+        tabelas["ensaios_posicao"] = trial_summary(tabelas["ensaios_estimulos"], POSITION)
+        print(f"\nEnsaios: {len(tabelas['ensaios'])} (trocas de AOI por ensaio: {tabelas['ensaios']['trocas'].mean():.1f})")
+        print(tabelas["ensaios_cor"].to_string(index=False))
+        print(tabelas["ensaios_posicao"].to_string(index=False))
+
+    if not args.sem_modelo:
+        print(f"\nLimiar de alta atenção (mediana do tempo): {result['limiar']:.2f} s")
+        print(result["agg_rotulada"].to_string(index=False))
+        modelo = result["modelo"]
+        if modelo is None:
+            print("\nPoucos pontos agregados para treinar o modelo.")
+        else:
+            titulo = "Relatório de classificação" + ("" if modelo["holdout"] else " (treino = teste)")
+            print(f"\n{titulo}\n{modelo['relatorio']}")
+            if "chave_modelo" in result:
+                print(f"Modelo salvo: {result['chave_modelo']}")
+
+    if args.saida:
+        os.makedirs(args.saida, exist_ok=True)
+        for name, table in tabelas.items():
+            table.to_csv(os.path.join(args.saida, f"{name}.csv"), index=False)
+    return result
+
+
+def _cmd_lote(args):
+    from eyetracking.batch import analyze_batch, find_sessions
+
+    paths = find_sessions(args.entradas)
+    if not paths:
+        sys.exit("Nenhuma sessão .json/.npz/.etz encontrada.")
+    merged = analyze_batch(paths, max_workers=args.processos, aois=args.aois)
+
+    os.makedirs(args.saida, exist_ok=True)
+    for name, table in merged.items():
+        if name == "erros" and table.empty:
+            continue
+        path = os.path.join(args.saida, f"lote_{name}.csv")
+        table.to_csv(path, index=False)
+        print(path)
+    if args.ic and not merged["ensaios"].empty:
+        from eyetracking.resampling import compare_attention
+
+        results = compare_attention(merged["ensaios"], n_resamples=args.reamostras, max_workers=args.processos)
+        for col, (intervalos, comparacoes) in results.items():
+            name = "cor" if col == COLOR else "posicao"
+            for prefix, table in (("lote_ic", intervalos), ("lote_comparacoes", comparacoes)):
+                path = os.path.join(args.saida, f"{prefix}_{name}.csv")
+                table.to_csv(path, index=False)
+                print(path)
+
+
+def _cmd_converter(args):
+    from eyetracking.columnar import convert
+    from eyetracking.compact import convert_compact
+
+    if args.saida and len(args.entrada) > 1:
+        sys.exit("--saida só pode ser usado com um único arquivo de entrada.")
+    for src in args.entrada:
+        print((convert_compact if args.compacto else convert)(src, args.saida))
+
+
+def _descricao_modelo(info):
+    return f"{info['chave'][:12]} · {info.get('arquivo') or '?'} · {info.get('criado_em', '')}"
+
+
+def _cmd_prever(args):
+    from eyetracking.model import PREDICTION, predict_attention
+    from eyetracking.model_store import ModelStore
+    from eyetracking.pipeline import run_pipeline
+
+    store = ModelStore()
+    entries = store.entries()
+    if args.modelo is not None:
+        entries = [e for e in entries if e["chave"].startswith(args.modelo)]
+        if len(entries) > 1:
+            sys.exit(
+                f"{len(entries)} modelos começam com {args.modelo!r}; informe mais caracteres da chave:\n"
+                + "\n".join(_descricao_modelo(e) for e in entries)
+            )
+    if not entries:
+        if args.modelo is not None:
+            sys.exit(f"Nenhum modelo salvo com a chave {args.modelo!r}.")
+        sys.exit("Nenhum modelo salvo encontrado (treine com: analisar --salvar-modelo).")
+    escolhido = entries[0]
+    if args.modelo is None:
+        print(
+            f"Sem --modelo: usando o usado mais recentemente de {len(entries)} salvos ({_descricao_modelo(escolhido)}).",
+            file=sys.stderr,
+        )
+
+    try:
+        result = run_pipeline(args.sessao, train=False, aois=args.aois)
+    except KeyError as e:
+        sys.exit(f"Colunas necessárias ausentes: {e.args[0]}")
+    except ValueError as e:
+        sys.exit(str(e))
+
+    previsto = predict_attention(store.load(escolhido["chave"]), result["tabelas"]["agg"])
+    print(f"Modelo: {escolhido['chave']}")
+    print(previsto[[COLOR, POSITION, "tempo_atencao_s", PREDICTION]].to_string(index=False))
+    if args.saida:
+        previsto.to_csv(args.saida, index=False)
+
+
+def _cmd_treinar_amostras(args):
+    from eyetracking.batch import find_sessions
+    from eyetracking.sample_model import train_sample_model
+
+    paths = find_sessions(args.entradas)
+    if not paths:
+        sys.exit("Nenhuma sessão .json/.npz/.etz encontrada.")
+    try:
+        result = train_sample_model(
+            paths, epochs=args.epocas, chunk_samples=args.bloco, center=args.centro, aois=args.aois
+        )
+    except ValueError as e:
+        sys.exit(str(e))
+
+    for path, erro in result["erros"]:
+        print(f"Ignorada: {path} ({erro})")
+    print(f"Amostras: {result['amostras']}")
+    for etapa, d in result["desempenho"].items():
+        print(f"  {etapa}: {d['amostras']} amostras em {d['tempo_s']:.2f} s ({d['amostras_por_s']:,.0f} amostras/s)")
+    print(f"\nRelatório de classificação (amostras de teste)\n{result['relatorio']}")
+    if args.salvar:
+        import joblib
+
+        joblib.dump({k: result[k] for k in ("scaler", "modelo")}, args.salvar)
+        print(f"Modelo salvo: {args.salvar}")
+
+
+def _cmd_buscar(args):
+    from eyetracking.model import label_high_attention
+    from eyetracking.pipeline import run_pipeline
+    from eyetracking.search import SearchJob, search_data
+
+    try:
+        result = run_pipeline(args.sessao, train=False, aois=args.aois)
+        agg_rotulada, _ = label_high_attention(result["tabelas"]["agg"])
+        X, y = search_data(result["df"], agg_rotulada, args.dados)
+        job = SearchJob(
+            X, y, models=args.modelos, n_splits=args.folds, n_iter=args.aleatoria, max_workers=args.processos
+        )
+    except KeyError as e:
+        sys.exit(f"Colunas necessárias ausentes: {e.args[0]}")
+    except ValueError as e:
+        sys.exit(str(e))
+
+    print(f"{len(job.candidates)} candidatos x {job.n_splits} folds = {job.total} tarefas ({len(y)} exemplos)")
+    try:
+        shown = 0
+        while not job.done:
+            job.wait(0.5)
+            results = job.results()
+            for row in results.iloc[shown:].itertuples():
+                print(f"[{shown + 1}/{job.total}] {row.modelo} {row.parametros} fold {row.fold}: f1 {row.f1_macro:.3f}")
+                shown += 1
+    except KeyboardInterrupt:
+        job.cancel()
+        job.wait()
+        print("Busca cancelada.")
+
+    summary = job.summary()
+    print(f"\nConcluída em {job.elapsed:.1f} s. Melhores candidatos:")
+    print(summary.head(10).to_string(index=False))
+    if args.saida:
+        summary.to_csv(args.saida, index=False)
+
+
+def _cmd_inicializacao(args):
+    import json
+    import time
+
+    from eyetracking.startup import TIMINGS, startup_report, summary
+
+    report = startup_report(args.app, repeats=args.repeticoes)
+    for erro in report["erro"].dropna().unique():
+        print(f"Erro no app: {erro}")
+    print(report[list(TIMINGS)].to_string(float_format=lambda v: f"{v:.3f}"))
+    resumo = summary(report)
+    print("\nMediana:")
+    for name in TIMINGS:
+        print(f"  {name}: {resumo[name]:.3f}")
+    print(f"Bibliotecas carregadas na primeira execução: {', '.join(resumo['modulos'])}")
+    if args.saida:
+        with open(args.saida, "a", encoding="utf-8") as f:
+            f.write(json.dumps(dict(resumo, data=time.strftime("%Y-%m-%d %H:%M:%S"))) + "\n")
+
+
+def _cmd_sintetico(args):
+    from eyetracking.synthetic import write_synthetic
+
+    write_synthetic(args.saida, args.amostras, seed=args.semente, rate_hz=args.taxa)
+    print(args.saida)
+
+
+def _cmd_benchmark(args):
+    from eyetracking.benchmark import comparison, load_results, run_benchmark, save_results
+
+    fmt = "{:.4g}".format
+    if args.comparar:
+        print(comparison(load_results(args.comparar), args.metrica).to_string(float_format=fmt))
+        return
+    results = run_benchmark(
+        scales=args.amostras,
+        repeats=args.repeticoes,
+        memory=not args.sem_memoria,
+        data_dir=args.dados,
+        seed=args.semente,
+        progress=lambda n, etapa: print(f"{n} amostras: {etapa}...", file=sys.stderr),
+    )
+    columns = ["escala", "etapa", "tempo_s", "tempo_min_s", "amostras_por_s", "pico_mb"]
+    print(f"Revisão: {results['revisao'].iloc[0]}")
+    print(results[columns].to_string(index=False, float_format=fmt))
+    if args.saida:
+        save_results(results, args.saida)
+
+
+def _cmd_carga(args):
+    from eyetracking.loadtest import run_load_test
+
+    rodadas, resumo = run_load_test(
+        sessions=args.sessoes,
+        samples=args.amostras,
+        distinct=args.distintas,
+        reruns=args.rodadas,
+        workers=args.simultaneas,
+        train=not args.sem_modelo,
+        cache_mb=args.cache_mb,
+        budget_mb=args.orcamento_mb,
+        data_dir=args.dados,
+        progress=lambda feitas, total: print(f"{feitas}/{total} sessões", file=sys.stderr),
+    )
+    for chave, valor in resumo.items():
+        print(f"{chave}: {valor:.4g}" if isinstance(valor, float) else f"{chave}: {valor}")
+    if args.saida:
+        rodadas.to_csv(args.saida, index=False)
+        print(args.saida)
+
+
+def _cmd_importar(args):
+    from eyetracking.batch import find_sessions
+    from eyetracking.session_store import SessionStore
+
+    paths = find_sessions(args.entradas)
+    if not paths:
+        sys.exit("Nenhuma sessão .json/.npz/.etz encontrada.")
+    with SessionStore(args.banco) as banco:
+        for path in paths:
+            try:
+                sessao, nova = banco.ingest(path, participant=args.participante)
+            except KeyError as e:
+                print(f"{path}: colunas ausentes: {e.args[0]}")
+            except ValueError as e:
+                print(f"{path}: {e}")
+            else:
+                print(f"{path}: sessão {sessao}" + ("" if nova else " (já estava no banco)"))
+
+
+_AGRUPAMENTOS = {"participante": "participante", "sessao": "sessao", "cor": COLOR, "posicao": POSITION}
+
+
+def _cmd_consultar(args):
+    from eyetracking.session_store import SessionStore
+
+    with SessionStore(args.banco) as banco:
+        if args.sessoes_importadas:
+            print(banco.sessions().drop(columns="hash").to_string(index=False))
+            return
+        tabela = banco.attention(
+            by=[_AGRUPAMENTOS[g] for g in args.por],
+            participants=args.participante,
+            colors=args.cor,
+            positions=args.posicao,
+            start_ms=None if args.inicio is None else args.inicio * 1000.0,
+            end_ms=None if args.fim is None else args.fim * 1000.0,
+        )
+    print(tabela.to_string(index=False))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m eyetracking", description="Análise das sessões do experimento de eye-tracking."
+    )
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("analisar", help="pipeline completo de uma sessão")
+    p.add_argument("sessao", help="arquivo .json ou .npz")
+    p.add_argument("--sem-modelo", action="store_true", help="não treina o classificador")
+    p.add_argument("--fixacoes", choices=["ivt", "idt"], help="também reporta atenção em fixações")
+    p.add_argument(
+        "--ensaios", action="store_true", help="também reporta latência e permanência por ensaio (ciclo de estímulos)"
+    )
+    p.add_argument("--aois", help="JSON com áreas de interesse para reclassificar as amostras")
+    p.add_argument("--suavizar", choices=["one_euro", "kalman", "median"], help="suaviza x/y com este filtro antes da análise")
+    p.add_argument(
+        "--reassociar", action="store_true", help="com --suavizar, refaz o estímulo mais próximo pelo olhar suavizado"
+    )
+    p.add_argument(
+        "--salvar-modelo", action="store_true", help="reaproveita/grava o modelo no repositório de modelos"
+    )
+    p.add_argument("-o", "--saida", help="diretório para gravar as tabelas em CSV")
+    p.add_argument("--perfil", help="grava o tempo de cada etapa neste arquivo JSON")
+    p.add_argument("--memoria", action="store_true", help="com --perfil, mede também o pico de memória (mais lento)")
+    p.set_defaults(func=_cmd_analisar)
+
+    p = sub.add_parser("lote", help="análise em lote de várias sessões")
+    p.add_argument("entradas", nargs="+", help="arquivos .json/.npz/.etz ou diretórios")
+    p.add_argument("-o", "--saida", default=".", help="diretório dos CSVs de saída")
+    p.add_argument("-j", "--processos", type=int, default=None, help="número de processos")
+    p.add_argument("--aois", help="JSON com áreas de interesse para reclassificar as amostras")
+    p.add_argument(
+        "--ic",
+        action="store_true",
+        help="intervalos de confiança (bootstrap) e comparações (permutação) da atenção por ensaio",
+    )
+    p.add_argument("--reamostras", type=int, default=10_000, help="reamostragens do --ic")
+    p.set_defaults(func=_cmd_lote)
+
+    p = sub.add_parser("converter", help="converte sessões JSON para .npz colunar ou .etz compacto")
+    p.add_argument("entrada", nargs="+", help="arquivo(s) gaze_data_experimento.json")
+    p.add_argument("-o", "--saida", help="arquivo de saída (apenas com uma entrada)")
+    p.add_argument("--compacto", action="store_true", help="grava no formato compacto (.etz, gzip)")
+    p.set_defaults(func=_cmd_converter)
+
+    p = sub.add_parser("prever", help="aplica um modelo salvo a uma sessão, sem treinar")
+    p.add_argument("sessao", help="arquivo .json ou .npz")
+    p.add_argument("--modelo", help="chave (ou início único da chave) do modelo; sem ela, usa o usado mais recentemente e avisa qual")
+    p.add_argument("--aois", help="JSON com áreas de interesse para reclassificar as amostras")
+    p.add_argument("-o", "--saida", help="arquivo CSV para gravar as previsões")
+    p.set_defaults(func=_cmd_prever)
+
+    p = sub.add_parser("treinar-amostras", help="classificador por amostra, treinado em blocos (fora da memória)")
+    p.add_argument("entradas", nargs="+", help="arquivos .json/.npz/.etz ou diretórios")
+    p.add_argument("-e", "--epocas", type=int, default=3, help="passadas sobre os dados")
+    p.add_argument("--bloco", type=int, default=1 << 16, help="amostras por bloco de treino")
+    p.add_argument(
+        "--centro", type=float, nargs=2, metavar=("X", "Y"), help="centro da janela do experimento (px)"
+    )
+    p.add_argument("--aois", help="JSON com áreas de interesse para reclassificar as amostras")
+    p.add_argument("--salvar", help="arquivo .joblib para gravar o modelo")
+    p.set_defaults(func=_cmd_treinar_amostras)
+
+    p = sub.add_parser("buscar", help="validação cruzada e busca de hiperparâmetros em paralelo")
+    p.add_argument("sessao", help="arquivo .json ou .npz")
+    p.add_argument("--dados", choices=["agg", "amostras"], default="agg", help="tabela cor + posição ou amostras")
+    p.add_argument(
+        "--modelos", nargs="+", choices=["random_forest", "extra_trees", "logistica"], help="padrão: todos"
+    )
+    p.add_argument("--folds", type=int, default=5, help="número de folds (k)")
+    p.add_argument("--aleatoria", type=int, metavar="N", help="sorteia N combinações por modelo em vez da grade")
+    p.add_argument("-j", "--processos", type=int, default=None, help="número de processos")
+    p.add_argument("--aois", help="JSON com áreas de interesse para reclassificar as amostras")
+    p.add_argument("-o", "--saida", help="arquivo CSV para gravar o ranking dos candidatos")
+    p.set_defaults(func=_cmd_buscar)
+
+    p = sub.add_parser("inicializacao", help="tempo de partida a frio do app Streamlit")
+    p.add_argument("app", nargs="?", default="app.py", help="script do app (padrão: app.py)")
+    p.add_argument("-n", "--repeticoes", type=int, default=3, help="número de partidas a frio")
+    p.add_argument("-o", "--saida", help="arquivo .jsonl onde acrescentar o resumo")
+    p.set_defaults(func=_cmd_inicializacao)
+
+    p = sub.add_parser("sintetico", help="gera uma sessão sintética (.npz ou .json)")
+    p.add_argument("saida", help="arquivo de saída (.npz ou .json)")
+    p.add_argument("-n", "--amostras", type=int, default=100_000, help="número de amostras")
+    p.add_argument("--semente", type=int, default=0, help="semente do gerador")
+    p.add_argument("--taxa", type=float, default=12.0, help="taxa de amostragem (Hz)")
+    p.set_defaults(func=_cmd_sintetico)
+
+    p = sub.add_parser("benchmark", help="mede as etapas da análise em sessões sintéticas")
+    p.add_argument("-n", "--amostras", type=int, nargs="+", default=[10**4, 10**5, 10**6, 10**7],
+                   help="escalas (número de amostras)")
+    p.add_argument("-r", "--repeticoes", type=int, default=3, help="repetições de cada etapa")
+    p.add_argument("--sem-memoria", action="store_true", help="não mede o pico de memória")
+    p.add_argument("--dados", help="diretório onde guardar/reaproveitar as sessões geradas")
+    p.add_argument("--semente", type=int, default=0, help="semente das sessões geradas")
+    p.add_argument("-o", "--saida", help="arquivo .jsonl onde acrescentar os resultados")
+    p.add_argument("--comparar", help="só compara as revisões gravadas neste .jsonl")
+    p.add_argument("--metrica", default="tempo_s", help="com --comparar: tempo_s, pico_mb...")
+    p.set_defaults(func=_cmd_benchmark)
+
+    p = sub.add_parser("importar", help="guarda sessões no banco local (SQLite)")
+    p.add_argument("entradas", nargs="+", help="arquivos .json/.npz/.etz ou diretórios")
+    p.add_argument("--participante", help="nome do participante (padrão: nome do arquivo)")
+    p.add_argument("--banco", default=None, help="arquivo do banco (padrão: ~/.cache/eyetracking/sessoes.sqlite)")
+    p.set_defaults(func=_cmd_importar)
+
+    p = sub.add_parser("consultar", help="atenção agregada no banco local")
+    p.add_argument("--por", nargs="*", choices=list(_AGRUPAMENTOS), default=["cor"], help="agrupamento")
+    p.add_argument("--participante", nargs="+", help="só estes participantes")
+    p.add_argument("--cor", nargs="+", help="só estas cores")
+    p.add_argument("--posicao", nargs="+", help="só estas posições")
+    p.add_argument("--inicio", type=float, help="início do intervalo (s desde o primeiro registro da sessão)")
+    p.add_argument("--fim", type=float, help="fim do intervalo (s)")
+    p.add_argument("--sessoes-importadas", action="store_true", help="lista as sessões do banco")
+    p.add_argument("--banco", default=None, help="arquivo do banco")
+    p.set_defaults(func=_cmd_consultar)
+
+    p = sub.add_parser("carga", help="simula várias sessões simultâneas do app")
+    p.add_argument("-n", "--sessoes", type=int, default=8, help="número de sessões (participantes)")
+    p.add_argument("--amostras", type=int, default=100_000, help="amostras por sessão")
+    p.add_argument("--distintas", type=int, help="arquivos diferentes (padrão: um por sessão)")
+    p.add_argument("-r", "--rodadas", type=int, default=3, help="reruns de cada sessão")
+    p.add_argument("-j", "--simultaneas", type=int, help="sessões ao mesmo tempo (padrão: todas)")
+    p.add_argument("--sem-modelo", action="store_true", help="não treina/carrega o classificador")
+    p.add_argument("--cache-mb", type=int, default=SHARED_CACHE_MB, help="limite do cache compartilhado")
+    p.add_argument("--orcamento-mb", type=int, default=SESSION_BUDGET_MB, help="limite de memória por sessão")
+    p.add_argument("--dados", help="diretório onde guardar/reaproveitar as sessões geradas")
+    p.add_argument("-o", "--saida", help="CSV com uma linha por sessão e rodada")
+    p.set_defaults(func=_cmd_carga)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
@@ -0,0 +1,138 @@
+"""Formato colunar binário das sessões (``.npz`` sem compressão).
+
+Cada coluna é gravada como um ``.npy`` contíguo dentro de um ZIP sem
+compressão, então o arquivo continua legível com ``np.load``. Na leitura, os
+arrays numéricos não são copiados nem decodificados: são visões
+(``np.frombuffer``) sobre o arquivo mapeado em memória ou sobre os bytes já
+carregados do upload.
+
+Membros do arquivo:
+
+- ``x``, ``y`` (float32), ``timestamp`` (float64)
+- ``nearestStimulusId``: inteiro, ``-1`` para amostras sem estímulo
+- ``nearestStimulusColor``, ``nearestPosition``: códigos inteiros (``-1`` =
+  nulo) e o dicionário correspondente em ``<coluna>_categories``
+
+Uso como conversor::
+
+    python -m eyetracking converter gaze_data_experimento.json [-o saida.npz]
+"""
+
+import io
+import mmap
+import os
+import struct
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from eyetracking.ingest import (
+    CATEGORICAL_COLUMNS,
+    ID_COLUMN,
+    NUMERIC_DTYPES,
+    categorical_from_codes,
+    nullable_ids,
+    read_session,
+)
+from eyetracking.profiling import staged
+
+MAGIC = b"PK\x03\x04"
+CATEGORIES_SUFFIX = "_categories"
+
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+
+
+def is_columnar(head):
+    """Indica se os primeiros bytes de um arquivo são de um ``.npz``."""
+    return bytes(head[:4]) == MAGIC
+
+
+def write_columnar(df, dest):
+    """Grava ``df`` (no formato de ``read_session``) em ``dest`` como ``.npz``."""
+    arrays = {}
+    for c, dtype in NUMERIC_DTYPES.items():
+        if c in df.columns:
+            arrays[c] = np.ascontiguousarray(df[c].to_numpy(dtype, na_value=np.nan))
+    if ID_COLUMN in df.columns:
+        ids = df[ID_COLUMN].astype("Int32")
+        arrays[ID_COLUMN] = ids.to_numpy(np.int32, na_value=-1)
+    for c in CATEGORICAL_COLUMNS:
+        if c in df.columns:
+            cat = df[c].astype("category").cat
+            arrays[c] = cat.codes.to_numpy().astype(np.int8 if len(cat.categories) < 128 else np.int16)
+            arrays[c + CATEGORIES_SUFFIX] = np.asarray(cat.categories.astype(str), dtype=str)
+    np.savez(dest, **arrays)
+
+
+def _member_view(buf, info):
+    """Visão sem cópia do array ``.npy`` guardado em ``info`` dentro de ``buf``."""
+    fields = _LOCAL_HEADER.unpack_from(buf, info.header_offset)
+    start = info.header_offset + _LOCAL_HEADER.size + fields[9] + fields[10]
+    head = io.BytesIO(buf[start:start + 4096])
+    version = np.lib.format.read_magic(head)
+    if version == (1, 0):
+        shape, fortran, dtype = np.lib.format.read_array_header_1_0(head)
+    else:
+        shape, fortran, dtype = np.lib.format.read_array_header_2_0(head)
+    if dtype.hasobject or len(shape) != 1:
+        raise ValueError(f"Membro {info.filename!r} não é uma coluna simples.")
+    return np.frombuffer(buf, dtype=dtype, count=shape[0], offset=start + head.tell())
+
+
+@staged("leitura do .npz")
+def read_columnar(source, start=0):
+    """Lê uma sessão ``.npz`` sem decodificar as colunas numéricas.
+
+    ``source`` pode ser um caminho (o arquivo é mapeado em memória) ou um
+    objeto de bytes (``bytes``, ``memoryview``...). Devolve o mesmo DataFrame
+    que ``read_session`` produziria a partir do JSON equivalente; as colunas
+    numéricas são somente leitura. Com ``start``, só as amostras a partir
+    dessa linha.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        fp = open(source, "rb")
+        buf = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    else:
+        buf = source
+        fp = io.BytesIO(source)
+
+    with fp, zipfile.ZipFile(fp) as zf:
+        infos = {os.path.splitext(i.filename)[0]: i for i in zf.infolist()}
+
+        def column(name):
+            info = infos[name]
+            if info.compress_type == zipfile.ZIP_STORED:
+                return _member_view(buf, info)[start:]
+            # .npz comprimido (np.savez_compressed): precisa descompactar
+            with zf.open(info) as member:
+                return np.lib.format.read_array(member)[start:]
+
+        def categories(name):
+            with zf.open(infos[name + CATEGORIES_SUFFIX]) as member:
+                return np.lib.format.read_array(member).tolist()
+
+        columns = {}
+        for c in NUMERIC_DTYPES:
+            if c in infos:
+                columns[c] = column(c)
+        if ID_COLUMN in infos:
+            ids = column(ID_COLUMN)
+            mask = ids < 0
+            columns[ID_COLUMN] = nullable_ids(np.where(mask, 0, ids), mask)
+        for c in CATEGORICAL_COLUMNS:
+            if c in infos:
+                # O experimento grava o dicionário completo (todas as cores)
+                cat = categorical_from_codes(column(c), categories(c))
+                columns[c] = cat.remove_unused_categories()
+    return pd.DataFrame(columns, copy=False)
+
+
+def convert(src, dest=None):
+    """Converte uma sessão JSON em ``.npz`` colunar. Devolve o caminho gravado."""
+    if dest is None:
+        dest = os.path.splitext(src)[0] + ".npz"
+    with open(src, "rb") as f:
+        df = read_session(f)
+    write_columnar(df, dest)
+    return dest
@@ -0,0 +1,207 @@
+"""Formato compacto das sessões (``.etz``): colunas inteiras comprimidas com gzip.
+
+É o formato do botão "Baixar compacto" da página do experimento, pensado
+para transferir sessões longas: o arquivo fica bem menor que o JSON e que o
+``.npz``, e a leitura é vetorizada (uma soma acumulada por coluna). Antes do
+gzip, cada coluna vira um array de inteiros pequenos:
+
+- ``x``, ``y``: quantizados em ``escala_xy`` unidades por pixel (padrão 10,
+  ou seja, 0,1 px) e gravados como diferenças entre amostras consecutivas;
+- ``timestamp``: em ``escala_t`` unidades por ms (padrão 1000, 1 µs) e
+  também em diferenças;
+- ``nearestStimulusId``: diferenças entre ids consecutivos (``-1`` = nulo);
+- ``nearestStimulusColor``, ``nearestPosition``: códigos no dicionário do
+  cabeçalho (``-1`` = nulo).
+
+Cada coluna usa o menor inteiro (8, 16 ou 32 bits) em que suas diferenças
+cabem. A quantização é a única perda: no máximo ``0,5 / escala_xy`` px em
+x/y (muito abaixo do erro do WebGazer) e 0,5 µs no timestamp (abaixo da
+resolução de ``performance.now()`` nos navegadores).
+
+Depois de descomprimido, o arquivo é::
+
+    b"ETC1" | tamanho do cabeçalho (uint32) | cabeçalho JSON | colunas
+
+O cabeçalho traz ``amostras``, as escalas, os dicionários e, para cada
+coluna, o nome, o tipo (``"i1"``, ``"i2"``, ``"i4"`` ou ``"f8"``) e o valor
+inicial (``base``) da soma acumulada. Os valores são little-endian.
+"""
+
+import gzip
+import json
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+
+from eyetracking.ingest import (
+    CATEGORICAL_COLUMNS,
+    ID_COLUMN,
+    categorical_from_codes,
+    nullable_ids,
+    read_session,
+)
+from eyetracking.profiling import staged
+
+MAGIC = b"ETC1"
+GZIP_MAGIC = b"\x1f\x8b"
+EXTENSION = ".etz"
+FORMAT = "eyetracking-compacto"
+VERSION = 1
+# Unidades por pixel (x/y) e por ms (timestamp)
+XY_SCALE = 10
+T_SCALE = 1000
+# Coluna opcional com as amostras sem x/y (só quando existem)
+XY_NULL = "xy_nulo"
+
+_HEADER_SIZE = struct.Struct("<I")
+_INT_TYPES = ("i1", "i2", "i4")
+
+
+def is_compact(head):
+    """Indica se os primeiros bytes de um arquivo são de uma sessão compacta (gzip ou não)."""
+    head = bytes(head[:4])
+    return head[:2] == GZIP_MAGIC or head == MAGIC
+
+
+def _quantize(values, scale):
+    # floor(v + 0.5), a mesma regra de arredondamento do navegador
+    return np.floor(np.asarray(values, dtype=np.float64) * scale + 0.5)
+
+
+def _delta(units):
+    """``(tipo, base, diferenças)`` de uma coluna inteira (em float64)."""
+    base = float(units[0]) if len(units) else 0.0
+    diffs = np.diff(units, prepend=base)
+    for code in _INT_TYPES:
+        info = np.iinfo(np.dtype(code))
+        if len(diffs) == 0 or (diffs.min() >= info.min and diffs.max() <= info.max):
+            return code, base, diffs.astype(code)
+    return "f8", base, diffs
+
+
+def _codes(df, c):
+    cat = df[c].astype("category").cat
+    categories = [str(v) for v in cat.categories]
+    return categories, cat.codes.to_numpy().astype(np.int8 if len(categories) < 128 else np.int16)
+
+
+def encode_compact(df, xy_scale=XY_SCALE, t_scale=T_SCALE):
+    """Bytes (gzip) da sessão ``df`` (no formato de ``read_session``) no formato compacto."""
+    columns = []
+    header = {
+        "formato": FORMAT,
+        "versao": VERSION,
+        "amostras": len(df),
+        "escala_xy": xy_scale,
+        "escala_t": t_scale,
+        "colunas": [],
+        "dicionarios": {},
+    }
+
+    def add(name, code, base, values):
+        columns.append(values)
+        header["colunas"].append({"nome": name, "tipo": code, "base": base})
+
+    if "x" in df.columns and "y" in df.columns:
+        xy = [df[c].to_numpy(np.float32, na_value=np.nan).astype(np.float64) for c in ("x", "y")]
+        missing = np.isnan(xy[0]) | np.isnan(xy[1])
+        for c, values in zip(("x", "y"), xy):
+            units = _quantize(values, xy_scale)
+            if missing.any():
+                # Amostra sem x/y repete o valor anterior (diferença 0)
+                units = pd.Series(np.where(missing, np.nan, units)).ffill().fillna(0).to_numpy()
+            add(c, *_delta(units))
+        if missing.any():
+            add(XY_NULL, "i1", 0.0, missing.astype(np.int8))
+    if "timestamp" in df.columns:
+        t = df["timestamp"].to_numpy(np.float64, na_value=np.nan)
+        if np.isnan(t).any():
+            raise ValueError("O formato compacto não grava amostras sem timestamp.")
+        add("timestamp", *_delta(_quantize(t, t_scale)))
+    if ID_COLUMN in df.columns:
+        add(ID_COLUMN, *_delta(df[ID_COLUMN].to_numpy(np.float64, na_value=-1)))
+    for c in CATEGORICAL_COLUMNS:
+        if c in df.columns:
+            categories, codes = _codes(df, c)
+            header["dicionarios"][c] = categories
+            add(c, codes.dtype.str[1:], 0.0, codes)
+
+    head = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    parts = [MAGIC, _HEADER_SIZE.pack(len(head)), head]
+    parts.extend(np.ascontiguousarray(values, dtype=values.dtype.newbyteorder("<")).tobytes() for values in columns)
+    return gzip.compress(b"".join(parts), compresslevel=6)
+
+
+def write_compact(df, dest, **params):
+    """Grava ``df`` em ``dest`` no formato compacto."""
+    with open(dest, "wb") as f:
+        f.write(encode_compact(df, **params))
+
+
+@staged("leitura do formato compacto")
+def read_compact(source, start=0):
+    """Lê uma sessão compacta (caminho ou bytes) e devolve o DataFrame de ``read_session``.
+
+    Com ``start``, só as amostras a partir dessa linha: o gzip é descomprimido
+    inteiro, mas as linhas anteriores entram só na base da soma acumulada.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            source = f.read()
+    buf = gzip.decompress(source) if bytes(source[:2]) == GZIP_MAGIC else memoryview(source)
+    if bytes(buf[:4]) != MAGIC:
+        raise ValueError("Arquivo não está no formato compacto de sessão.")
+    (size,) = _HEADER_SIZE.unpack_from(buf, 4)
+    offset = 4 + _HEADER_SIZE.size
+    header = json.loads(bytes(buf[offset:offset + size]).decode("utf-8"))
+    if header.get("formato") != FORMAT or header.get("versao") != VERSION:
+        raise ValueError(f"Versão do formato compacto não suportada: {header.get('versao')!r}.")
+    offset += size
+    n = header["amostras"]
+    start = min(start, n)
+
+    raw = {}
+    for spec in header["colunas"]:
+        dtype = np.dtype("<" + spec["tipo"])
+        raw[spec["nome"]] = (np.frombuffer(buf, dtype=dtype, count=n, offset=offset), spec["base"])
+        offset += n * dtype.itemsize
+
+    def integrate(name):
+        diffs, base = raw[name]
+        skipped, diffs = diffs[:start], diffs[start:]
+        if diffs.dtype.kind == "f":
+            return np.cumsum(diffs, dtype=np.float64) + (base + skipped.sum(dtype=np.float64))
+        # A base vem do JSON como float; a soma fica inteira
+        return np.cumsum(diffs, dtype=np.int64) + (int(base) + int(skipped.sum(dtype=np.int64)))
+
+    columns = {}
+    if "x" in raw:
+        missing = raw[XY_NULL][0][start:].astype(bool) if XY_NULL in raw else None
+        for c in ("x", "y"):
+            values = (integrate(c) / header["escala_xy"]).astype(np.float32)
+            if missing is not None:
+                values[missing] = np.nan
+            columns[c] = values
+    if "timestamp" in raw:
+        columns["timestamp"] = integrate("timestamp") / header["escala_t"]
+    if ID_COLUMN in raw:
+        ids = integrate(ID_COLUMN)
+        mask = ids < 0
+        columns[ID_COLUMN] = nullable_ids(np.where(mask, 0, ids).astype(np.int32), mask)
+    for c in CATEGORICAL_COLUMNS:
+        if c in raw:
+            cat = categorical_from_codes(raw[c][0][start:], header["dicionarios"][c])
+            columns[c] = cat.remove_unused_categories()
+    return pd.DataFrame(columns, copy=False)
+
+
+def convert_compact(src, dest=None):
+    """Converte uma sessão JSON em ``.etz``. Devolve o caminho gravado."""
+    if dest is None:
+        dest = os.path.splitext(src)[0] + EXTENSION
+    with open(src, "rb") as f:
+        df = read_session(f)
+    write_compact(df, dest)
+    return dest
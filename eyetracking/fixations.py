@@ -0,0 +1,213 @@
+"""Detecção de fixações e sacadas (I-VT e I-DT) sobre x/y/timestamp.
+
+As coordenadas do WebGazer estão em pixels da página, então os limiares são
+em px (velocidade em px/s, dispersão em px). Os dois algoritmos trabalham só
+com operações sobre arrays inteiros, sem laço por amostra:
+
+- I-VT: velocidade ponto a ponto; amostras abaixo do limiar formam fixações.
+- I-DT: para cada amostra, a janela que termina nela e cobre
+  ``min_duration_ms`` tem sua dispersão ``(max x - min x) + (max y - min y)``
+  calculada com uma *sparse table* de mínimos/máximos (consultas O(1) por
+  janela). Janelas com dispersão até o limiar marcam suas amostras como
+  fixação; amostras marcadas e consecutivas formam uma fixação.
+
+Em ambos, uma fixação é interrompida por lacunas maiores que
+``max_gap_ms`` entre amostras e descartada se durar menos que
+``min_duration_ms``.
+"""
+
+import numpy as np
+import pandas as pd
+
+from eyetracking.analysis import COLOR, POSITION
+from eyetracking.profiling import staged
+
+STIMULUS_ID = "nearestStimulusId"
+FIXATION = "fixacao"
+
+IVT_VELOCITY_PX_S = 1000.0
+IDT_DISPERSION_PX = 120.0
+MIN_DURATION_MS = 100.0
+MAX_GAP_MS = 250.0
+
+
+def _columns(df):
+    order = np.argsort(df["timestamp"].to_numpy(np.float64), kind="stable")
+    x = df["x"].to_numpy(np.float64, na_value=np.nan)[order]
+    y = df["y"].to_numpy(np.float64, na_value=np.nan)[order]
+    t = df["timestamp"].to_numpy(np.float64, na_value=np.nan)[order]
+    valid = np.isfinite(x) & np.isfinite(y) & np.isfinite(t)
+    return order[valid], x[valid], y[valid], t[valid]
+
+
+def velocity(x, y, t):
+    """Velocidade (px/s) de cada amostra em relação à anterior.
+
+    A primeira amostra recebe a velocidade da segunda.
+    """
+    if len(t) < 2:
+        return np.zeros(len(t))
+    dt = np.diff(t) / 1000.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        v = np.hypot(np.diff(x), np.diff(y)) / dt
+    v[dt <= 0] = np.inf
+    return np.concatenate(([v[0]], v))
+
+
+def _runs(mask, t, max_gap_ms, min_duration_ms, breaks=None):
+    """Numera os trechos contíguos de ``mask`` (-1 fora das fixações).
+
+    ``breaks`` marca amostras que sempre iniciam um novo trecho.
+    """
+    starts = mask.copy()
+    new_run = ~mask[:-1] | (np.diff(t) > max_gap_ms)
+    if breaks is not None:
+        new_run |= breaks[1:]
+    starts[1:] &= new_run
+    run = np.cumsum(starts) - 1
+    run[~mask] = -1
+
+    idx = np.flatnonzero(mask)
+    if len(idx) == 0:
+        return run
+    change = np.flatnonzero(np.diff(run[idx]))
+    first = idx[np.r_[0, change + 1]]
+    last = idx[np.r_[change, len(idx) - 1]]
+    keep = (t[last] - t[first]) >= min_duration_ms
+
+    new_id = np.where(keep, np.cumsum(keep) - 1, -1)
+    return np.where(mask, new_id[np.maximum(run, 0)], -1)
+
+
+def ivt(x, y, t, velocity_threshold=IVT_VELOCITY_PX_S, min_duration_ms=MIN_DURATION_MS, max_gap_ms=MAX_GAP_MS):
+    """I-VT: índice da fixação de cada amostra (-1 = sacada/ruído)."""
+    mask = velocity(x, y, t) <= velocity_threshold
+    return _runs(mask, t, max_gap_ms, min_duration_ms)
+
+
+class _SparseTable:
+    """Mínimo e máximo em intervalos ``[l, r]`` com consultas vetorizadas."""
+
+    def __init__(self, values, max_len):
+        self.levels_min = [values]
+        self.levels_max = [values]
+        k = 1
+        while (1 << k) <= max_len:
+            half = 1 << (k - 1)
+            prev_min, prev_max = self.levels_min[-1], self.levels_max[-1]
+            self.levels_min.append(np.minimum(prev_min[:-half], prev_min[half:]))
+            self.levels_max.append(np.maximum(prev_max[:-half], prev_max[half:]))
+            k += 1
+
+    def query(self, left, right):
+        length = right - left + 1
+        level = np.floor(np.log2(length)).astype(np.intp)
+        lo = np.empty(len(left))
+        hi = np.empty(len(left))
+        for k in np.unique(level):
+            sel = level == k
+            l, r = left[sel], right[sel] - (1 << k) + 1
+            lo[sel] = np.minimum(self.levels_min[k][l], self.levels_min[k][r])
+            hi[sel] = np.maximum(self.levels_max[k][l], self.levels_max[k][r])
+        return lo, hi
+
+
+def idt(x, y, t, dispersion_threshold=IDT_DISPERSION_PX, min_duration_ms=MIN_DURATION_MS, max_gap_ms=MAX_GAP_MS):
+    """I-DT: índice da fixação de cada amostra (-1 = sacada/ruído)."""
+    n = len(t)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+
+    # Janela de cada amostra k: da última amostra com t <= t[k] - min_duration até k
+    end = np.arange(n)
+    start = np.searchsorted(t, t - min_duration_ms, side="right") - 1
+    # Com timestamps repetidos e duração 0, a "última amostra" pode vir depois de k
+    start = np.minimum(start, end)
+    ok = start >= 0
+    end, start = end[ok], start[ok]
+
+    if len(end):
+        max_len = int((end - start).max()) + 1
+        sx, sy = _SparseTable(x, max_len), _SparseTable(y, max_len)
+        x_min, x_max = sx.query(start, end)
+        y_min, y_max = sy.query(start, end)
+        passed = (x_max - x_min) + (y_max - y_min) <= dispersion_threshold
+        start, end = start[passed], end[passed]
+
+    # Marca [start, end] de cada janela aprovada (soma de diferenças)
+    cover = np.zeros(n + 1, dtype=np.int64)
+    np.add.at(cover, start, 1)
+    np.add.at(cover, end + 1, -1)
+    mask = np.cumsum(cover[:-1]) > 0
+
+    # Amostras marcadas mas distantes da anterior pertencem a outra fixação
+    jump = np.zeros(n, dtype=bool)
+    jump[1:] = np.hypot(np.diff(x), np.diff(y)) > dispersion_threshold
+    return _runs(mask, t, max_gap_ms, min_duration_ms, breaks=jump)
+
+
+def _mode(samples, group, column):
+    """Valor mais frequente (não nulo) de ``column`` em cada grupo."""
+    counts = samples[[group, column]].dropna().value_counts().reset_index(name="n")
+    counts = counts.sort_values([group, "n"], ascending=[True, False], kind="stable")
+    return counts.drop_duplicates(group).set_index(group)[column]
+
+
+@staged("detecção de fixações")
+def detect_fixations(df, method="ivt", **params):
+    """Detecta fixações em ``df`` (colunas x, y, timestamp e, se houver, rótulos).
+
+    ``method`` é ``"ivt"`` ou ``"idt"``; ``params`` são repassados ao
+    algoritmo (``velocity_threshold``/``dispersion_threshold``,
+    ``min_duration_ms``, ``max_gap_ms``).
+
+    Retorna ``(por_amostra, fixacoes)``: ``por_amostra`` é uma Series com o
+    índice da fixação de cada linha de ``df`` (-1 fora de fixações) e
+    ``fixacoes`` tem uma linha por fixação com início, fim, duração, centro,
+    número de amostras e o estímulo (cor, posição, id) mais frequente.
+    """
+    order, x, y, t = _columns(df)
+    detector = {"ivt": ivt, "idt": idt}[method]
+    ids = detector(x, y, t, **params)
+
+    per_sample = np.full(len(df), -1, dtype=np.int64)
+    per_sample[order] = ids
+    per_sample = pd.Series(per_sample, index=df.index, name=FIXATION)
+
+    inside = ids >= 0
+    samples = pd.DataFrame({FIXATION: ids[inside], "x": x[inside], "y": y[inside], "timestamp": t[inside]})
+    grouped = samples.groupby(FIXATION)
+    fixations = pd.DataFrame({
+        "inicio": grouped["timestamp"].min(),
+        "fim": grouped["timestamp"].max(),
+        "x": grouped["x"].mean(),
+        "y": grouped["y"].mean(),
+        "num_samples": grouped.size(),
+    })
+    fixations.insert(2, "duracao_ms", fixations["fim"] - fixations["inicio"])
+
+    labels = df.iloc[order[inside]]
+    for col in (COLOR, POSITION, STIMULUS_ID):
+        if col in df.columns:
+            samples[col] = labels[col].to_numpy()
+            fixations[col] = _mode(samples, FIXATION, col)
+    if STIMULUS_ID in fixations.columns:
+        fixations[STIMULUS_ID] = fixations[STIMULUS_ID].astype("Int32")
+    fixations.index.name = FIXATION
+    return per_sample, fixations.reset_index()
+
+
+def fixation_attention(fixations, group_cols):
+    """Número de fixações e tempo total/médio de fixação por grupo."""
+    table = (
+        fixations.dropna(subset=group_cols)
+        .groupby(group_cols, observed=True)
+        .agg(
+            num_fixacoes=("duracao_ms", "size"),
+            tempo_fixacao_s=("duracao_ms", "sum"),
+            duracao_media_ms=("duracao_ms", "mean"),
+        )
+        .reset_index()
+    )
+    table["tempo_fixacao_s"] /= 1000.0
+    return table
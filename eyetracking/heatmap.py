@@ -0,0 +1,172 @@
+"""Mapas de calor do olhar (histograma 2D suavizado por FFT).
+
+``GazeHistogram`` percorre a sessão uma única vez: calcula a célula da grade
+de cada amostra e guarda um histograma por combinação cor + posição (e as
+células ordenadas por ``nearestStimulusId``). Depois disso, o histograma de
+qualquer filtro é uma soma de fatias da grade (ou, por estímulo, uma fatia
+contígua das amostras daquele estímulo), então o custo de desenhar não
+depende do tamanho da sessão.
+
+A suavização é uma convolução gaussiana feita no domínio da frequência
+(``numpy.fft.rfft2``), com preenchimento de zeros para não "vazar" de uma
+borda para a outra.
+"""
+
+import numpy as np
+
+from eyetracking.analysis import COLOR, POSITION
+from eyetracking.ingest import ID_COLUMN
+from eyetracking.profiling import staged
+
+DEFAULT_BINS_X = 192
+SIGMA_BINS = 2.0
+# Percentis que definem a área do mapa (descarta predições muito fora da tela)
+EXTENT_PERCENTILES = (0.5, 99.5)
+
+
+def has_spread(df):
+    """Indica se x e y variam entre os percentis da área do mapa (senão não há mapa a desenhar)."""
+    x = df["x"].to_numpy(np.float64, na_value=np.nan)
+    y = df["y"].to_numpy(np.float64, na_value=np.nan)
+    finite = np.isfinite(x) & np.isfinite(y)
+    if not finite.any():
+        return False
+    return all(np.ptp(np.percentile(v[finite], EXTENT_PERCENTILES)) > 0 for v in (x, y))
+
+
+def _codes(df, col):
+    """Códigos (0 = nulo) e categorias de uma coluna de rótulos."""
+    if col not in df.columns:
+        return np.zeros(len(df), dtype=np.int16), []
+    cat = df[col].astype("category").cat
+    return cat.codes.to_numpy().astype(np.int16) + 1, [str(c) for c in cat.categories]
+
+
+class GazeHistogram:
+    """Contagens de amostras por célula, prontas para filtrar por rótulo."""
+
+    @staged("mapa de calor: grade")
+    def __init__(self, df, bins_x=DEFAULT_BINS_X, extent=None):
+        x = df["x"].to_numpy(np.float64, na_value=np.nan)
+        y = df["y"].to_numpy(np.float64, na_value=np.nan)
+        finite = np.isfinite(x) & np.isfinite(y)
+
+        if extent is None:
+            if finite.any():
+                x0, x1 = np.percentile(x[finite], EXTENT_PERCENTILES)
+                y0, y1 = np.percentile(y[finite], EXTENT_PERCENTILES)
+            else:
+                x0, x1, y0, y1 = 0.0, 1.0, 0.0, 1.0
+            extent = (x0, max(x1, x0 + 1.0), y0, max(y1, y0 + 1.0))
+        self.extent = tuple(float(v) for v in extent)
+        x0, x1, y0, y1 = self.extent
+
+        # Células quadradas com bins_x células no lado mais longo: a grade
+        # fica limitada a bins_x x bins_x mesmo se x ou y quase não variar
+        self.bin_size = max(x1 - x0, y1 - y0) / bins_x
+        self.shape = tuple(
+            min(bins_x, max(1, int(np.ceil(span / self.bin_size)))) for span in (y1 - y0, x1 - x0)
+        )
+        # a última linha/coluna pode passar da área: o mapa cobre a grade inteira
+        self.extent = (x0, x0 + self.shape[1] * self.bin_size, y0, y0 + self.shape[0] * self.bin_size)
+        n_cells = self.shape[0] * self.shape[1]
+
+        with np.errstate(invalid="ignore"):
+            ix = np.floor((x - x0) / self.bin_size)
+            iy = np.floor((y - y0) / self.bin_size)
+        inside = finite & (ix >= 0) & (ix < self.shape[1]) & (iy >= 0) & (iy < self.shape[0])
+        cell = np.where(inside, iy * self.shape[1] + ix, 0).astype(np.int64)
+
+        color, self.colors = _codes(df, COLOR)
+        position, self.positions = _codes(df, POSITION)
+        self.total = int(inside.sum())
+
+        # Um histograma por (cor, posição), incluindo o código 0 (sem rótulo)
+        self.n_pos = len(self.positions) + 1
+        label = color.astype(np.int64) * self.n_pos + position
+        groups = (len(self.colors) + 1) * self.n_pos
+        self.by_label = np.bincount(
+            (label * n_cells + cell)[inside], minlength=groups * n_cells
+        ).reshape(groups, n_cells)
+
+        # Amostras ordenadas por estímulo, para o filtro por id: as do
+        # estímulo stimulus_ids[k] estão em [stimulus_start[k], stimulus_start[k + 1])
+        ids = np.full(len(df), -1, dtype=np.int64)
+        if ID_COLUMN in df.columns:
+            ids = df[ID_COLUMN].to_numpy(np.int64, na_value=-1)
+        keep = np.flatnonzero(inside & (ids >= 0))
+        keep = keep[np.argsort(ids[keep], kind="stable")]
+        self.stimulus_ids, first = np.unique(ids[keep], return_index=True)
+        self.stimulus_start = np.append(first, len(keep))
+        self.stimulus_cells = cell[keep].astype(np.int32)
+        self.stimulus_labels = label[keep].astype(np.int16)
+
+    @property
+    def nbytes(self):
+        arrays = (self.by_label, self.stimulus_ids, self.stimulus_start, self.stimulus_cells, self.stimulus_labels)
+        return sum(a.nbytes for a in arrays)
+
+    def _label_mask(self, colors, positions):
+        """Máscara dos grupos (cor, posição) selecionados; ``None`` = todos."""
+        keep_c = np.ones(len(self.colors) + 1, dtype=bool)
+        keep_p = np.ones(self.n_pos, dtype=bool)
+        if colors is not None:
+            keep_c[:] = False
+            keep_c[1:] = np.isin(self.colors, list(colors))
+        if positions is not None:
+            keep_p[:] = False
+            keep_p[1:] = np.isin(self.positions, list(positions))
+        return np.outer(keep_c, keep_p).ravel()
+
+    def counts(self, colors=None, positions=None, stimulus=None):
+        """Histograma 2D (linhas = y, colunas = x) das amostras filtradas.
+
+        ``colors``/``positions`` são listas de rótulos (``None`` = sem filtro;
+        com filtro, amostras sem rótulo ficam de fora). ``stimulus`` é um
+        ``nearestStimulusId``.
+        """
+        mask = self._label_mask(colors, positions)
+        if stimulus is None:
+            flat = self.by_label[mask].sum(axis=0)
+        else:
+            k = np.searchsorted(self.stimulus_ids, stimulus)
+            lo = hi = 0
+            if k < len(self.stimulus_ids) and self.stimulus_ids[k] == stimulus:
+                lo, hi = self.stimulus_start[k], self.stimulus_start[k + 1]
+            cells = self.stimulus_cells[lo:hi][mask[self.stimulus_labels[lo:hi]]]
+            flat = np.bincount(cells, minlength=self.shape[0] * self.shape[1])
+        return flat.reshape(self.shape)
+
+
+@staged("mapa de calor: suavização")
+def gaussian_smooth(counts, sigma_bins=SIGMA_BINS):
+    """Convolução de ``counts`` com uma gaussiana (desvio em células), via FFT."""
+    counts = np.asarray(counts, dtype=np.float64)
+    if sigma_bins <= 0:
+        return counts
+    radius = int(np.ceil(3 * sigma_bins))
+    h, w = counts.shape
+    size = (h + 2 * radius, w + 2 * radius)
+
+    offsets = np.arange(-radius, radius + 1)
+    g = np.exp(-0.5 * (offsets / sigma_bins) ** 2)
+    g /= g.sum()
+    kernel = np.zeros(size)
+    kernel[:len(g), :len(g)] = np.outer(g, g)
+
+    spectrum = np.fft.rfft2(counts, size) * np.fft.rfft2(kernel, size)
+    smoothed = np.fft.irfft2(spectrum, size)
+    return smoothed[radius:radius + h, radius:radius + w]
+
+
+def plot_heatmap(density, extent, ax=None, cmap="inferno"):
+    """Desenha ``density`` em coordenadas da página (y para baixo)."""
+    import matplotlib.pyplot as plt
+
+    if ax is None:
+        _, ax = plt.subplots()
+    x0, x1, y0, y1 = extent
+    image = ax.imshow(density, extent=(x0, x1, y1, y0), origin="upper", cmap=cmap, aspect="equal")
+    ax.set_xlabel("x (px)")
+    ax.set_ylabel("y (px)")
+    return image
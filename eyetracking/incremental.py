@@ -0,0 +1,365 @@
+"""Reanálise incremental de sessões que crescem entre uploads.
+
+Durante os pilotos, a mesma sessão é exportada e enviada várias vezes
+enquanto cresce. Em vez de reler e reagregar tudo a cada envio, as tabelas
+de atenção e as estatísticas de dt ficam em estados parciais combináveis:
+
+- ``AttentionState``: contagens por cor + posição (as tabelas por cor e por
+  posição saem delas) e ``n``/mínimo/máximo dos timestamps válidos, que dão
+  o dt de ``estimate_dt_ms``;
+- ``SamplingState``: número de intervalos, média e soma dos quadrados dos
+  desvios (combinadas pela fórmula de Chan et al.), maior intervalo e um
+  histograma dos intervalos, que dão as estatísticas de ``sampling_stats``.
+
+``merge`` combina dois estados em O(categorias), então agregar as amostras
+novas e juntá-las ao estado guardado custa O(amostras novas).
+
+``IncrementalSession`` guarda esses estados e as partes já lidas de uma
+sessão. Em um novo envio do mesmo arquivo:
+
+- JSON: se o início do arquivo (até a última amostra do envio anterior,
+  antes do ``]`` final) não mudou, conferido pelo hash, só o texto
+  acrescentado depois dele é lido;
+- ``.npz``/``.etz``: se o arquivo tem ao menos as linhas já vistas e a
+  última delas tem o mesmo timestamp, só as linhas depois dela são
+  decodificadas (``load_session(..., start=...)``) e agregadas. No ``.etz``
+  o gzip ainda é descomprimido inteiro, mas as linhas antigas não viram
+  colunas.
+
+Qualquer outro arquivo (outra sessão, amostras antigas descartadas pelo
+navegador, timestamps fora de ordem) é lido do zero.
+
+Só a leitura, as tabelas de atenção, o dt e as estatísticas de amostragem
+são incrementais. ``frame()`` ainda copia a sessão inteira para um DataFrame
+(O(amostras), uma vez por atualização), e as análises que precisam das
+amostras (fixações, ensaios, mapa de calor, trajetória) têm o cache indexado
+pelo hash do arquivo, então são refeitas sobre a sessão inteira a cada envio.
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from eyetracking.analysis import COLOR, DEFAULT_DT_MS, POSITION, load_session, valid_samples
+from eyetracking.columnar import is_columnar
+from eyetracking.compact import is_compact
+from eyetracking.profiling import stage, staged
+
+# Resolução e alcance do histograma de intervalos (para o p95)
+DT_BIN_MS = 0.1
+DT_HIST_MAX_MS = 2000.0
+
+
+class AttentionState:
+    """Contagens de atenção e faixa de timestamps das amostras válidas."""
+
+    def __init__(self, counts=None, n_valid=0, t_min=np.inf, t_max=-np.inf, has_position=True):
+        # Amostras por cor + posição (ou só por cor, sem a coluna de posição)
+        self.counts = counts if counts is not None else pd.Series(dtype=np.int64)
+        self.n_valid = n_valid
+        self.t_min = t_min
+        self.t_max = t_max
+        self.has_position = has_position
+
+    @classmethod
+    @staged("estado de atenção")
+    def from_samples(cls, df):
+        """Estado das amostras de ``df`` (levanta ``KeyError`` como ``valid_samples``)."""
+        df_valid = valid_samples(df, require_position=False)
+        has_position = POSITION in df_valid.columns
+        keys = [COLOR, POSITION] if has_position else [COLOR]
+        counts = df_valid.groupby(keys, observed=True).size()
+        # Rótulos como texto: estados de arquivos diferentes se combinam pelo rótulo
+        if has_position:
+            counts.index = counts.index.set_levels([level.astype(str) for level in counts.index.levels])
+        else:
+            counts.index = counts.index.astype(str)
+        t = df_valid["timestamp"].to_numpy(np.float64)
+        return cls(
+            counts.astype(np.int64),
+            len(t),
+            float(t.min()) if len(t) else np.inf,
+            float(t.max()) if len(t) else -np.inf,
+            has_position,
+        )
+
+    def merge(self, other):
+        """Estado das amostras dos dois estados juntas."""
+        return AttentionState(
+            self.counts.add(other.counts, fill_value=0).astype(np.int64),
+            self.n_valid + other.n_valid,
+            min(self.t_min, other.t_min),
+            max(self.t_max, other.t_max),
+            self.has_position and other.has_position,
+        )
+
+    def dt_ms(self):
+        """dt médio das amostras válidas (como ``estimate_dt_ms``)."""
+        if self.n_valid < 2:
+            return DEFAULT_DT_MS
+        return (self.t_max - self.t_min) / (self.n_valid - 1)
+
+    def attention_tables(self):
+        """Tabelas ``cor``/``posicao``/``agg`` de ``attention_tables``."""
+        dt_s = self.dt_ms() / 1000.0
+        counts = self.counts[self.counts > 0].sort_index()
+        if self.has_position:
+            agg = counts.rename_axis([COLOR, POSITION]).reset_index(name="num_samples")
+            tables = {
+                "cor": agg.groupby(COLOR, as_index=False)["num_samples"].sum(),
+                "posicao": agg.groupby(POSITION, as_index=False)["num_samples"].sum(),
+                "agg": agg,
+            }
+        else:
+            tables = {"cor": counts.rename_axis(COLOR).reset_index(name="num_samples")}
+        for table in tables.values():
+            table["tempo_atencao_s"] = table["num_samples"] * dt_s
+        return tables
+
+
+class SamplingState:
+    """Intervalos entre timestamps consecutivos de uma sessão (ou de um trecho dela)."""
+
+    def __init__(self):
+        self.n = 0                  # amostras com timestamp
+        self.t_first = np.nan
+        self.t_last = np.nan
+        self.dt_count = 0
+        self.dt_mean = 0.0
+        self.dt_m2 = 0.0            # soma dos quadrados dos desvios da média
+        self.dt_max = -np.inf
+        self.hist = np.zeros(int(DT_HIST_MAX_MS / DT_BIN_MS) + 1, dtype=np.int64)
+
+    @classmethod
+    def from_timestamps(cls, t):
+        state = cls()
+        t = np.sort(np.asarray(t, dtype=np.float64))
+        t = t[np.isfinite(t)]
+        if len(t):
+            state.n, state.t_first, state.t_last = len(t), float(t[0]), float(t[-1])
+            state._add_intervals(np.diff(t))
+        return state
+
+    def _add_intervals(self, dt):
+        if len(dt) == 0:
+            return
+        other = SamplingState()
+        other.dt_count = len(dt)
+        other.dt_mean = float(dt.mean())
+        other.dt_m2 = float(((dt - other.dt_mean) ** 2).sum())
+        other.dt_max = float(dt.max())
+        bins = np.minimum((dt / DT_BIN_MS).astype(np.int64), len(self.hist) - 1)
+        other.hist = np.bincount(bins, minlength=len(self.hist))
+        self._merge_intervals(other)
+
+    def _merge_intervals(self, other):
+        n = self.dt_count + other.dt_count
+        if n == 0:
+            return
+        delta = other.dt_mean - self.dt_mean
+        self.dt_m2 += other.dt_m2 + delta * delta * self.dt_count * other.dt_count / n
+        self.dt_mean += delta * other.dt_count / n
+        self.dt_count = n
+        self.dt_max = max(self.dt_max, other.dt_max)
+        self.hist = self.hist + other.hist
+
+    def merge(self, other):
+        """Estado dos timestamps de ``self`` seguidos dos de ``other``.
+
+        Os timestamps de ``other`` precisam vir depois dos de ``self``; o
+        intervalo entre os dois trechos também entra nas estatísticas.
+        """
+        if other.n and self.n and other.t_first < self.t_last:
+            raise ValueError("Os timestamps do trecho novo precisam vir depois dos já vistos.")
+        out = SamplingState()
+        for state in (self, other):
+            if state.n == 0:
+                continue
+            if out.n:
+                out._add_intervals(np.array([state.t_first - out.t_last]))
+            else:
+                out.t_first = state.t_first
+            out._merge_intervals(state)
+            out.n += state.n
+            out.t_last = state.t_last
+        return out
+
+    def stats(self):
+        """Dicionário de ``sampling_stats`` (p95 com resolução de ``DT_BIN_MS``)."""
+        nan = float("nan")
+        if self.dt_count == 0:
+            keys = ("taxa_hz", "dt_medio_ms", "jitter_ms", "dt_p95_ms", "maior_intervalo_ms")
+            return dict({"amostras": self.n}, **dict.fromkeys(keys, nan))
+        mean = self.dt_mean
+        rank = np.searchsorted(np.cumsum(self.hist), 0.95 * (self.dt_count - 1) + 1)
+        return {
+            "amostras": self.n,
+            "taxa_hz": 1000.0 / mean if mean > 0 else nan,
+            "dt_medio_ms": mean,
+            "jitter_ms": float(np.sqrt(self.dt_m2 / self.dt_count)),
+            "dt_p95_ms": min((rank + 0.5) * DT_BIN_MS, self.dt_max),
+            "maior_intervalo_ms": self.dt_max,
+        }
+
+
+def _concat(parts):
+    """Junta as partes lidas, unindo os dicionários das colunas categóricas."""
+    parts = [p for p in parts if not p.empty]
+    if len(parts) <= 1:
+        return parts[0] if parts else pd.DataFrame()
+    columns = {}
+    for c in parts[0].columns:
+        if isinstance(parts[0][c].dtype, pd.CategoricalDtype):
+            columns[c] = union_categoricals([p[c] for p in parts], sort_categories=True)
+        else:
+            columns[c] = pd.concat([p[c] for p in parts], ignore_index=True)
+    return pd.DataFrame(columns, copy=False)
+
+
+class IncrementalSession:
+    """Sessão que cresce entre envios; só as amostras novas são lidas e agregadas."""
+
+    def __init__(self):
+        self.content_hash = None
+        self.parts = []
+        self.attention = AttentionState()
+        self.sampling = SamplingState()
+        self.n_samples = 0
+        self.position_rebuilt = False
+        self.last_update = None      # "completa", "incremental" ou None (arquivo sem mudança)
+        self.new_samples = 0         # amostras lidas na última atualização
+        self._last_timestamp = None  # timestamp da última amostra já vista, na ordem do arquivo
+        self._prefix = None          # (fim da última amostra, hash até ali) do último JSON
+        self._frame = None
+
+    def frame(self):
+        """DataFrame com todas as amostras (montado uma vez por atualização).
+
+        A montagem copia todas as partes: custa O(amostras), não O(amostras
+        novas); quem só precisa das tabelas deve usar os estados.
+        """
+        if self._frame is None:
+            with stage("montagem da sessão incremental"):
+                self._frame = _concat(self.parts)
+                self.parts = [self._frame]
+        return self._frame
+
+    def attention_tables(self):
+        return self.attention.attention_tables()
+
+    def dt_ms(self):
+        return self.attention.dt_ms()
+
+    def sampling_stats(self):
+        return self.sampling.stats()
+
+    def update(self, content, content_hash=None, load=load_session):
+        """Incorpora um novo envio (bytes) da sessão; devolve as amostras novas.
+
+        ``load(content)`` é usado nas leituras completas (por exemplo, para
+        passar pelo cache compartilhado do app) e deve devolver
+        ``(df, posicao_reconstruida)`` como ``load_session``.
+        """
+        content_hash = content_hash or hashlib.sha256(content).hexdigest()
+        if content_hash == self.content_hash:
+            self.last_update = None
+            self.new_samples = 0
+            return 0
+        new, verified = self._appended(content)
+        if new is None or not self._append(new):
+            df, self.position_rebuilt = load(content)
+            self._reset()
+            self._append(df)
+            self.last_update = "completa"
+            verified = None
+        else:
+            self.last_update = "incremental"
+        self.content_hash = content_hash
+        self._prefix = self._json_prefix(content, verified)
+        return self.new_samples
+
+    def _reset(self):
+        self.parts = []
+        self.attention = AttentionState()
+        self.sampling = SamplingState()
+        self.n_samples = 0
+        self._last_timestamp = None
+        self._frame = None
+
+    def _append(self, df):
+        """Agrega ``df`` e junta ao estado; ``False`` se ``df`` não continua a sessão."""
+        self.new_samples = len(df)
+        if df.empty:
+            return True
+        t = df["timestamp"].to_numpy(np.float64, na_value=np.nan)
+        sampling = SamplingState.from_timestamps(t)
+        if self.sampling.n and sampling.n and sampling.t_first < self.sampling.t_last:
+            return False
+        attention = AttentionState.from_samples(df)
+        self.attention = self.attention.merge(attention) if self.n_samples else attention
+        self.sampling = self.sampling.merge(sampling)
+        self._last_timestamp = t[-1]
+        self.parts.append(df)
+        self.n_samples += len(df)
+        self._frame = None
+        return True
+
+    @staticmethod
+    def _json_prefix(content, verified=None):
+        """``(fim, hash)`` do JSON até a última amostra; ``verified`` é um prefixo já hasheado."""
+        if is_columnar(content) or is_compact(content):
+            return None
+        content = bytes(content)
+        end = content.rfind(b"]")
+        if end < 0:
+            return None
+        # Sem os espaços antes do "]": ao crescer, o arquivo continua com "," logo depois do último "}"
+        while end > 0 and content[end - 1] in b" \t\r\n":
+            end -= 1
+        start, hasher = verified or (0, hashlib.sha256())
+        # O hash continua de onde o prefixo conferido parou: só os bytes novos são lidos
+        hasher.update(memoryview(content)[start:end])
+        return end, hasher
+
+    @staged("leitura incremental")
+    def _appended(self, content):
+        """``(amostras acrescentadas, prefixo JSON conferido)`` desde o último envio.
+
+        As amostras são ``None`` se ``content`` não continua a sessão.
+        """
+        if self.content_hash is None:
+            return None, None
+        if is_columnar(content) or is_compact(content):
+            if self._last_timestamp is None:
+                return None, None
+            # Só a última amostra já vista (para conferir) e as novas
+            df, rebuilt = load_session(content, start=self.n_samples - 1)
+            if df.empty or rebuilt != self.position_rebuilt:
+                return None, None
+            t = df["timestamp"].to_numpy(np.float64, na_value=np.nan)
+            if not np.array_equal(t[:1], [self._last_timestamp], equal_nan=True):
+                return None, None
+            return df.iloc[1:].reset_index(drop=True), None
+        if self._prefix is None:
+            return None, None
+        end, hasher = self._prefix
+        view = memoryview(content)
+        if len(view) < end:
+            return None, None
+        # Única passada sobre os bytes antigos: conferir que não mudaram
+        verified = hashlib.sha256(view[:end])
+        if verified.digest() != hasher.digest():
+            return None, None
+        tail = bytes(view[end:]).lstrip()
+        if tail.startswith(b"]"):
+            return pd.DataFrame(), (end, verified)
+        if self.n_samples:
+            if not tail.startswith(b","):
+                return None, None
+            tail = tail[1:]
+        df, rebuilt = load_session(b"[" + tail)
+        if rebuilt != self.position_rebuilt:
+            return None, None
+        return df, (end, verified)
@@ -0,0 +1,256 @@
+"""Leitura incremental das sessões exportadas pelo experimento.
+
+O arquivo ``gaze_data_experimento.json`` é um array JSON de amostras com seis
+campos. Em vez de carregar o array inteiro em objetos Python (``json.load``) e
+depois montar um DataFrame de dtype ``object``, o leitor abaixo percorre o
+array elemento a elemento e preenche buffers tipados em blocos de
+``CHUNK_SAMPLES`` amostras. Só um bloco de dicionários existe por vez.
+
+Tipos das colunas:
+
+- ``x``, ``y``: float32
+- ``timestamp``: float64
+- ``nearestStimulusId``: inteiro anulável pequeno (``Int16``, ou ``Int32`` se
+  os ids não couberem)
+- ``nearestStimulusColor``, ``nearestPosition``: categóricas
+"""
+
+import codecs
+import json
+
+import numpy as np
+import pandas as pd
+
+from eyetracking.profiling import stage, staged
+
+# Ordem dos rótulos do triângulo, igual a TRIANGLE_OFFSETS no experimento
+POSITIONS = ("topo", "baixo-esquerda", "baixo-direita")
+
+NUMERIC_DTYPES = {"x": np.float32, "y": np.float32, "timestamp": np.float64}
+ID_COLUMN = "nearestStimulusId"
+CATEGORICAL_COLUMNS = ("nearestStimulusColor", "nearestPosition")
+COLUMNS = ("x", "y", "timestamp", ID_COLUMN) + CATEGORICAL_COLUMNS
+
+CHUNK_SAMPLES = 65536
+READ_BYTES = 1 << 20
+
+_WHITESPACE = " \t\n\r"
+
+
+def iter_batches(fp, read_bytes=READ_BYTES):
+    """Itera sobre os elementos do array JSON de nível superior de ``fp``.
+
+    Os elementos são entregues em listas (um bloco lido por vez), para que o
+    consumidor possa processá-los coluna a coluna. ``fp`` pode ser um arquivo
+    binário (UTF-8, com ou sem BOM) ou de texto.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8-sig")()
+    buf = ""
+    pos = 0
+    eof = False
+    fast = True
+
+    def more():
+        nonlocal buf, pos, eof, fast
+        fast = True
+        chunk = fp.read(read_bytes)
+        if not chunk:
+            eof = True
+            if isinstance(chunk, bytes):
+                buf = buf[pos:] + utf8.decode(b"", final=True)
+                pos = 0
+            return
+        if isinstance(chunk, bytes):
+            chunk = utf8.decode(chunk)
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            more()
+
+    skip_whitespace()
+    if pos >= len(buf) or buf[pos] != "[":
+        raise ValueError("O arquivo não contém um array JSON de amostras.")
+    pos += 1
+
+    expect_value = True
+    while True:
+        skip_whitespace()
+        if pos >= len(buf):
+            raise ValueError("Fim inesperado do arquivo: o array JSON não foi fechado.")
+        ch = buf[pos]
+        if ch == "]":
+            return
+        if ch == ",":
+            if expect_value:
+                raise ValueError(f"Vírgula inesperada na posição {pos} do bloco lido.")
+            pos += 1
+            expect_value = True
+            continue
+        if not expect_value:
+            raise ValueError(f"Esperado ',' ou ']' na posição {pos} do bloco lido.")
+        # Caminho rápido: decodifica de uma vez todos os objetos completos do
+        # bloco. Se o corte cair no meio de um valor, o resto do bloco segue
+        # pelo raw_decode, objeto a objeto.
+        cut = buf.rfind("}", pos) if fast else -1
+        if cut > pos:
+            try:
+                batch = json.loads("[" + buf[pos:cut + 1] + "]")
+            except json.JSONDecodeError:
+                batch = None
+                fast = False
+            if batch:
+                pos = cut + 1
+                expect_value = False
+                yield batch
+                continue
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            more()
+            continue
+        if end == len(buf) and not eof:
+            # Um número no fim do bloco pode continuar no próximo
+            more()
+            continue
+        pos = end
+        expect_value = False
+        yield [obj]
+
+
+def iter_samples(fp, read_bytes=READ_BYTES):
+    """Itera amostra a amostra sobre o array JSON de ``fp``."""
+    for batch in iter_batches(fp, read_bytes):
+        yield from batch
+
+
+def _to_float(values, dtype):
+    try:
+        arr = np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        arr = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(np.float64)
+    return arr.astype(dtype, copy=False)
+
+
+def _to_id(values):
+    f = _to_float(values, np.float64)
+    mask = ~np.isfinite(f)
+    ints = np.where(mask, 0, f).astype(np.int32)
+    return ints, mask
+
+
+class _Interner:
+    """Dicionário valor -> código usado para montar colunas categóricas."""
+
+    def __init__(self):
+        self.categories = []
+        self._lookup = {None: -1}
+
+    def encode(self, values):
+        lookup = self._lookup
+        for v in set(values).difference(lookup):
+            lookup[v] = len(self.categories)
+            self.categories.append(v)
+        return np.fromiter(map(lookup.__getitem__, values), dtype=np.int16, count=len(values))
+
+
+def categorical_from_codes(codes, categories):
+    """Monta um ``pd.Categorical`` com as categorias em ordem lexicográfica.
+
+    A ordem alfabética mantém os ``groupby`` com a mesma ordem de saída que
+    eles têm sobre colunas de texto.
+    """
+    categories = list(categories)
+    order = sorted(range(len(categories)), key=lambda i: str(categories[i]))
+    remap = np.empty(len(categories) + 1, dtype=np.int16)
+    remap[np.asarray(order, dtype=np.intp)] = np.arange(len(order), dtype=np.int16)
+    remap[-1] = -1  # código -1 (nulo) indexa a última posição
+    return pd.Categorical.from_codes(remap[codes], categories=[categories[i] for i in order])
+
+
+def nullable_ids(ints, mask):
+    """Coluna ``nearestStimulusId`` anulável, em int16 quando os ids couberem."""
+    info = np.iinfo(np.int16)
+    valid = ints[~mask]
+    if valid.size == 0 or (valid.min() >= info.min and valid.max() <= info.max):
+        ints = ints.astype(np.int16)
+    return pd.arrays.IntegerArray(ints, mask)
+
+
+@staged("leitura do JSON")
+def read_session(fp, chunk_samples=CHUNK_SAMPLES):
+    """Lê uma sessão JSON de forma incremental e devolve um DataFrame tipado.
+
+    As colunas presentes são as que aparecem em pelo menos uma amostra, na
+    ordem de ``COLUMNS``. Campos fora desse esquema são ignorados.
+    """
+    seen = set()
+    numeric_parts = {c: [] for c in NUMERIC_DTYPES}
+    id_parts = []
+    cat_parts = {c: [] for c in CATEGORICAL_COLUMNS}
+    interners = {c: _Interner() for c in CATEGORICAL_COLUMNS}
+    pending = {c: [] for c in COLUMNS}
+
+    def flush():
+        with stage("conversão de tipos"):
+            for c, dtype in NUMERIC_DTYPES.items():
+                numeric_parts[c].append(_to_float(pending[c], dtype))
+            id_parts.append(_to_id(pending[ID_COLUMN]))
+            for c in CATEGORICAL_COLUMNS:
+                cat_parts[c].append(interners[c].encode(pending[c]))
+        for values in pending.values():
+            values.clear()
+
+    n = 0
+    for batch in iter_batches(fp):
+        start = 0
+        while start < len(batch):
+            part = batch[start:start + chunk_samples - len(pending["x"])]
+            start += len(part)
+            if not all(isinstance(sample, dict) for sample in part):
+                raise ValueError("Cada elemento do array JSON deve ser um objeto.")
+            seen.update(*part)
+            for c, values in pending.items():
+                values.extend([sample.get(c) for sample in part])
+            n += len(part)
+            if len(pending["x"]) == chunk_samples:
+                flush()
+    if pending["x"]:
+        flush()
+
+    if n == 0:
+        return pd.DataFrame()
+
+    with stage("montagem das colunas"):
+        columns = {}
+        for c in COLUMNS:
+            if c not in seen:
+                continue
+            if c in NUMERIC_DTYPES:
+                columns[c] = np.concatenate(numeric_parts[c])
+            elif c == ID_COLUMN:
+                ints = np.concatenate([p[0] for p in id_parts])
+                mask = np.concatenate([p[1] for p in id_parts])
+                columns[c] = nullable_ids(ints, mask)
+            else:
+                codes = np.concatenate(cat_parts[c])
+                columns[c] = categorical_from_codes(codes, interners[c].categories)
+        return pd.DataFrame(columns, copy=False)
+
+
+def position_from_id(ids):
+    """Reconstrói ``nearestPosition`` a partir de ``nearestStimulusId`` (mod 3)."""
+    ids = pd.to_numeric(pd.Series(ids), errors="coerce").to_numpy(np.float64, na_value=np.nan)
+    valid = np.isfinite(ids)
+    codes = np.full(len(ids), -1, dtype=np.int16)
+    codes[valid] = np.trunc(ids[valid]).astype(np.int64) % 3
+    return categorical_from_codes(codes, POSITIONS)
@@ -0,0 +1,193 @@
+"""Recepção ao vivo das amostras enviadas pelo experimento.
+
+O experimento envia lotes numerados (``seq``) de amostras em colunas, com cor
+e posição como índices em ``cores``/``posicoes``. ``LiveSession`` descarta
+lotes repetidos (o navegador reenvia tudo o que ainda não foi confirmado) e
+grava as amostras em um ``GazeRingBuffer``: colunas pré-alocadas de tamanho
+fixo, em que as amostras mais antigas são sobrescritas quando a capacidade
+acaba.
+
+Além das amostras retidas, o buffer mantém agregados acumulados desde o
+início da sessão (contagem por cor + posição e a faixa de timestamps das
+amostras válidas). Eles são atualizados em O(tamanho do lote) e produzem as
+mesmas tabelas de ``attention_tables`` sem reler as amostras.
+"""
+
+import numpy as np
+import pandas as pd
+
+from eyetracking.analysis import COLOR, DEFAULT_DT_MS, POSITION
+from eyetracking.ingest import ID_COLUMN, categorical_from_codes, nullable_ids
+
+# ~6 MB por sessão; a ~30 Hz cobre mais de 2 horas de experimento
+DEFAULT_CAPACITY = 1 << 18
+
+
+class _Dictionary:
+    """Dicionário de rótulos com códigos estáveis ao longo da sessão."""
+
+    def __init__(self):
+        self.labels = []
+        self._codes = {}
+
+    def remap(self, labels):
+        """Tabela que converte os códigos do navegador nos códigos locais.
+
+        A última posição corresponde ao código -1 (nulo).
+        """
+        table = np.empty(len(labels) + 1, dtype=np.int16)
+        for i, label in enumerate(labels):
+            code = self._codes.get(label)
+            if code is None:
+                code = self._codes[label] = len(self.labels)
+                self.labels.append(label)
+            table[i] = code
+        table[-1] = -1
+        return table
+
+
+class GazeRingBuffer:
+    """Últimas ``capacity`` amostras de uma sessão em colunas tipadas."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.x = np.empty(capacity, dtype=np.float32)
+        self.y = np.empty(capacity, dtype=np.float32)
+        self.timestamp = np.empty(capacity, dtype=np.float64)
+        self.ids = np.empty(capacity, dtype=np.int32)
+        self.color = np.empty(capacity, dtype=np.int16)
+        self.position = np.empty(capacity, dtype=np.int16)
+        self.colors = _Dictionary()
+        self.positions = _Dictionary()
+
+        self.total = 0            # amostras recebidas desde o início
+        self.counts = np.zeros((0, 0), dtype=np.int64)  # cor x posição
+        self.n_valid = 0
+        self.t_min = np.inf
+        self.t_max = -np.inf
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.x, self.y, self.timestamp, self.ids, self.color, self.position))
+
+    def append(self, x, y, timestamp, ids, color, position):
+        """Acrescenta amostras (arrays de mesmo tamanho; códigos locais, -1 = nulo)."""
+        n = len(timestamp)
+        if n == 0:
+            return
+        self._update_aggregates(timestamp, color, position)
+
+        # Se o lote for maior que o buffer, só as últimas amostras cabem
+        skip = max(0, n - self.capacity)
+        slots = (self.total + skip + np.arange(n - skip)) % self.capacity
+        for column, values in (
+            (self.x, x), (self.y, y), (self.timestamp, timestamp),
+            (self.ids, ids), (self.color, color), (self.position, position),
+        ):
+            column[slots] = values[skip:]
+        self.total += n
+
+    def _update_aggregates(self, timestamp, color, position):
+        valid = (color >= 0) & (position >= 0) & np.isfinite(timestamp)
+        if not valid.any():
+            return
+        c, p = color[valid], position[valid]
+        shape = (max(self.counts.shape[0], int(c.max()) + 1), max(self.counts.shape[1], int(p.max()) + 1))
+        if shape != self.counts.shape:
+            grown = np.zeros(shape, dtype=np.int64)
+            grown[:self.counts.shape[0], :self.counts.shape[1]] = self.counts
+            self.counts = grown
+        np.add.at(self.counts, (c, p), 1)
+        t = timestamp[valid]
+        self.n_valid += len(t)
+        self.t_min = min(self.t_min, float(t.min()))
+        self.t_max = max(self.t_max, float(t.max()))
+
+    def _order(self):
+        n = len(self)
+        return (self.total - n + np.arange(n)) % self.capacity
+
+    def frame(self):
+        """DataFrame (cópia) das amostras retidas, no formato de ``read_session``."""
+        order = self._order()
+        ids = self.ids[order]
+        mask = ids < 0
+        return pd.DataFrame({
+            "x": self.x[order],
+            "y": self.y[order],
+            "timestamp": self.timestamp[order],
+            ID_COLUMN: nullable_ids(np.where(mask, 0, ids), mask),
+            COLOR: categorical_from_codes(self.color[order], self.colors.labels).remove_unused_categories(),
+            POSITION: categorical_from_codes(self.position[order], self.positions.labels).remove_unused_categories(),
+        })
+
+    def dt_ms(self):
+        """dt médio de todas as amostras válidas já recebidas (como ``estimate_dt_ms``)."""
+        if self.n_valid < 2:
+            return DEFAULT_DT_MS
+        return (self.t_max - self.t_min) / (self.n_valid - 1)
+
+    def attention_tables(self):
+        """Tabelas ``cor``/``posicao``/``agg`` acumuladas desde o início da sessão."""
+        dt_s = self.dt_ms() / 1000.0
+        colors = np.asarray(self.colors.labels[:self.counts.shape[0]], dtype=object)
+        positions = np.asarray(self.positions.labels[:self.counts.shape[1]], dtype=object)
+        c, p = np.nonzero(self.counts)
+        agg = pd.DataFrame({COLOR: colors[c], POSITION: positions[p], "num_samples": self.counts[c, p]})
+        agg = agg.sort_values([COLOR, POSITION], ignore_index=True)
+        tables = {
+            "cor": agg.groupby(COLOR, as_index=False)["num_samples"].sum(),
+            "posicao": agg.groupby(POSITION, as_index=False)["num_samples"].sum(),
+            "agg": agg,
+        }
+        for table in tables.values():
+            table["tempo_atencao_s"] = table["num_samples"] * dt_s
+        return tables
+
+
+class LiveSession:
+    """Estado do canal ao vivo de um participante (uma aba do navegador)."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.session_id = None
+        self.last_seq = 0
+        self.buffer = GazeRingBuffer(capacity)
+        self.sampling = None  # taxa e jitter medidos pelo navegador
+
+    def receive(self, value):
+        """Processa o valor enviado pelo componente; devolve quantas amostras entraram.
+
+        Um ``sessao`` diferente do atual (página recarregada) reinicia o buffer.
+        """
+        if not value:
+            return 0
+        if value.get("sessao") != self.session_id:
+            self.session_id = value.get("sessao")
+            self.last_seq = 0
+            self.buffer = GazeRingBuffer(self.capacity)
+        self.sampling = value.get("amostragem", self.sampling)
+
+        colors = self.buffer.colors.remap(value.get("cores", []))
+        positions = self.buffer.positions.remap(value.get("posicoes", []))
+
+        received = 0
+        for batch in sorted(value.get("lotes", []), key=lambda b: b["seq"]):
+            if batch["seq"] <= self.last_seq:
+                continue
+            color = np.asarray(batch["cor"], dtype=np.int64)
+            position = np.asarray(batch["pos"], dtype=np.int64)
+            self.buffer.append(
+                np.asarray(batch["x"], dtype=np.float64),
+                np.asarray(batch["y"], dtype=np.float64),
+                np.asarray(batch["t"], dtype=np.float64),
+                np.asarray(batch["id"], dtype=np.int64),
+                colors[color],
+                positions[position],
+            )
+            self.last_seq = batch["seq"]
+            received += len(batch["t"])
+        return received
@@ -0,0 +1,190 @@
+"""Teste de carga: várias sessões do app ao mesmo tempo em um processo.
+
+O Streamlit atende cada participante em uma thread do mesmo processo. Aqui
+cada sessão simulada é uma thread que repete ``reruns`` vezes o trabalho que
+o app faz por participante: recebe o arquivo (cobrado do orçamento da
+sessão), lê a sessão pelo cache compartilhado (chave = hash do conteúdo),
+limpa, agrega, detecta fixações e obtém o modelo pelo repositório com cache
+em memória. ``distinct`` controla quantos arquivos diferentes existem: com
+menos arquivos que sessões, várias sessões compartilham a mesma leitura e o
+mesmo modelo.
+
+O resultado mostra a latência de cada rodada, o uso do cache e a memória do
+processo (RSS, amostrada durante o teste), para dimensionar o servidor::
+
+    python -m eyetracking carga -n 16 --amostras 100000 --distintas 4
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from eyetracking.resources import (
+    MB,
+    SESSION_BUDGET_MB,
+    SHARED_CACHE_MB,
+    MemoryBudgetError,
+    SessionBudget,
+    SharedCache,
+)
+
+SESSIONS = 8
+SAMPLES = 100_000
+REPEATS = 3
+# Intervalo entre as leituras de memória do processo (s)
+RSS_INTERVAL_S = 0.05
+
+
+def rss_bytes():
+    """Memória residente do processo (``None`` se o sistema não informar)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Sem /proc, só o pico do processo inteiro (KB no Linux, bytes no macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class _RssMonitor(threading.Thread):
+    """Maior RSS observado enquanto o teste roda."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.start_bytes = rss_bytes()
+        self.peak = self.start_bytes
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(RSS_INTERVAL_S):
+            current = rss_bytes()
+            if current is not None and (self.peak is None or current > self.peak):
+                self.peak = current
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+def _participant(index, path, reruns, cache, store, budget_bytes, fixations):
+    """Rodadas de uma sessão simulada; uma linha por rodada."""
+    from eyetracking.analysis import attention_tables, estimate_dt_ms, load_session, valid_samples
+    from eyetracking.fixations import detect_fixations
+    from eyetracking.model import label_high_attention
+    from eyetracking.pipeline import MIN_TRAIN_ROWS
+
+    budget = SessionBudget(budget_bytes)
+    rows = []
+    for rerun in range(reruns):
+        start = time.perf_counter()
+        row = {"sessao": index, "arquivo": os.path.basename(path), "rodada": rerun}
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+            budget.charge("arquivo enviado", len(content))
+            key = hashlib.sha256(content).hexdigest()
+            read = []
+            df, _ = cache.get_or_create(("sessao", key), lambda: read.append(True) or load_session(content))
+            row["sessao_do_cache"] = not read
+            df_valid = valid_samples(df)
+            tabelas = attention_tables(df_valid, estimate_dt_ms(df_valid) / 1000.0)
+            if fixations:
+                cache.get_or_create(("fixacoes", key), lambda: detect_fixations(df)[1])
+            if store is not None and len(tabelas["agg"]) >= MIN_TRAIN_ROWS:
+                agg, _ = label_high_attention(tabelas["agg"])
+                _, _, row["modelo_reaproveitado"] = store.get_or_train(agg, n_jobs=1)
+        except MemoryBudgetError as e:
+            row["erro"] = str(e)
+        row["tempo_s"] = time.perf_counter() - start
+        row["memoria_sessao_mb"] = budget.nbytes / MB
+        rows.append(row)
+    return rows
+
+
+def run_load_test(
+    sessions=SESSIONS,
+    samples=SAMPLES,
+    distinct=None,
+    reruns=REPEATS,
+    workers=None,
+    train=True,
+    fixations=True,
+    cache_mb=SHARED_CACHE_MB,
+    budget_mb=SESSION_BUDGET_MB,
+    data_dir=None,
+    seed=0,
+    progress=None,
+):
+    """Roda ``sessions`` sessões simuladas ao mesmo tempo.
+
+    ``distinct`` é o número de arquivos diferentes (padrão: um por sessão);
+    ``workers`` limita quantas sessões rodam ao mesmo tempo (padrão: todas).
+    ``progress(feitas, total)`` é chamado ao fim de cada sessão.
+
+    Retorna ``(rodadas, resumo)``: um DataFrame com uma linha por sessão e
+    rodada, e um dicionário com latências, taxa de acerto do cache e memória.
+    """
+    from eyetracking.benchmark import dataset
+    from eyetracking.model_store import ModelStore
+
+    distinct = min(distinct or sessions, sessions)
+    with tempfile.TemporaryDirectory(prefix="eyetracking-carga-") as tmpdir:
+        data_dir = data_dir or tmpdir
+        os.makedirs(data_dir, exist_ok=True)
+        paths = [dataset(data_dir, samples, seed + i, ext="json") for i in range(distinct)]
+
+        cache = SharedCache(cache_mb * MB)
+        store = ModelStore(os.path.join(tmpdir, "modelos"), cache=cache) if train else None
+        monitor = _RssMonitor()
+        monitor.start()
+        rows, done = [], 0
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers or sessions) as pool:
+            futures = [
+                pool.submit(_participant, i, paths[i % distinct], reruns, cache, store, budget_mb * MB, fixations)
+                for i in range(sessions)
+            ]
+            for future in futures:
+                rows.extend(future.result())
+                done += 1
+                if progress:
+                    progress(done, sessions)
+        elapsed = time.perf_counter() - start
+        monitor.stop()
+
+    rodadas = pd.DataFrame(rows)
+    ok = rodadas[rodadas["erro"].isna()] if "erro" in rodadas else rodadas
+    times = ok["tempo_s"].to_numpy()
+    summary = {
+        "sessoes": sessions,
+        "simultaneas": min(workers or sessions, sessions),
+        "arquivos_distintos": distinct,
+        "amostras_por_sessao": samples,
+        "rodadas": len(rodadas),
+        "recusadas": len(rodadas) - len(ok),
+        "tempo_total_s": elapsed,
+        "rodadas_por_s": len(rodadas) / elapsed if elapsed > 0 else float("inf"),
+        "latencia_p50_s": float(np.percentile(times, 50)) if len(times) else None,
+        "latencia_p95_s": float(np.percentile(times, 95)) if len(times) else None,
+        "latencia_max_s": float(times.max()) if len(times) else None,
+    }
+    summary.update({f"cache_{k}": v for k, v in cache.stats().items()})
+    if monitor.start_bytes is not None and monitor.peak is not None:
+        growth = monitor.peak - monitor.start_bytes
+        summary["rss_inicial_mb"] = monitor.start_bytes / MB
+        summary["rss_pico_mb"] = monitor.peak / MB
+        # Estimativa grosseira para dimensionar: crescimento por sessão simultânea
+        summary["mb_por_sessao"] = growth / MB / summary["simultaneas"]
+    return rodadas, summary
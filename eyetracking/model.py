@@ -0,0 +1,88 @@
+"""Rótulo de alta/baixa atenção e classificador sobre a tabela cor + posição.
+
+O scikit-learn só é importado no treino: o rótulo e as constantes deste
+módulo não pagam pelo import.
+"""
+
+from eyetracking.analysis import COLOR, POSITION
+from eyetracking.profiling import stage, staged
+
+FEATURES = [COLOR, POSITION]
+TARGET = "alta_atencao"
+PREDICTION = "alta_atencao_prevista"
+
+# Abaixo disso não há como separar treino e teste
+MIN_HOLDOUT_ROWS = 4
+
+
+@staged("rótulo de alta atenção")
+def label_high_attention(agg):
+    """Rotula cada linha de ``agg`` como alta atenção (1) se o tempo >= mediana.
+
+    Retorna ``(agg_rotulada, limiar)``; ``agg`` não é alterada.
+    """
+    limiar = agg["tempo_atencao_s"].median()
+    agg = agg.copy()
+    agg[TARGET] = (agg["tempo_atencao_s"] >= limiar).astype(int)
+    return agg, limiar
+
+
+@staged("treino do modelo")
+def train_attention_model(agg, n_estimators=100, random_state=42, n_jobs=-1):
+    """Treina o RandomForest sobre ``agg`` rotulada e avalia o modelo.
+
+    Com menos de ``MIN_HOLDOUT_ROWS`` linhas o modelo é avaliado sobre os
+    próprios dados de treino (``holdout`` = False). ``n_jobs`` segue o
+    scikit-learn (-1 = todos os núcleos; o resultado não depende dele).
+    Retorna um dicionário com ``encoder``, ``modelo``, ``holdout`` e
+    ``relatorio``.
+    """
+    with stage("importação do scikit-learn"):
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.metrics import classification_report
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import OneHotEncoder
+
+    with stage("codificação (one-hot)"):
+        X_cat = agg[FEATURES].astype(str)
+        y = agg[TARGET]
+
+        # Cores/posições que não apareceram no treino viram zeros ao prever
+        enc = OneHotEncoder(sparse_output=False, handle_unknown="ignore")
+        X_encoded = enc.fit_transform(X_cat)
+
+    clf = RandomForestClassifier(n_estimators=n_estimators, random_state=random_state, n_jobs=n_jobs)
+    holdout = len(agg) >= MIN_HOLDOUT_ROWS
+    if holdout:
+        X_train, X_test, y_train, y_test = train_test_split(
+            X_encoded, y, test_size=0.3, random_state=random_state
+        )
+    else:
+        X_train, X_test, y_train, y_test = X_encoded, X_encoded, y, y
+
+    with stage("ajuste (fit)"):
+        clf.fit(X_train, y_train)
+    with stage("avaliação"):
+        y_pred = clf.predict(X_test)
+        relatorio = classification_report(y_test, y_pred)
+
+    return {
+        "encoder": enc,
+        "modelo": clf,
+        "holdout": holdout,
+        "relatorio": relatorio,
+    }
+
+
+@staged("previsão")
+def predict_attention(modelo, agg):
+    """Aplica um modelo já treinado a outra tabela cor + posição, sem reajustar.
+
+    ``modelo`` é o dicionário de ``train_attention_model`` (ou o carregado do
+    ``ModelStore``). Retorna uma cópia de ``agg`` com a coluna
+    ``alta_atencao_prevista``.
+    """
+    X_encoded = modelo["encoder"].transform(agg[FEATURES].astype(str))
+    agg = agg.copy()
+    agg[PREDICTION] = modelo["modelo"].predict(X_encoded)
+    return agg
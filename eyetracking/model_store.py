@@ -0,0 +1,143 @@
+"""Armazenamento em disco dos modelos de atenção já treinados.
+
+Cada modelo (encoder + RandomForest + relatório) é gravado com ``joblib`` em
+``<chave>.joblib``, ao lado de um ``<chave>.json`` pequeno com a descrição.
+A chave é um SHA-256 da tabela de treino (na ordem das linhas, que define a
+divisão treino/teste), dos hiperparâmetros e da versão do scikit-learn; a
+mesma sessão com os mesmos parâmetros reaproveita o modelo em vez de
+treinar de novo.
+
+Ao passar de ``max_models`` modelos, os usados há mais tempo são apagados
+(cada leitura atualiza a data de modificação do arquivo).
+
+Com ``cache`` (um ``eyetracking.resources.SharedCache``), os modelos lidos ou
+treinados também ficam em memória, compartilhados por todas as sessões do
+processo: a mesma tabela de treino é lida do disco (ou treinada) uma vez só.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from importlib.metadata import version
+
+import pandas as pd
+
+from eyetracking.model import FEATURES, TARGET, train_attention_model
+from eyetracking.profiling import stage, staged
+
+DEFAULT_DIR = os.environ.get(
+    "EYETRACKING_MODELOS", os.path.join(os.path.expanduser("~"), ".cache", "eyetracking", "modelos")
+)
+MAX_MODELS = 20
+
+
+@staged("chave do modelo (hash)")
+def training_key(agg, **params):
+    """Chave do modelo: hash das linhas de treino e dos hiperparâmetros."""
+    data = agg[FEATURES + [TARGET]].astype(str)
+    h = hashlib.sha256()
+    h.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+    h.update(json.dumps(params, sort_keys=True).encode())
+    # Versão pelos metadados do pacote: não importa o scikit-learn
+    h.update(version("scikit-learn").encode())
+    return h.hexdigest()
+
+
+class ModelStore:
+    """Diretório de modelos com reaproveitamento e descarte dos menos usados."""
+
+    def __init__(self, root=DEFAULT_DIR, max_models=MAX_MODELS, cache=None):
+        self.root = root
+        self.max_models = max_models
+        self.cache = cache
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key, ext):
+        return os.path.join(self.root, f"{key}.{ext}")
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key, "joblib"))
+
+    def load(self, key):
+        """Modelo gravado em ``key`` (dicionário de ``train_attention_model``)."""
+        if self.cache is None:
+            return self._read(key)
+        return self.cache.get_or_create(("modelo", key), lambda: self._read(key))
+
+    @staged("leitura do modelo salvo")
+    def _read(self, key):
+        import joblib
+
+        path = self._path(key, "joblib")
+        modelo = joblib.load(path)
+        os.utime(path)
+        return modelo
+
+    @staged("gravação do modelo")
+    def save(self, key, modelo, **info):
+        """Grava ``modelo`` (escrita atômica) e descarta os excedentes."""
+        import joblib
+
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        os.close(fd)
+        joblib.dump(modelo, tmp)
+        os.replace(tmp, self._path(key, "joblib"))
+        with open(self._path(key, "json"), "w", encoding="utf-8") as f:
+            json.dump(dict(info, chave=key, criado_em=time.strftime("%Y-%m-%d %H:%M:%S")), f, ensure_ascii=False)
+        self.evict()
+
+    def entries(self):
+        """Descrição dos modelos gravados, do usado mais recentemente ao mais antigo."""
+        found = []
+        for name in os.listdir(self.root):
+            if not name.endswith(".joblib"):
+                continue
+            key = name[: -len(".joblib")]
+            info = {"chave": key}
+            try:
+                with open(self._path(key, "json"), encoding="utf-8") as f:
+                    info.update(json.load(f))
+            except (OSError, ValueError):
+                pass
+            try:
+                info["usado_em"] = os.path.getmtime(self._path(key, "joblib"))
+            except FileNotFoundError:
+                continue  # descartado por outra sessão depois do listdir
+            found.append(info)
+        return sorted(found, key=lambda e: e["usado_em"], reverse=True)
+
+    def evict(self):
+        for info in self.entries()[self.max_models:]:
+            for ext in ("joblib", "json"):
+                try:
+                    os.remove(self._path(info["chave"], ext))
+                except FileNotFoundError:
+                    pass
+
+    def get_or_train(self, agg, n_estimators=100, random_state=42, n_jobs=-1, **info):
+        """Modelo para ``agg`` rotulada: do disco, se existir, ou treinado e gravado.
+
+        Retorna ``(modelo, chave, do_cache)``. ``info`` vai para a descrição
+        (por exemplo, o nome do arquivo da sessão).
+        """
+        key = training_key(agg, n_estimators=n_estimators, random_state=random_state)
+        trained = []
+
+        def read_or_train():
+            if key in self:
+                try:
+                    return self._read(key)
+                except Exception:
+                    pass  # arquivo corrompido ou de outra versão: treina de novo
+            modelo = train_attention_model(agg, n_estimators=n_estimators, random_state=random_state, n_jobs=n_jobs)
+            self.save(key, modelo, linhas=len(agg), n_estimators=n_estimators, random_state=random_state, **info)
+            trained.append(True)
+            return modelo
+
+        if self.cache is None:
+            modelo = read_or_train()
+        else:
+            modelo = self.cache.get_or_create(("modelo", key), read_or_train)
+        return modelo, key, not trained
@@ -0,0 +1,93 @@
+"""Pipeline completo de uma sessão, sem Streamlit.
+
+Encadeia as etapas de ``eyetracking.analysis`` (leitura, limpeza, posições,
+dt, agregações) e de ``eyetracking.model`` (rótulo e treino)::
+
+    from eyetracking.pipeline import run_pipeline
+    resultado = run_pipeline("gaze_data_experimento.json")
+    resultado["tabelas"]["agg"]
+"""
+
+import os
+
+from eyetracking.analysis import attention_tables, estimate_dt_ms, load_session, valid_samples
+
+# Mínimo de combinações cor + posição para treinar o classificador
+MIN_TRAIN_ROWS = 2
+
+
+def run_pipeline(
+    source,
+    train=True,
+    n_estimators=100,
+    random_state=42,
+    aois=None,
+    model_store=None,
+    smoothing=None,
+    relabel_smoothed=False,
+):
+    """Executa o pipeline sobre uma sessão (caminho ou bytes, JSON, ``.npz`` ou ``.etz``).
+
+    Com ``smoothing`` (``"one_euro"``, ``"kalman"`` ou ``"median"``), x/y são
+    suavizados por ``eyetracking.smoothing.smooth_session`` antes de tudo; com
+    ``relabel_smoothed=True``, o estímulo mais próximo é refeito pelo olhar
+    suavizado.
+
+    Com ``aois`` (caminho de JSON, lista de definições ou ``AOISet``), cor e
+    posição de cada amostra são refeitas por ``eyetracking.aoi.relabel``
+    antes das agregações.
+
+    Levanta ``ValueError`` se a sessão estiver vazia ou sem amostras válidas e
+    ``KeyError`` (com a lista de colunas) se faltarem colunas necessárias.
+
+    Retorna um dicionário com ``df``, ``df_valid``, ``posicao_reconstruida``,
+    ``dt_medio_ms`` e ``tabelas`` (``cor``, ``posicao``, ``agg``). Com
+    ``train=True`` inclui também ``agg_rotulada``, ``limiar`` e ``modelo``
+    (resultado de ``train_attention_model``), ou ``modelo = None`` se houver
+    menos de ``MIN_TRAIN_ROWS`` combinações. Com ``model_store``
+    (``eyetracking.model_store.ModelStore``), o modelo é reaproveitado do
+    disco quando já existe e ``chave_modelo`` identifica o modelo gravado.
+    """
+    df, posicao_reconstruida = load_session(source)
+    if df.empty:
+        raise ValueError("A sessão está vazia.")
+
+    if smoothing is not None:
+        from eyetracking.smoothing import smooth_session
+
+        df = smooth_session(df, smoothing, relabel_nearest=relabel_smoothed)
+
+    if aois is not None:
+        from eyetracking.aoi import relabel
+
+        df = relabel(df, aois)
+
+    df_valid = valid_samples(df)
+    if df_valid.empty:
+        raise ValueError("Nenhuma amostra válida encontrada com estímulo associado.")
+
+    dt_ms = estimate_dt_ms(df_valid)
+    result = {
+        "df": df,
+        "df_valid": df_valid,
+        "posicao_reconstruida": posicao_reconstruida,
+        "dt_medio_ms": dt_ms,
+        "tabelas": attention_tables(df_valid, dt_ms / 1000.0),
+    }
+
+    if train:
+        from eyetracking.model import label_high_attention, train_attention_model
+
+        agg = result["tabelas"]["agg"]
+        result["agg_rotulada"], result["limiar"] = label_high_attention(agg)
+        result["modelo"] = None
+        if len(agg) >= MIN_TRAIN_ROWS and model_store is not None:
+            arquivo = os.path.basename(source) if isinstance(source, (str, os.PathLike)) else None
+            result["modelo"], result["chave_modelo"], _ = model_store.get_or_train(
+                result["agg_rotulada"], n_estimators=n_estimators, random_state=random_state, arquivo=arquivo
+            )
+        elif len(agg) >= MIN_TRAIN_ROWS:
+            result["modelo"] = train_attention_model(
+                result["agg_rotulada"], n_estimators=n_estimators, random_state=random_state
+            )
+    return result
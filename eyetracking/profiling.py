@@ -0,0 +1,156 @@
+"""Tempo e pico de memória de cada etapa da análise.
+
+As funções do pacote marcam suas etapas com ``stage("nome")``. Fora de um
+``profile()`` isso não faz nada (uma consulta a uma ``ContextVar``); dentro
+dele, cada etapa registra o número de chamadas, o tempo total e, com
+``memory=True``, o pico de memória alocada acima do início da etapa e a
+memória que continuou alocada no fim (via ``tracemalloc``, que também
+acompanha os arrays do numpy)::
+
+    from eyetracking.profiling import profile
+
+    with profile(memory=True) as profiler:
+        run_pipeline("gaze_data_experimento.json")
+    print(profiler.table())
+
+Etapas aninhadas aparecem com o nível de aninhamento; uma etapa chamada
+várias vezes (por exemplo, a conversão de cada bloco na leitura) acumula os
+tempos em uma linha só. O ``tracemalloc`` deixa as alocações mais lentas e é
+global ao processo: os picos de memória são aproximados quando várias
+análises rodam ao mesmo tempo.
+"""
+
+import contextlib
+import contextvars
+import functools
+import json
+import time
+import tracemalloc
+
+_active = contextvars.ContextVar("eyetracking_profiler", default=None)
+
+MB = 1024 * 1024
+
+
+class Profiler:
+    """Registros por etapa, na ordem em que as etapas começaram."""
+
+    def __init__(self, memory=False, on_update=None):
+        self.memory = memory
+        self.on_update = on_update  # chamado ao fim de cada etapa de nível 0
+        self.records = {}
+        self._stack = []  # [nome, início, memória no início, pico até agora]
+        self.started = time.time()
+
+    def _enter(self, name):
+        level = len(self._stack)
+        if name not in self.records:
+            self.records[name] = {
+                "etapa": name, "nivel": level, "chamadas": 0, "tempo_s": 0.0, "pico_mb": 0.0, "retida_mb": 0.0,
+            }
+        current = 0
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                self._stack[-1][3] = max(self._stack[-1][3], peak)
+            tracemalloc.reset_peak()
+        self._stack.append([name, time.perf_counter(), current, current])
+
+    def _exit(self):
+        name, start, mem_start, mem_peak = self._stack.pop()
+        record = self.records[name]
+        record["chamadas"] += 1
+        record["tempo_s"] += time.perf_counter() - start
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            mem_peak = max(mem_peak, peak)
+            record["pico_mb"] = max(record["pico_mb"], (mem_peak - mem_start) / MB)
+            record["retida_mb"] += (current - mem_start) / MB
+            if self._stack:
+                self._stack[-1][3] = max(self._stack[-1][3], mem_peak)
+        if not self._stack and self.on_update is not None:
+            self.on_update(self)
+
+    def rows(self):
+        return list(self.records.values())
+
+    def table(self):
+        """DataFrame com uma linha por etapa."""
+        import pandas as pd
+
+        columns = ["etapa", "nivel", "chamadas", "tempo_s", "pico_mb", "retida_mb"]
+        table = pd.DataFrame(self.rows(), columns=columns)
+        return table if self.memory else table.drop(columns=["pico_mb", "retida_mb"])
+
+    def to_dict(self, **extra):
+        return dict(
+            extra,
+            inicio=time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            memoria=self.memory,
+            etapas=self.rows(),
+        )
+
+    def to_json(self, **extra):
+        """Registros em JSON (``extra`` entra no objeto de nível superior)."""
+        return json.dumps(self.to_dict(**extra), ensure_ascii=False)
+
+
+@contextlib.contextmanager
+def profile(memory=False, on_update=None):
+    """Ativa um ``Profiler`` no contexto atual (thread/tarefa)."""
+    profiler = Profiler(memory=memory, on_update=on_update)
+    started_tracing = memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    token = _active.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _active.reset(token)
+        if started_tracing:
+            tracemalloc.stop()
+
+
+@contextlib.contextmanager
+def _measured(profiler, name):
+    profiler._enter(name)
+    try:
+        yield
+    finally:
+        profiler._exit()
+
+
+def stage(name):
+    """Marca uma etapa; sem ``profile()`` ativo, não mede nada."""
+    profiler = _active.get()
+    if profiler is None:
+        return contextlib.nullcontext()
+    return _measured(profiler, name)
+
+
+def staged(name):
+    """Decorador: a função inteira é a etapa ``name``."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def activate(profiler):
+    """Torna ``profiler`` (ou ``None``) o ativo no contexto atual, sem prazo.
+
+    Para scripts que não cabem em um ``with``, como o app do Streamlit, que
+    pode parar no meio com ``st.stop()``.
+    """
+    _active.set(profiler)
+
+
+def current():
+    """``Profiler`` ativo no contexto atual, ou ``None``."""
+    return _active.get()
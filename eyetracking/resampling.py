@@ -0,0 +1,260 @@
+"""Intervalos de confiança (bootstrap) e testes de permutação da atenção por ensaio.
+
+A atenção de um estímulo em um ensaio é a permanência do olhar nele
+(``eyetracking.trials.trial_metrics``), em segundos. Para cada cor e cada
+posição:
+
+- média da atenção por ensaio, com intervalo de confiança por percentis do
+  bootstrap (ensaios reamostrados com reposição dentro de cada
+  participante);
+- para cada par de cores (ou de posições), a diferença das médias, o
+  intervalo dela (das mesmas reamostragens do bootstrap) e o p-valor
+  bilateral de um teste de permutação que troca os rótulos dos ensaios
+  dentro de cada participante. ``p_holm`` corrige os p-valores para as
+  várias comparações (Holm-Bonferroni).
+
+As reamostragens são operações sobre matrizes (uma linha por reamostragem):
+os índices e as chaves da permutação são sorteados de uma vez e as médias
+saem de somas por bloco, sem laço por reamostragem. As reamostragens são
+divididas em blocos de tamanho fixo, cada um com sua semente
+(``SeedSequence.spawn``), que rodam em paralelo em um
+``ProcessPoolExecutor``; o resultado não depende do número de processos.
+
+Um estímulo nunca olhado não tem cor registrada: nas cores entram só os
+ensaios em que a cor recebeu ao menos uma amostra. Nas posições entram todos
+os ensaios (0 s nas posições não olhadas).
+
+Pela linha de comando::
+
+    python -m eyetracking lote pasta_das_sessoes --ic [--reamostras 10000]
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from eyetracking.analysis import COLOR, POSITION
+from eyetracking.batch import PARTICIPANT
+from eyetracking.profiling import staged
+from eyetracking.trials import TRIAL
+
+N_RESAMPLES = 10_000
+CONFIDENCE = 0.95
+ATTENTION = "atencao_s"
+# Elementos (reamostragens x ensaios) de cada bloco, para limitar a memória por processo
+CHUNK_ELEMENTS = 1 << 22
+
+_data = {}
+
+
+def trial_attention(estimulos, group_col):
+    """Atenção (s) por ensaio e valor de ``group_col``, a partir de ``trial_metrics``.
+
+    Mantém a coluna ``participante``, se existir (tabelas do lote).
+    """
+    keep = estimulos[group_col].notna()
+    columns = [c for c in (PARTICIPANT, TRIAL) if c in estimulos.columns] + [group_col]
+    out = estimulos.loc[keep, columns].reset_index(drop=True)
+    out[group_col] = out[group_col].astype(str)
+    out[ATTENTION] = estimulos.loc[keep, "permanencia_ms"].to_numpy(np.float64) / 1000.0
+    return out
+
+
+def _layout(values, group_col):
+    """Arrays usados nas reamostragens de uma coluna de agrupamento.
+
+    Os ensaios ficam ordenados por grupo e participante; cada elemento sabe
+    o início e o tamanho do seu bloco (grupo, participante), de onde sai o
+    bootstrap estratificado.
+    """
+    participants = values[PARTICIPANT].astype(str) if PARTICIPANT in values.columns else pd.Series("", index=values.index)
+    frame = pd.DataFrame({"g": values[group_col].to_numpy(), "p": participants.to_numpy(), "v": values[ATTENTION].to_numpy()})
+    frame = frame.sort_values(["g", "p"], kind="stable", ignore_index=True)
+    g = frame["g"].to_numpy()
+    block = pd.MultiIndex.from_arrays([frame["g"], frame["p"]]).factorize()[0]
+
+    n = len(frame)
+    block_start = np.flatnonzero(np.r_[True, block[1:] != block[:-1]]) if n else np.zeros(0, dtype=np.int64)
+    block_size = np.diff(np.r_[block_start, n])
+    labels, group_start = np.unique(g, return_index=True)
+    return {
+        "labels": labels.tolist(),
+        "values": frame["v"].to_numpy(np.float64),
+        "participants": frame["p"].to_numpy(),
+        "group_start": group_start,
+        "counts": np.diff(np.r_[group_start, n]),
+        "elem_start": np.repeat(block_start, block_size),
+        "elem_size": np.repeat(block_size, block_size),
+        "pairs": [_pair(frame, a, b) for a, b in combinations(labels.tolist(), 2)],
+    }
+
+
+def _pair(frame, a, b):
+    """Valores de dois grupos, por participante, com os de ``a`` primeiro em cada bloco."""
+    both = frame[frame["g"].isin([a, b])]
+    both = both.assign(is_b=both["g"] == b).sort_values(["p", "is_b"], kind="stable")
+    p = both["p"].to_numpy()
+    starts = np.flatnonzero(np.r_[True, p[1:] != p[:-1]]) if len(p) else np.zeros(0, dtype=np.int64)
+    bounds = np.r_[starts, len(p)]
+    is_a = ~both["is_b"].to_numpy()
+    # Só blocos com os dois grupos mudam ao trocar os rótulos
+    blocks = [(s, e) for s, e in zip(bounds[:-1], bounds[1:]) if 0 < is_a[s:e].sum() < e - s]
+    return {"values": both["v"].to_numpy(np.float64), "is_a": is_a.astype(np.float64), "blocks": blocks}
+
+
+def _bootstrap_means(rng, rows, layout):
+    """Médias de cada grupo em ``rows`` reamostragens (matriz reamostragens x grupos)."""
+    u = rng.random((rows, len(layout["values"])))
+    u *= layout["elem_size"]
+    index = u.astype(np.intp)
+    index += layout["elem_start"]
+    sums = np.add.reduceat(layout["values"][index], layout["group_start"], axis=1)
+    return sums / layout["counts"]
+
+
+def _permutation_differences(rng, rows, pair):
+    """Diferenças das médias com os rótulos trocados dentro de cada participante.
+
+    Trocar os rótulos de um bloco equivale a sortear uma chave uniforme por
+    ensaio e dar o rótulo ``a`` às ``n_a`` menores: o limiar sai de um
+    ``np.partition`` por bloco, bem mais barato que embaralhar cada linha.
+    Sorteia-se o lado menor do bloco e o outro sai do total.
+    """
+    values, is_a = pair["values"], pair["is_a"]
+    sum_a = np.full(rows, values @ is_a)
+    for start, end in pair["blocks"]:
+        block = values[start:end]
+        n_a = int(is_a[start:end].sum())
+        k = min(n_a, len(block) - n_a)
+        keys = rng.random((rows, len(block)))
+        threshold = np.partition(keys, k - 1, axis=1)[:, k - 1:k]
+        picked = (keys <= threshold) @ block
+        if k < n_a:
+            picked = block.sum() - picked
+        sum_a += picked - block @ is_a[start:end]
+    n_a = is_a.sum()
+    return sum_a / n_a - (values.sum() - sum_a) / (len(values) - n_a)
+
+
+def _init_worker(layouts):
+    _data["layouts"] = layouts
+
+
+def _run_chunk(task):
+    seed, rows = task
+    rng = np.random.default_rng(seed)
+    out = {}
+    for col, layout in _data["layouts"].items():
+        means = _bootstrap_means(rng, rows, layout)
+        diffs = [_permutation_differences(rng, rows, pair) for pair in layout["pairs"]]
+        out[col] = (means, np.column_stack(diffs) if diffs else np.empty((rows, 0)))
+    return out
+
+
+def holm(pvalues):
+    """P-valores corrigidos por Holm-Bonferroni."""
+    p = np.asarray(pvalues, dtype=np.float64)
+    m = len(p)
+    order = np.argsort(p, kind="stable")
+    adjusted = np.maximum.accumulate((m - np.arange(m)) * p[order])
+    out = np.empty(m)
+    out[order] = np.minimum(adjusted, 1.0)
+    return out
+
+
+def _tables(col, layout, means, diffs, confidence):
+    alpha = (1.0 - confidence) / 2.0
+    q = [100 * alpha, 100 * (1 - alpha)]
+    labels = layout["labels"]
+    observed = np.add.reduceat(layout["values"], layout["group_start"]) / layout["counts"] if labels else np.zeros(0)
+    participants = [
+        len(np.unique(layout["participants"][s:s + n])) for s, n in zip(layout["group_start"], layout["counts"])
+    ]
+    low, high = np.percentile(means, q, axis=0) if labels else (np.zeros(0), np.zeros(0))
+    intervalos = pd.DataFrame({
+        col: labels,
+        "ensaios": layout["counts"],
+        "participantes": participants,
+        "media_s": observed,
+        "erro_padrao_s": means.std(axis=0, ddof=1) if len(means) > 1 else np.nan,
+        "ic_inf_s": low,
+        "ic_sup_s": high,
+    })
+
+    rows = []
+    for k, (a, b) in enumerate(combinations(range(len(labels)), 2)):
+        boot = means[:, a] - means[:, b]
+        diff = observed[a] - observed[b]
+        # Bilateral; a tolerância evita que arredondamentos tirem empates da contagem
+        extreme = np.count_nonzero(np.abs(diffs[:, k]) >= abs(diff) * (1 - 1e-12))
+        rows.append({
+            f"{col}_a": labels[a],
+            f"{col}_b": labels[b],
+            "diferenca_s": diff,
+            "ic_inf_s": np.percentile(boot, q[0]),
+            "ic_sup_s": np.percentile(boot, q[1]),
+            "p_permutacao": (extreme + 1) / (len(diffs) + 1),
+        })
+    comparacoes = pd.DataFrame(
+        rows, columns=[f"{col}_a", f"{col}_b", "diferenca_s", "ic_inf_s", "ic_sup_s", "p_permutacao"]
+    )
+    comparacoes["p_holm"] = holm(comparacoes["p_permutacao"])
+    return intervalos, comparacoes
+
+
+@staged("bootstrap e permutação")
+def compare_attention(
+    estimulos,
+    group_cols=(COLOR, POSITION),
+    n_resamples=N_RESAMPLES,
+    confidence=CONFIDENCE,
+    seed=0,
+    max_workers=None,
+):
+    """Intervalos e comparações par a par da atenção por ensaio.
+
+    ``estimulos`` é a segunda tabela de ``trial_metrics`` (de uma sessão ou
+    do lote, com ``participante``). ``max_workers`` segue
+    ``ProcessPoolExecutor`` (padrão: número de núcleos; 1 roda no próprio
+    processo).
+
+    Retorna ``{coluna: (intervalos, comparacoes)}`` para cada coluna de
+    ``group_cols`` presente em ``estimulos``:
+
+    - ``intervalos``: por valor, ``ensaios``, ``participantes``, ``media_s``,
+      ``erro_padrao_s`` e o intervalo ``ic_inf_s``/``ic_sup_s``;
+    - ``comparacoes``: por par, ``diferenca_s`` (a - b), o intervalo da
+      diferença, ``p_permutacao`` e ``p_holm``.
+    """
+    if n_resamples < 1:
+        raise ValueError("O número de reamostragens precisa ser positivo.")
+    layouts = {
+        col: _layout(trial_attention(estimulos, col), col) for col in group_cols if col in estimulos.columns
+    }
+    size = max([len(layout["values"]) for layout in layouts.values()] + [1])
+    rows = max(1, CHUNK_ELEMENTS // size)
+    chunks = [min(rows, n_resamples - start) for start in range(0, n_resamples, rows)]
+    tasks = list(zip(np.random.SeedSequence(seed).spawn(len(chunks)), chunks))
+    workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+
+    if workers <= 1:
+        _init_worker(layouts)
+        parts = [_run_chunk(task) for task in tasks]
+    else:
+        # "spawn" evita herdar via fork as threads do servidor do Streamlit
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(layouts,)
+        ) as pool:
+            parts = list(pool.map(_run_chunk, tasks))
+
+    results = {}
+    for col, layout in layouts.items():
+        means = np.concatenate([part[col][0] for part in parts])
+        diffs = np.concatenate([part[col][1] for part in parts])
+        results[col] = _tables(col, layout, means, diffs, confidence)
+    return results
@@ -0,0 +1,212 @@
+"""Recursos de memória compartilhados entre as sessões do app.
+
+Com vários participantes no mesmo servidor, todas as sessões do Streamlit
+rodam em threads de um único processo. Este módulo controla o que fica em
+memória:
+
+- ``SharedCache``: cache LRU do processo, limitado em bytes, para sessões
+  lidas e modelos. A chave inclui o hash do conteúdo, então dois
+  participantes que enviam o mesmo arquivo (ou treinam a mesma tabela)
+  compartilham uma única cópia. Leituras simultâneas da mesma chave esperam
+  a primeira terminar em vez de repetir o trabalho;
+- ``SessionBudget``: orçamento de memória de uma sessão do navegador (os
+  arquivos enviados e o que fica em ``st.session_state``). O que passa do
+  orçamento é recusado com ``MemoryBudgetError``.
+
+Os limites padrão vêm das variáveis de ambiente ``EYETRACKING_LIMITE_UPLOAD_MB``,
+``EYETRACKING_MEMORIA_SESSAO_MB`` e ``EYETRACKING_CACHE_MB``.
+"""
+
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+MB = 1 << 20
+
+# Tamanho máximo de cada arquivo enviado (MB)
+MAX_UPLOAD_MB = int(os.environ.get("EYETRACKING_LIMITE_UPLOAD_MB", 200))
+# Memória própria de cada sessão do navegador (MB)
+SESSION_BUDGET_MB = int(os.environ.get("EYETRACKING_MEMORIA_SESSAO_MB", 512))
+# Sessões lidas e modelos compartilhados pelo processo (MB)
+SHARED_CACHE_MB = int(os.environ.get("EYETRACKING_CACHE_MB", 1024))
+
+
+class MemoryBudgetError(ValueError):
+    """Um item não cabe no orçamento de memória."""
+
+
+def estimate_nbytes(obj, _seen=None):
+    """Memória aproximada de ``obj`` em bytes (arrays, DataFrames, contêineres e atributos).
+
+    Objetos referenciados mais de uma vez contam uma vez só. Objetos sem
+    ``__dict__`` que não são contêineres (por exemplo, árvores do
+    scikit-learn) são medidos pelo tamanho serializado.
+    """
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return obj.nbytes if isinstance(obj, memoryview) else len(obj)
+    if obj is None or isinstance(obj, (str, int, float, bool, complex)):
+        return sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(
+            estimate_nbytes(k, seen) + estimate_nbytes(v, seen) for k, v in obj.items()
+        )
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(estimate_nbytes(v, seen) for v in obj)
+    if hasattr(obj, "__dict__"):
+        return sys.getsizeof(obj) + estimate_nbytes(vars(obj), seen)
+    try:
+        return len(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(obj)
+
+
+class SharedCache:
+    """Cache LRU limitado em bytes, seguro entre threads."""
+
+    def __init__(self, max_bytes=SHARED_CACHE_MB * MB):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()    # chave -> (valor, bytes)
+        self._lock = threading.Lock()
+        self._loading = {}               # chave -> Lock de quem está criando o valor
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes=None):
+        """Guarda ``value`` e descarta os menos usados até caber no limite.
+
+        Um valor maior que o limite inteiro não é guardado.
+        """
+        nbytes = estimate_nbytes(value) if nbytes is None else nbytes
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            if nbytes > self.max_bytes:
+                return value
+            self._entries[key] = (value, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                _, (_, freed) = self._entries.popitem(last=False)
+                self.nbytes -= freed
+                self.evictions += 1
+        return value
+
+    def get_or_create(self, key, factory, nbytes=None):
+        """Valor de ``key``; se faltar, ``factory()`` roda uma vez só, mesmo com chamadas simultâneas."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            loading = self._loading.setdefault(key, threading.Lock())
+        with loading:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    # Criado por outra thread enquanto esta esperava
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                self.misses += 1
+            try:
+                return self.put(key, factory(), nbytes)
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+
+    def discard(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.nbytes -= entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entradas": len(self._entries),
+                "memoria_mb": self.nbytes / MB,
+                "limite_mb": self.max_bytes / MB,
+                "acertos": self.hits,
+                "faltas": self.misses,
+                "taxa_acerto": self.hits / lookups if lookups else 0.0,
+                "descartes": self.evictions,
+            }
+
+
+class SessionBudget:
+    """Memória atribuída a uma sessão do navegador, por item nomeado."""
+
+    def __init__(self, max_bytes=SESSION_BUDGET_MB * MB):
+        self.max_bytes = max_bytes
+        self.items = {}
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        return sum(self.items.values())
+
+    def charge(self, name, nbytes):
+        """Atribui ``nbytes`` a ``name`` (substituindo o valor anterior).
+
+        Levanta ``MemoryBudgetError`` se o total passar do orçamento; nesse
+        caso o item não é registrado.
+        """
+        with self._lock:
+            total = self.nbytes - self.items.get(name, 0) + nbytes
+            if total > self.max_bytes:
+                raise MemoryBudgetError(
+                    f"{name}: {nbytes / MB:.1f} MB não cabem no limite de memória desta sessão "
+                    f"({total / MB:.0f} de {self.max_bytes / MB:.0f} MB). "
+                    "Remova arquivos enviados ou resultados que não estejam em uso."
+                )
+            self.items[name] = nbytes
+
+    def release(self, name):
+        with self._lock:
+            self.items.pop(name, None)
+
+    def table(self):
+        """Uso por item, do maior ao menor (MB)."""
+        rows = sorted(self.items.items(), key=lambda item: -item[1])
+        return pd.DataFrame({"item": [k for k, _ in rows], "memoria_mb": [v / MB for _, v in rows]})
@@ -0,0 +1,239 @@
+"""Classificador de atenção por amostra, treinado fora da memória.
+
+O classificador de ``eyetracking.model`` aprende com a tabela cor + posição,
+que tem no máximo algumas dezenas de linhas. Aqui cada amostra válida vira
+uma linha com atributos do olhar:
+
+- distância (px) a cada uma das três posições do triângulo;
+- velocidade (px/s) em relação à amostra anterior;
+- dispersão ``(max x - min x) + (max y - min y)`` na janela de
+  ``window_ms`` que termina na amostra;
+- tempo (ms) desde o início do ciclo de estímulos da amostra.
+
+O rótulo é o ``alta_atencao`` da combinação cor + posição da amostra,
+calculado por sessão (``label_high_attention``).
+
+O treino lê uma sessão por vez: os atributos são gravados em arquivos
+temporários em disco e lidos de volta por ``np.memmap`` em blocos de
+``chunk_samples``, com ``StandardScaler.partial_fit`` e
+``SGDClassifier.partial_fit``. A memória usada depende da maior sessão e do
+tamanho do bloco, não do total de amostras.
+
+Pela linha de comando::
+
+    python -m eyetracking treinar-amostras pasta_das_sessoes [-e 3] [--salvar modelo.joblib]
+"""
+
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import classification_report
+from sklearn.preprocessing import StandardScaler
+
+from eyetracking.analysis import COLOR, POSITION
+from eyetracking.aoi import NUM_CIRCLES, TRIANGLE_OFFSETS, estimate_center
+from eyetracking.fixations import MIN_DURATION_MS, _columns, _SparseTable, velocity
+from eyetracking.ingest import ID_COLUMN
+from eyetracking.model import PREDICTION, TARGET, label_high_attention
+
+FEATURES = [f"dist_{label}" for label in TRIANGLE_OFFSETS] + [
+    "velocidade_px_s",
+    "dispersao_px",
+    "tempo_desde_inicio_ms",
+]
+WINDOW_MS = MIN_DURATION_MS
+CHUNK_SAMPLES = 1 << 16
+EPOCHS = 3
+TEST_FRACTION = 0.2
+# Velocidade usada quando duas amostras têm o mesmo timestamp
+MAX_VELOCITY_PX_S = 1e5
+
+
+def sample_features(df, center=None, window_ms=WINDOW_MS):
+    """Atributos das amostras válidas de ``df`` (com cor e posição), em ordem de tempo.
+
+    ``center`` é o centro da janela do experimento em px (padrão: estimado
+    por ``estimate_center``). Retorna ``(rows, X)``: ``rows`` são as posições
+    das amostras em ``df`` e ``X`` é um array float32 com uma coluna por
+    item de ``FEATURES``.
+    """
+    order, x, y, t = _columns(df)
+    labeled = df[COLOR].notna().to_numpy() & df[POSITION].notna().to_numpy()
+    keep = labeled[order]
+    rows = order[keep]
+    X = np.empty((len(rows), len(FEATURES)), dtype=np.float32)
+    if len(rows) == 0:
+        return rows, X
+
+    if center is None:
+        center = estimate_center(df.iloc[rows])
+    cx, cy = center
+    xs, ys, ts = x[keep], y[keep], t[keep]
+    for j, (dx, dy) in enumerate(TRIANGLE_OFFSETS.values()):
+        X[:, j] = np.hypot(xs - (cx + dx), ys - (cy + dy))
+
+    # Velocidade e dispersão usam todas as amostras com x/y/t (não só as rotuladas)
+    X[:, 3] = np.minimum(velocity(x, y, t), MAX_VELOCITY_PX_S)[keep]
+    end = np.flatnonzero(keep)
+    start = np.searchsorted(t, t[end] - window_ms, side="left")
+    max_len = int((end - start).max()) + 1
+    x_min, x_max = _SparseTable(x, max_len).query(start, end)
+    y_min, y_max = _SparseTable(y, max_len).query(start, end)
+    X[:, 4] = (x_max - x_min) + (y_max - y_min)
+
+    # Início do ciclo: primeira amostra do ciclo (três círculos) na sessão
+    if ID_COLUMN in df.columns:
+        ids = df[ID_COLUMN].to_numpy(np.int64, na_value=-1)[rows]
+        _, cycle = np.unique(np.where(ids >= 0, ids // NUM_CIRCLES, -1), return_inverse=True)
+        onset = np.full(cycle.max() + 1, np.inf)
+        np.minimum.at(onset, cycle, ts)
+        X[:, 5] = np.where(ids >= 0, ts - onset[cycle], 0.0)
+    else:
+        X[:, 5] = 0.0
+    return rows, X
+
+
+def sample_labels(df, rows, agg_rotulada):
+    """``alta_atencao`` da combinação cor + posição de cada amostra em ``rows``."""
+    table = agg_rotulada.set_index([COLOR, POSITION])[TARGET]
+    keys = pd.MultiIndex.from_arrays([
+        df[COLOR].to_numpy(object)[rows],
+        df[POSITION].to_numpy(object)[rows],
+    ])
+    return table.reindex(keys).to_numpy(np.int8, na_value=0)
+
+
+def _spill(sources, tmpdir, center, window_ms, aois, test_fraction, random_state, scaler):
+    """Calcula os atributos sessão a sessão e grava X, y e a máscara de teste em disco."""
+    from eyetracking.pipeline import run_pipeline
+
+    rng = np.random.default_rng(random_state)
+    paths = {name: os.path.join(tmpdir, name) for name in ("X", "y", "teste")}
+    files = {name: open(path, "wb") for name, path in paths.items()}
+    n = 0
+    erros = []
+    with files["X"], files["y"], files["teste"]:
+        for source in sources:
+            try:
+                result = run_pipeline(source, train=False, aois=aois)
+            except (KeyError, ValueError) as e:
+                erros.append((source, str(e)))
+                continue
+            df = result["df"]
+            agg_rotulada, _ = label_high_attention(result["tabelas"]["agg"])
+            rows, X = sample_features(df, center=center, window_ms=window_ms)
+            y = sample_labels(df, rows, agg_rotulada)
+            test = rng.random(len(rows)) < test_fraction
+            if not test.all():
+                scaler.partial_fit(X[~test])
+            X.tofile(files["X"])
+            y.tofile(files["y"])
+            test.tofile(files["teste"])
+            n += len(rows)
+    return paths, n, erros
+
+
+def train_sample_model(
+    sources,
+    epochs=EPOCHS,
+    chunk_samples=CHUNK_SAMPLES,
+    center=None,
+    window_ms=WINDOW_MS,
+    aois=None,
+    test_fraction=TEST_FRACTION,
+    random_state=42,
+    progress=None,
+):
+    """Treina um ``SGDClassifier`` (regressão logística) por amostra, em blocos.
+
+    ``sources`` são caminhos ou bytes de sessões (JSON, ``.npz`` ou ``.etz``); ``aois``
+    segue ``run_pipeline``. Uma fração ``test_fraction`` das amostras fica
+    de fora do treino para avaliação. ``progress(etapa, concluidas, total)``
+    é chamado a cada bloco.
+
+    Retorna um dicionário com ``scaler``, ``modelo``, ``relatorio``,
+    ``acuracia``, ``amostras``, ``erros`` (sessões ignoradas) e
+    ``desempenho`` (tempos e amostras por segundo de cada etapa).
+    """
+    scaler = StandardScaler()
+    clf = SGDClassifier(loss="log_loss", random_state=random_state)
+    classes = np.array([0, 1], dtype=np.int8)
+    desempenho = {}
+
+    with tempfile.TemporaryDirectory(prefix="eyetracking-") as tmpdir:
+        t0 = time.perf_counter()
+        paths, n, erros = _spill(sources, tmpdir, center, window_ms, aois, test_fraction, random_state, scaler)
+        desempenho["atributos"] = _rate(n, time.perf_counter() - t0)
+        if n == 0:
+            raise ValueError("Nenhuma amostra válida nas sessões.")
+
+        X_all = np.memmap(paths["X"], dtype=np.float32, mode="r", shape=(n, len(FEATURES)))
+        y_all = np.memmap(paths["y"], dtype=np.int8, mode="r", shape=(n,))
+        test_all = np.memmap(paths["teste"], dtype=bool, mode="r", shape=(n,))
+        starts = np.arange(0, n, chunk_samples)
+        rng = np.random.default_rng(random_state)
+
+        # Treino: blocos em ordem aleatória a cada época
+        t0 = time.perf_counter()
+        trained = 0
+        for epoch in range(epochs):
+            for k, lo in enumerate(rng.permutation(starts)):
+                train = ~test_all[lo:lo + chunk_samples]
+                if train.any():
+                    X = scaler.transform(X_all[lo:lo + chunk_samples][train])
+                    clf.partial_fit(X, y_all[lo:lo + chunk_samples][train], classes=classes)
+                    trained += int(train.sum())
+                if progress:
+                    progress("treino", epoch * len(starts) + k + 1, epochs * len(starts))
+        desempenho["treino"] = _rate(trained, time.perf_counter() - t0)
+
+        # Avaliação: matriz de confusão acumulada bloco a bloco
+        t0 = time.perf_counter()
+        confusion = np.zeros((2, 2), dtype=np.int64)
+        for lo in starts:
+            test = np.asarray(test_all[lo:lo + chunk_samples])
+            if test.any():
+                y_pred = clf.predict(scaler.transform(X_all[lo:lo + chunk_samples][test]))
+                np.add.at(confusion, (y_all[lo:lo + chunk_samples][test], y_pred), 1)
+        desempenho["avaliacao"] = _rate(int(confusion.sum()), time.perf_counter() - t0)
+        del X_all, y_all, test_all
+
+    return {
+        "scaler": scaler,
+        "modelo": clf,
+        "relatorio": _report(confusion),
+        "acuracia": float(np.trace(confusion) / confusion.sum()) if confusion.sum() else float("nan"),
+        "amostras": n,
+        "erros": erros,
+        "desempenho": desempenho,
+    }
+
+
+def _rate(n, seconds):
+    return {"amostras": n, "tempo_s": seconds, "amostras_por_s": n / seconds if seconds > 0 else float("inf")}
+
+
+def _report(confusion):
+    """``classification_report`` a partir da matriz de confusão (pesos por célula)."""
+    if confusion.sum() == 0:
+        return "Sem amostras de teste."
+    y_true, y_pred = np.divmod(np.arange(4), 2)
+    return classification_report(
+        y_true, y_pred, labels=[0, 1], sample_weight=confusion.ravel(), zero_division=0
+    )
+
+
+def predict_samples(modelo, df, center=None, window_ms=WINDOW_MS, chunk_samples=CHUNK_SAMPLES):
+    """Alta atenção prevista por amostra (Series alinhada a ``df``; nula fora das válidas)."""
+    rows, X = sample_features(df, center=center, window_ms=window_ms)
+    values = np.zeros(len(df), dtype=np.int8)
+    mask = np.ones(len(df), dtype=bool)
+    for lo in range(0, len(rows), chunk_samples):
+        block = rows[lo:lo + chunk_samples]
+        values[block] = modelo["modelo"].predict(modelo["scaler"].transform(X[lo:lo + chunk_samples]))
+        mask[block] = False
+    return pd.Series(pd.arrays.IntegerArray(values, mask), index=df.index, name=PREDICTION)
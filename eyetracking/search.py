@@ -0,0 +1,220 @@
+"""Validação cruzada e busca de hiperparâmetros em segundo plano.
+
+Cada par (candidato, fold) é uma tarefa independente em um
+``ProcessPoolExecutor``: os dados vão para cada processo uma única vez (no
+``initializer``) e as tarefas só carregam índices e parâmetros. ``SearchJob``
+não bloqueia quem o criou: os resultados chegam um a um, à medida que os
+folds terminam, e a busca pode ser cancelada a qualquer momento (as tarefas
+que ainda não começaram são descartadas).
+
+Pela linha de comando::
+
+    python -m eyetracking buscar sessao.json [--dados amostras] [--folds 5] [--aleatoria 20] [-j N]
+"""
+
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import ParameterGrid, ParameterSampler, StratifiedKFold
+from sklearn.preprocessing import StandardScaler
+
+from eyetracking.model import FEATURES, TARGET
+
+MODELS = {
+    "random_forest": RandomForestClassifier,
+    "extra_trees": ExtraTreesClassifier,
+    "logistica": LogisticRegression,
+}
+PARAM_GRIDS = {
+    "random_forest": {"n_estimators": [50, 100, 200], "max_depth": [None, 3, 6], "min_samples_leaf": [1, 2]},
+    "extra_trees": {"n_estimators": [50, 100, 200], "max_depth": [None, 3, 6], "min_samples_leaf": [1, 2]},
+    "logistica": {"C": [0.01, 0.1, 1.0, 10.0], "class_weight": [None, "balanced"]},
+}
+# Parâmetros fixos de cada modelo (o paralelismo é o do pool)
+FIXED_PARAMS = {
+    "random_forest": {"n_jobs": 1},
+    "extra_trees": {"n_jobs": 1},
+    "logistica": {"max_iter": 1000},
+}
+LEVELS = ("agg", "amostras")
+DEFAULT_FOLDS = 5
+
+_data = {}
+
+
+def candidates(models=None, n_iter=None, random_state=42):
+    """Lista de ``(modelo, parametros)``: grade completa ou ``n_iter`` sorteados por modelo."""
+    found = []
+    for name in models or MODELS:
+        grid = ParameterGrid(PARAM_GRIDS[name])
+        if n_iter is not None and n_iter < len(grid):
+            grid = ParameterSampler(PARAM_GRIDS[name], n_iter, random_state=random_state)
+        found.extend((name, p) for p in grid)
+    return found
+
+
+def search_data(df, agg_rotulada, level="agg"):
+    """``(X, y)`` para a busca: tabela cor + posição ou uma linha por amostra.
+
+    ``level="agg"`` usa a codificação one-hot de cor + posição (como
+    ``train_attention_model``); ``level="amostras"`` usa os atributos de
+    ``eyetracking.sample_model``.
+    """
+    if level == "agg":
+        from sklearn.preprocessing import OneHotEncoder
+
+        X = OneHotEncoder(sparse_output=False).fit_transform(agg_rotulada[FEATURES].astype(str))
+        return X, agg_rotulada[TARGET].to_numpy()
+    if level == "amostras":
+        from eyetracking.sample_model import sample_features, sample_labels
+
+        rows, X = sample_features(df)
+        return X, sample_labels(df, rows, agg_rotulada)
+    raise ValueError(f"level deve ser um de {LEVELS}, não {level!r}.")
+
+
+def folds(y, n_splits=DEFAULT_FOLDS, random_state=42):
+    """Índices ``(treino, teste)`` de um k-fold estratificado.
+
+    ``n_splits`` é reduzido ao tamanho da menor classe; levanta
+    ``ValueError`` se alguma classe tiver menos de dois exemplos.
+    """
+    smallest = np.bincount(np.asarray(y)).min() if len(np.unique(y)) > 1 else 0
+    if smallest < 2:
+        raise ValueError("Cada classe precisa de pelo menos 2 exemplos para a validação cruzada.")
+    splitter = StratifiedKFold(n_splits=min(n_splits, smallest), shuffle=True, random_state=random_state)
+    return list(splitter.split(np.zeros(len(y)), y))
+
+
+def _init_worker(X, y):
+    _data["X"], _data["y"] = X, y
+
+
+def _evaluate(task):
+    """Treina e avalia um candidato em um fold; roda dentro dos processos do pool."""
+    candidate, fold, name, params, train, test, random_state = task
+    X, y = _data["X"], _data["y"]
+    start = time.perf_counter()
+
+    scaler = StandardScaler().fit(X[train])
+    estimator = MODELS[name](random_state=random_state, **FIXED_PARAMS[name], **params)
+    estimator.fit(scaler.transform(X[train]), y[train])
+    y_pred = estimator.predict(scaler.transform(X[test]))
+
+    return {
+        "candidato": candidate,
+        "fold": fold,
+        "modelo": name,
+        "parametros": json.dumps(params, sort_keys=True),
+        "acuracia": accuracy_score(y[test], y_pred),
+        "f1_macro": f1_score(y[test], y_pred, average="macro", zero_division=0),
+        "tempo_s": time.perf_counter() - start,
+    }
+
+
+class SearchJob:
+    """Busca de hiperparâmetros com validação cruzada rodando em segundo plano.
+
+    ``X``/``y`` são arrays numéricos; ``max_workers`` segue
+    ``ProcessPoolExecutor`` (padrão: número de núcleos). A busca começa na
+    criação do objeto.
+    """
+
+    def __init__(self, X, y, models=None, n_splits=DEFAULT_FOLDS, n_iter=None, random_state=42, max_workers=None):
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.int64)
+        splits = folds(y, n_splits, random_state)
+        self.candidates = candidates(models, n_iter, random_state)
+        self.n_splits = len(splits)
+        self.total = len(self.candidates) * len(splits)
+        self.started = time.perf_counter()
+        self.finished = None
+        self.cancelled = False
+        self.errors = []
+        self._results = []
+        self._lock = threading.Lock()
+
+        workers = min(max_workers or os.cpu_count() or 1, self.total)
+        # "spawn" evita herdar via fork as threads do servidor do Streamlit
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(X, y),
+        )
+        self._pending = self.total
+        for c, (name, params) in enumerate(self.candidates):
+            for f, (train, test) in enumerate(splits):
+                future = self._pool.submit(_evaluate, (c, f, name, params, train, test, random_state))
+                future.add_done_callback(self._collect)
+
+    def _collect(self, future):
+        with self._lock:
+            try:
+                self._results.append(future.result())
+            except CancelledError:
+                pass
+            except Exception as e:
+                self.errors.append(str(e))
+            self._pending -= 1
+            if self._pending == 0:
+                self.finished = time.perf_counter()
+                self._pool.shutdown(wait=False)
+
+    @property
+    def done(self):
+        return self.finished is not None
+
+    @property
+    def completed(self):
+        """Folds concluídos até agora."""
+        with self._lock:
+            return len(self._results)
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def cancel(self):
+        """Descarta as tarefas que ainda não começaram; as em andamento terminam."""
+        self.cancelled = True
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def results(self):
+        """Um registro por fold concluído, na ordem em que terminaram."""
+        with self._lock:
+            return pd.DataFrame(list(self._results))
+
+    def summary(self):
+        """Média e desvio de cada candidato (nos folds já concluídos), do melhor ao pior."""
+        results = self.results()
+        if results.empty:
+            return results
+        table = (
+            results.groupby(["candidato", "modelo", "parametros"])
+            .agg(
+                folds=("fold", "size"),
+                acuracia=("acuracia", "mean"),
+                f1_macro=("f1_macro", "mean"),
+                f1_desvio=("f1_macro", "std"),
+                tempo_s=("tempo_s", "sum"),
+            )
+            .reset_index()
+        )
+        return table.sort_values(["f1_macro", "acuracia"], ascending=False, ignore_index=True)
+
+    def wait(self, timeout=None):
+        """Bloqueia até a busca terminar (ou ``timeout`` segundos)."""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while not self.done and (deadline is None or time.perf_counter() < deadline):
+            time.sleep(0.05)
+        return self.done
@@ -0,0 +1,411 @@
+"""Banco local de sessões (SQLite), para consultar sem reler os arquivos.
+
+Cada sessão é importada uma vez (identificada pelo SHA-256 do arquivo) em
+tabelas indexadas:
+
+- ``participants``: um nome por participante;
+- ``sessions``: arquivo, participante, número de amostras, o ``dt`` médio
+  da sessão (``estimate_dt_ms`` das amostras válidas) e ``t0``, o primeiro
+  timestamp (o WebGazer conta desde o carregamento da página, não desde o
+  início da sessão);
+- ``stimuli``: cada estímulo da sessão (id, cor, posição, primeira e última
+  amostra) com o número de amostras válidas associadas a ele;
+- ``samples``: x, y, timestamp e estímulo de cada amostra, com índices por
+  sessão + timestamp e sessão + estímulo + timestamp. O estímulo só é
+  guardado nas amostras válidas (com cor e posição), as mesmas contadas em
+  ``stimuli``.
+
+As agregações de ``attention`` rodam no SQLite: sem intervalo de tempo,
+somam as contagens de ``stimuli`` (uma linha por estímulo, não por
+amostra); com intervalo (em ms desde o ``t0`` de cada sessão), descartam
+os estímulos fora dele e contam as amostras de cada estímulo pelo índice.
+O resultado tem o mesmo formato de ``attention_by``.
+
+Pela linha de comando::
+
+    python -m eyetracking importar pasta_ou_arquivos... [--participante nome] [--banco sessoes.sqlite]
+    python -m eyetracking consultar [--por cor posicao participante] [--cor red] [--inicio 0 --fim 60]
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from eyetracking.analysis import COLOR, POSITION, estimate_dt_ms, load_session, valid_samples
+from eyetracking.batch import PARTICIPANT, participant_names
+from eyetracking.ingest import ID_COLUMN, nullable_ids
+from eyetracking.profiling import staged
+
+DEFAULT_PATH = os.environ.get(
+    "EYETRACKING_BANCO", os.path.join(os.path.expanduser("~"), ".cache", "eyetracking", "sessoes.sqlite")
+)
+SESSION = "sessao"
+# Colunas de agrupamento aceitas por ``attention`` e a expressão SQL de cada uma
+GROUPS = {PARTICIPANT: "p.name", SESSION: "s.id", COLOR: "st.color", POSITION: "st.position"}
+INSERT_ROWS = 1 << 16
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS participants (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    participant_id INTEGER NOT NULL REFERENCES participants (id),
+    file TEXT,
+    hash TEXT NOT NULL UNIQUE,
+    imported_at TEXT NOT NULL,
+    n_samples INTEGER NOT NULL,
+    n_valid INTEGER NOT NULL,
+    dt_ms REAL,
+    position_rebuilt INTEGER NOT NULL,
+    t0 REAL
+);
+CREATE INDEX IF NOT EXISTS sessions_participant ON sessions (participant_id);
+CREATE TABLE IF NOT EXISTS stimuli (
+    session_id INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    stimulus_id INTEGER NOT NULL,
+    color TEXT NOT NULL,
+    position TEXT NOT NULL,
+    start_ms REAL NOT NULL,
+    end_ms REAL NOT NULL,
+    n_samples INTEGER NOT NULL,
+    PRIMARY KEY (session_id, stimulus_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS stimuli_color_position ON stimuli (color, position);
+CREATE TABLE IF NOT EXISTS samples (
+    session_id INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    t REAL,
+    x REAL,
+    y REAL,
+    stimulus_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS samples_session_t ON samples (session_id, t);
+CREATE INDEX IF NOT EXISTS samples_session_stimulus ON samples (session_id, stimulus_id, t);
+"""
+
+
+def content_hash(source):
+    """SHA-256 do arquivo (caminho) ou dos bytes; o mesmo usado pelo app."""
+    if isinstance(source, (str, os.PathLike)):
+        h = hashlib.sha256()
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        return h.hexdigest()
+    return hashlib.sha256(source).hexdigest()
+
+
+def _in(column, values, params):
+    """Condição ``column IN (?, ...)`` e seus parâmetros."""
+    values = list(values)
+    params.extend(values)
+    return f"{column} IN ({', '.join('?' * len(values))})"
+
+
+class SessionStore:
+    """Banco SQLite de sessões; use com ``with`` ou chame ``close()``."""
+
+    def __init__(self, path=None):
+        path = path or DEFAULT_PATH
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        if path != ":memory:":
+            # Leitores (outras abas, outros processos) não esperam a importação
+            self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+        self._add_t0()
+
+    def _add_t0(self):
+        # Bancos criados antes de ``t0``: a coluna sai das amostras já gravadas
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(sessions)")]
+        if "t0" not in columns:
+            with self.conn:
+                self.conn.execute("ALTER TABLE sessions ADD COLUMN t0 REAL")
+                self.conn.execute(
+                    "UPDATE sessions SET t0 = (SELECT MIN(t) FROM samples WHERE session_id = sessions.id)"
+                )
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _query(self, sql, params=()):
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    # ----- importação -----
+
+    def find(self, hash_conteudo):
+        """Id da sessão com esse hash de conteúdo, ou ``None``."""
+        row = self.conn.execute("SELECT id FROM sessions WHERE hash = ?", (hash_conteudo,)).fetchone()
+        return row[0] if row else None
+
+    @staged("importação no banco")
+    def ingest(self, source, participant=None, name=None, hash_conteudo=None):
+        """Importa uma sessão (caminho ou bytes, JSON, ``.npz`` ou ``.etz``).
+
+        ``participant`` é o nome do participante (padrão: nome do arquivo,
+        sem extensão); ``name`` é o nome do arquivo guardado (padrão: o
+        caminho). Uma sessão já importada não é lida de novo.
+
+        Retorna ``(sessao_id, nova)``. Levanta ``KeyError`` se faltar
+        ``nearestStimulusId`` (ou as colunas de ``valid_samples``) e
+        ``ValueError`` se a sessão estiver vazia.
+        """
+        hash_conteudo = hash_conteudo or content_hash(source)
+        existing = self.find(hash_conteudo)
+        if existing is not None:
+            return existing, False
+
+        df, posicao_reconstruida = load_session(source)
+        if df.empty:
+            raise ValueError("A sessão está vazia.")
+        if ID_COLUMN not in df.columns:
+            raise KeyError([ID_COLUMN])
+        df_valid = valid_samples(df)
+        t = df["timestamp"].to_numpy(np.float64, na_value=np.nan)
+        t0 = float(np.nanmin(t)) if np.isfinite(t).any() else None
+        name = name or (os.fspath(source) if isinstance(source, (str, os.PathLike)) else None)
+        if participant is None:
+            participant = participant_names([name])[0] if name else "sem nome"
+
+        with self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO participants (name) VALUES (?)", (participant,))
+            (participant_id,) = self.conn.execute(
+                "SELECT id FROM participants WHERE name = ?", (participant,)
+            ).fetchone()
+            cur = self.conn.execute(
+                "INSERT INTO sessions (participant_id, file, hash, imported_at, n_samples, n_valid, dt_ms,"
+                " position_rebuilt, t0) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    participant_id,
+                    name,
+                    hash_conteudo,
+                    time.strftime("%Y-%m-%d %H:%M:%S"),
+                    len(df),
+                    len(df_valid),
+                    estimate_dt_ms(df_valid) if len(df_valid) else None,
+                    int(posicao_reconstruida),
+                    t0,
+                ),
+            )
+            session_id = cur.lastrowid
+            self._insert_stimuli(session_id, df_valid)
+            self._insert_samples(session_id, df, df_valid)
+        return session_id, True
+
+    def _insert_stimuli(self, session_id, df_valid):
+        stimuli = (
+            pd.DataFrame({
+                "id": df_valid[ID_COLUMN].to_numpy(np.int64),
+                "cor": df_valid[COLOR].astype(str).to_numpy(),
+                "pos": df_valid[POSITION].astype(str).to_numpy(),
+                "t": df_valid["timestamp"].to_numpy(np.float64, na_value=np.nan),
+            })
+            .groupby("id", sort=True)
+            .agg(cor=("cor", "first"), pos=("pos", "first"), inicio=("t", "min"), fim=("t", "max"), n=("t", "size"))
+        )
+        self.conn.executemany(
+            "INSERT INTO stimuli VALUES (?, ?, ?, ?, ?, ?, ?)",
+            zip(
+                [session_id] * len(stimuli),
+                stimuli.index.tolist(),
+                stimuli["cor"].tolist(),
+                stimuli["pos"].tolist(),
+                stimuli["inicio"].tolist(),
+                stimuli["fim"].tolist(),
+                stimuli["n"].tolist(),
+            ),
+        )
+
+    def _insert_samples(self, session_id, df, df_valid):
+        # Estímulo só nas amostras válidas (as contadas em stimuli). O SQLite
+        # grava NaN como NULL e o id 3.0 como o inteiro 3 (afinidade INTEGER).
+        valid = np.zeros(len(df), dtype=bool)
+        valid[df.index.get_indexer(df_valid.index)] = True
+        columns = [
+            df["timestamp"].to_numpy(np.float64, na_value=np.nan),
+            df["x"].to_numpy(np.float64, na_value=np.nan),
+            df["y"].to_numpy(np.float64, na_value=np.nan),
+            np.where(valid, df[ID_COLUMN].to_numpy(np.float64, na_value=np.nan), np.nan),
+        ]
+        for lo in range(0, len(df), INSERT_ROWS):
+            t, x, y, stim = (c[lo:lo + INSERT_ROWS].tolist() for c in columns)
+            self.conn.executemany(
+                "INSERT INTO samples VALUES (?, ?, ?, ?, ?)", zip([session_id] * len(t), t, x, y, stim)
+            )
+
+    def delete(self, session_id):
+        with self.conn:
+            self.conn.execute("DELETE FROM samples WHERE session_id = ?", (session_id,))
+            self.conn.execute("DELETE FROM stimuli WHERE session_id = ?", (session_id,))
+            self.conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    # ----- consultas -----
+
+    def participants(self):
+        """Participantes e número de sessões de cada um."""
+        return self._query(
+            f"SELECT p.name AS {PARTICIPANT}, COUNT(s.id) AS sessoes FROM participants p"
+            " LEFT JOIN sessions s ON s.participant_id = p.id GROUP BY p.id ORDER BY p.name"
+        )
+
+    def sessions(self, participants=None):
+        """Sessões importadas (de ``participants``, se informado), da mais recente à mais antiga."""
+        params = []
+        where = f"WHERE {_in('p.name', participants, params)}" if participants else ""
+        return self._query(
+            f"SELECT s.id AS {SESSION}, p.name AS {PARTICIPANT}, s.file AS arquivo, s.hash,"
+            " s.imported_at AS importada_em, s.n_samples AS amostras, s.n_valid AS amostras_validas,"
+            " s.dt_ms AS dt_medio_ms, s.position_rebuilt AS posicao_reconstruida"
+            f" FROM sessions s JOIN participants p ON p.id = s.participant_id {where} ORDER BY s.id DESC",
+            params,
+        )
+
+    def colors(self):
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT color FROM stimuli ORDER BY color")]
+
+    def positions(self):
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT position FROM stimuli ORDER BY position")]
+
+    @staged("leitura do banco")
+    def samples(self, session_id, colors=None, positions=None, start_ms=None, end_ms=None):
+        """Amostras de uma sessão no formato de ``read_session``, filtradas no SQLite.
+
+        ``start_ms``/``end_ms`` limitam o tempo desde o primeiro timestamp da
+        sessão (``start_ms <= t - t0 < end_ms``); filtrar por cor ou posição
+        deixa só as amostras válidas desse estímulo.
+        """
+        params = [session_id]
+        where = ["sa.session_id = ?"]
+        if start_ms is not None or end_ms is not None:
+            # Desloca os limites (e não ``sa.t``) para o índice por timestamp valer
+            row = self.conn.execute("SELECT t0 FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            t0 = row[0] if row and row[0] is not None else 0.0
+            where += self._time_filter(
+                "sa.t",
+                None if start_ms is None else t0 + start_ms,
+                None if end_ms is None else t0 + end_ms,
+                params,
+            )
+        if colors:
+            where.append(_in("st.color", colors, params))
+        if positions:
+            where.append(_in("st.position", positions, params))
+        rows = self.conn.execute(
+            "SELECT sa.x, sa.y, sa.t, sa.stimulus_id FROM samples sa"
+            " LEFT JOIN stimuli st ON st.session_id = sa.session_id AND st.stimulus_id = sa.stimulus_id"
+            f" WHERE {' AND '.join(where)} ORDER BY sa.rowid",
+            params,
+        ).fetchall()
+        # None vira NaN; cor e posição vêm da tabela de estímulos (pequena)
+        values = np.array(rows, dtype=np.float64).reshape(-1, 4)
+        stimuli = self._query(
+            "SELECT stimulus_id, color, position FROM stimuli WHERE session_id = ? ORDER BY stimulus_id",
+            (session_id,),
+        )
+        known = stimuli["stimulus_id"].to_numpy(np.float64)
+        found = np.searchsorted(known, values[:, 3]).clip(0, max(len(known) - 1, 0))
+        has_stimulus = np.isfinite(values[:, 3])
+        if len(known):
+            has_stimulus &= known[found] == values[:, 3]
+        ids = np.where(has_stimulus, values[:, 3], 0).astype(np.int64)
+
+        def categorical(column):
+            codes, categories = pd.factorize(stimuli[column], sort=True)
+            return pd.Categorical.from_codes(
+                np.where(has_stimulus, codes[found] if len(codes) else -1, -1), categories=list(categories)
+            ).remove_unused_categories()
+
+        return pd.DataFrame({
+            "x": values[:, 0].astype(np.float32),
+            "y": values[:, 1].astype(np.float32),
+            "timestamp": values[:, 2],
+            ID_COLUMN: nullable_ids(ids, ~has_stimulus),
+            COLOR: categorical("color"),
+            POSITION: categorical("position"),
+        })
+
+    @staticmethod
+    def _time_filter(column, start_ms, end_ms, params, t0=None):
+        # ``t0``: expressão SQL somada aos limites (o primeiro timestamp da sessão)
+        offset = f"{t0} + " if t0 else ""
+        where = []
+        if start_ms is not None:
+            where.append(f"{column} >= {offset}?")
+            params.append(float(start_ms))
+        if end_ms is not None:
+            where.append(f"{column} < {offset}?")
+            params.append(float(end_ms))
+        return where
+
+    @staged("agregação no banco (SQL)")
+    def attention(
+        self,
+        by=(COLOR,),
+        participants=None,
+        sessions=None,
+        colors=None,
+        positions=None,
+        start_ms=None,
+        end_ms=None,
+    ):
+        """Amostras e tempo de atenção agrupados por ``by``, calculados no SQLite.
+
+        ``by`` combina ``participante``, ``sessao``, ``nearestStimulusColor``
+        e ``nearestPosition``. O tempo de cada sessão é ``num_samples * dt``
+        da sessão, como em ``attention_tables``; ``start_ms``/``end_ms``
+        limitam o tempo das amostras em ms desde o primeiro timestamp de cada
+        sessão (``t - t0``; o WebGazer conta desde o carregamento da página).
+        """
+        unknown = [c for c in by if c not in GROUPS]
+        if unknown:
+            raise ValueError(f"Agrupamentos válidos: {list(GROUPS)}; recebido {unknown}.")
+        params = []
+        if start_ms is None and end_ms is None:
+            # Contagens já agregadas por estímulo: uma linha por estímulo
+            source = "stimuli st"
+            count = "st.n_samples"
+            where = []
+        else:
+            source = (
+                "samples sa JOIN stimuli st"
+                " ON st.session_id = sa.session_id AND st.stimulus_id = sa.stimulus_id"
+            )
+            count = "1"
+            where = self._time_filter("sa.t", start_ms, end_ms, params, t0="s.t0")
+            # Redundante, mas descarta os estímulos fora do intervalo antes das amostras
+            where += self._time_filter("st.end_ms", start_ms, None, params, t0="s.t0")
+            where += self._time_filter("st.start_ms", None, end_ms, params, t0="s.t0")
+        if participants:
+            where.append(_in("p.name", participants, params))
+        if sessions:
+            where.append(_in("s.id", sessions, params))
+        if colors:
+            where.append(_in("st.color", colors, params))
+        if positions:
+            where.append(_in("st.position", positions, params))
+
+        select = [f'{GROUPS[c]} AS "{c}"' for c in by]
+        group = f"GROUP BY {', '.join(GROUPS[c] for c in by)} ORDER BY {', '.join(GROUPS[c] for c in by)}" if by else ""
+        table = self._query(
+            f"SELECT {', '.join(select + [f'SUM({count}) AS num_samples'])},"
+            f" SUM({count} * s.dt_ms) / 1000.0 AS tempo_atencao_s"
+            f" FROM {source} JOIN sessions s ON s.id = st.session_id"
+            " JOIN participants p ON p.id = s.participant_id"
+            f" {'WHERE ' + ' AND '.join(where) if where else ''} {group}",
+            params,
+        )
+        return table.dropna(subset=["num_samples"]).astype({"num_samples": np.int64})
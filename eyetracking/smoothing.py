@@ -0,0 +1,199 @@
+"""Suavização causal do olhar: One-Euro, Kalman e mediana.
+
+As predições do WebGazer (regressão ridge sobre a imagem dos olhos) oscilam
+de uma amostra para a seguinte; esse ruído move o ponto vermelho e empurra
+amostras para o estímulo errado. Os três filtros são causais (cada saída só
+depende das amostras até ela) e existem em dois modos:
+
+- no navegador (``frontend/index.html``), dentro do callback do WebGazer,
+  com custo O(1) por amostra: move o ponto e, opcionalmente, escolhe o
+  estímulo mais próximo pelo olhar suavizado;
+- aqui, sobre as colunas de uma sessão gravada (``smooth_xy`` e
+  ``smooth_session``).
+
+Os dois modos fazem as mesmas operações de ponto flutuante na mesma ordem,
+sobre as mesmas entradas (x/y em float32, como são gravados; timestamps em
+ms), e dão saídas idênticas para os mesmos parâmetros. Amostras sem x/y
+saem nulas e não alteram o estado do filtro.
+
+- ``one_euro``: passa-baixas com corte que sobe com a velocidade (Casiez et
+  al., 2012): suaviza fixações sem atrasar sacadas;
+- ``kalman``: modelo de velocidade constante por eixo, com ruído de
+  aceleração ``q`` e de medida ``r``;
+- ``median``: mediana das últimas ``window`` amostras (remove picos isolados).
+
+One-Euro e Kalman são recursivos (cada saída depende da anterior), então o
+modo offline é uma passada única sobre floats nativos; a mediana é
+vetorizada em janelas deslizantes.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from eyetracking.analysis import POSITION, valid_samples
+from eyetracking.aoi import NUM_CIRCLES, estimate_center, relabel, triangle_layout
+from eyetracking.ingest import ID_COLUMN, POSITIONS, nullable_ids
+from eyetracking.profiling import staged
+
+FILTERS = ("one_euro", "kalman", "median")
+# Parâmetros padrão (os mesmos de SMOOTHING_DEFAULTS em frontend/index.html)
+DEFAULTS = {
+    "one_euro": {"min_cutoff": 1.0, "beta": 0.003, "d_cutoff": 1.0},
+    # r ~ (80 px)^2, o erro típico de predição do WebGazer
+    "kalman": {"q": 1.0e6, "r": 6400.0},
+    "median": {"window": 3},
+}
+# Intervalos menores (timestamps repetidos ou fora de ordem) contam como 1 ms
+MIN_DT_MS = 1.0
+# Variância inicial da velocidade no Kalman ((px/s)^2)
+KALMAN_V0 = 1.0e6
+
+
+def _one_euro(x, y, t, min_cutoff, beta, d_cutoff):
+    n = len(t)
+    xs = [math.nan] * n
+    ys = [math.nan] * n
+    started = False
+    px = py = dx = dy = pt = 0.0
+    for i in range(n):
+        xi, yi, ti = x[i], y[i], t[i]
+        if xi != xi or yi != yi:
+            continue
+        if not started:
+            px, py, dx, dy, pt = xi, yi, 0.0, 0.0, ti
+            started = True
+        else:
+            te = max(ti - pt, MIN_DT_MS) / 1000.0
+            pt = ti
+            a_d = 1.0 / (1.0 + (1.0 / (2.0 * math.pi * d_cutoff)) / te)
+            dx = a_d * ((xi - px) / te) + (1.0 - a_d) * dx
+            dy = a_d * ((yi - py) / te) + (1.0 - a_d) * dy
+            a_x = 1.0 / (1.0 + (1.0 / (2.0 * math.pi * (min_cutoff + beta * abs(dx)))) / te)
+            a_y = 1.0 / (1.0 + (1.0 / (2.0 * math.pi * (min_cutoff + beta * abs(dy)))) / te)
+            px = a_x * xi + (1.0 - a_x) * px
+            py = a_y * yi + (1.0 - a_y) * py
+        xs[i] = px
+        ys[i] = py
+    return xs, ys
+
+
+def _kalman(x, y, t, q, r):
+    # x e y têm o mesmo dt e o mesmo r: a covariância é a mesma nos dois eixos
+    n = len(t)
+    xs = [math.nan] * n
+    ys = [math.nan] * n
+    started = False
+    px = py = vx = vy = pt = 0.0
+    p00 = p01 = p11 = 0.0
+    for i in range(n):
+        xi, yi, ti = x[i], y[i], t[i]
+        if xi != xi or yi != yi:
+            continue
+        if not started:
+            px, py, vx, vy, pt = xi, yi, 0.0, 0.0, ti
+            p00, p01, p11 = r, 0.0, KALMAN_V0
+            started = True
+        else:
+            dt = max(ti - pt, MIN_DT_MS) / 1000.0
+            pt = ti
+            # Predição
+            px = px + vx * dt
+            py = py + vy * dt
+            p00 = p00 + dt * (2.0 * p01 + dt * p11) + q * dt * dt * dt / 3.0
+            p01 = p01 + dt * p11 + q * dt * dt / 2.0
+            p11 = p11 + q * dt
+            # Correção
+            s = p00 + r
+            k0 = p00 / s
+            k1 = p01 / s
+            ex = xi - px
+            ey = yi - py
+            px = px + k0 * ex
+            py = py + k0 * ey
+            vx = vx + k1 * ex
+            vy = vy + k1 * ey
+            p11 = p11 - k1 * p01
+            p01 = p01 - k0 * p01
+            p00 = p00 - k0 * p00
+        xs[i] = px
+        ys[i] = py
+    return xs, ys
+
+
+def _median(v, window):
+    """Mediana móvel causal de ``v`` (sem nulos); no início, das amostras já vistas."""
+    out = np.empty(len(v))
+    head = min(window - 1, len(v))
+    for i in range(head):
+        out[i] = np.median(v[: i + 1])
+    if len(v) >= window:
+        out[head:] = np.median(sliding_window_view(v, window), axis=1)
+    return out
+
+
+@staged("suavização do olhar")
+def smooth_xy(x, y, t, method, **params):
+    """``(x, y)`` suavizados (float64) pelo filtro ``method``.
+
+    ``x``/``y`` são arredondados para float32 antes do filtro, como no
+    navegador. ``params`` substituem os de ``DEFAULTS[method]``.
+    """
+    if method not in FILTERS:
+        raise ValueError(f"Filtro deve ser um de {FILTERS}, não {method!r}.")
+    unknown = set(params) - set(DEFAULTS[method])
+    if unknown:
+        raise ValueError(f"Parâmetros desconhecidos para {method}: {sorted(unknown)}.")
+    params = dict(DEFAULTS[method], **params)
+
+    x = np.asarray(x, dtype=np.float32).astype(np.float64)
+    y = np.asarray(y, dtype=np.float32).astype(np.float64)
+    t = np.asarray(t, dtype=np.float64)
+
+    if method == "median":
+        window = int(params["window"])
+        if window < 1:
+            raise ValueError("A janela da mediana precisa ter pelo menos 1 amostra.")
+        ok = ~(np.isnan(x) | np.isnan(y))
+        xs = np.full(len(x), np.nan)
+        ys = np.full(len(y), np.nan)
+        xs[ok] = _median(x[ok], window)
+        ys[ok] = _median(y[ok], window)
+        return xs, ys
+
+    step = _one_euro if method == "one_euro" else _kalman
+    params = {k: float(v) for k, v in params.items()}
+    xs, ys = step(x.tolist(), y.tolist(), t.tolist(), **params)
+    return np.asarray(xs), np.asarray(ys)
+
+
+def smooth_session(df, method, relabel_nearest=False, center=None, **params):
+    """Cópia de ``df`` com ``x``/``y`` suavizados.
+
+    Com ``relabel_nearest=True``, ``nearestStimulusId``/``Color`` e
+    ``nearestPosition`` são refeitos pelo olhar suavizado com a regra do
+    navegador (estímulo mais próximo do triângulo, só com os estímulos na
+    tela). ``center`` é o centro da janela do experimento; se omitido, é
+    estimado pela mediana do olhar (``estimate_center``).
+    """
+    xs, ys = smooth_xy(
+        df["x"].to_numpy(np.float32, na_value=np.nan),
+        df["y"].to_numpy(np.float32, na_value=np.nan),
+        df["timestamp"].to_numpy(np.float64, na_value=np.nan),
+        method,
+        **params,
+    )
+    out = df.copy()
+    out["x"] = xs
+    out["y"] = ys
+    if relabel_nearest:
+        if center is None:
+            center = estimate_center(valid_samples(df, require_position=False))
+        out = relabel(out, triangle_layout(*center, radius=np.inf))
+        # O id do estímulo acompanha a nova posição: ids do ciclo na ordem de POSITIONS
+        codes = pd.Categorical(out[POSITION], categories=POSITIONS).codes
+        ids = out[ID_COLUMN].to_numpy(np.int64, na_value=-1)
+        out[ID_COLUMN] = nullable_ids(ids // NUM_CIRCLES * NUM_CIRCLES + codes, codes < 0)
+    return out
@@ -0,0 +1,93 @@
+"""Relatório do tempo de inicialização do app Streamlit.
+
+Cada medição roda em um processo Python novo (partida a frio), que executa
+o ``app.py`` com o ``AppTest`` do Streamlit, sem servidor nem navegador:
+
+- ``import_streamlit_s``: importar o Streamlit;
+- ``primeira_execucao_s``: primeira execução do script, incluindo os imports
+  do app; é quando todos os widgets da página já foram enviados (tempo até
+  a primeira interação, do lado do Python);
+- ``reexecucao_s``: uma reexecução (rerun) logo em seguida;
+- ``processo_s``: do início do processo ao fim da primeira execução.
+
+Também informa quais bibliotecas pesadas já estavam carregadas depois da
+primeira execução. Pela linha de comando::
+
+    python -m eyetracking inicializacao [app.py] [-n 5] [-o inicializacao.jsonl]
+
+Com ``-o``, o resumo é acrescentado como uma linha JSON, para acompanhar a
+evolução entre versões.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ("sklearn", "scipy", "joblib", "matplotlib", "altair", "pandas", "numpy")
+TIMINGS = ("import_streamlit_s", "primeira_execucao_s", "reexecucao_s", "processo_s")
+
+
+def measure(app_path):
+    """Mede uma partida a frio de ``app_path`` (deve rodar em um processo novo).
+
+    Este módulo não importa nada pesado no nível superior, para não
+    contaminar a medição.
+    """
+    t0 = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+
+    t1 = time.perf_counter()
+    at = AppTest.from_file(app_path, default_timeout=600)
+    at.run()
+    t2 = time.perf_counter()
+    first_done = time.time()
+    at.run()
+    t3 = time.perf_counter()
+    return {
+        "import_streamlit_s": t1 - t0,
+        "primeira_execucao_s": t2 - t1,
+        "reexecucao_s": t3 - t2,
+        "fim_primeira_execucao": first_done,
+        "erro": str(at.exception[0].message) if at.exception else None,
+        "modulos": [m for m in HEAVY_MODULES if m in sys.modules],
+    }
+
+
+def startup_report(app_path="app.py", repeats=3):
+    """Mede ``repeats`` partidas a frio, cada uma em um processo novo.
+
+    Retorna um DataFrame com uma linha por medição.
+    """
+    import pandas as pd
+
+    app_path = os.path.abspath(app_path)
+    runs = []
+    for _ in range(repeats):
+        start = time.time()
+        out = subprocess.run(
+            [sys.executable, "-m", "eyetracking.startup", app_path],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(app_path),
+        )
+        run = json.loads(out.stdout.strip().splitlines()[-1])
+        # Inclui o início do interpretador
+        run["processo_s"] = run.pop("fim_primeira_execucao") - start
+        runs.append(run)
+    return pd.DataFrame(runs)
+
+
+def summary(report):
+    """Mediana de cada tempo e os módulos pesados carregados."""
+    result = {name: float(report[name].median()) for name in TIMINGS}
+    result["modulos"] = sorted(set().union(*report["modulos"]))
+    result["medicoes"] = len(report)
+    return result
+
+
+if __name__ == "__main__":
+    # Processo filho de startup_report: imprime a medição como JSON
+    print(json.dumps(measure(sys.argv[1])))
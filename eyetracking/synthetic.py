@@ -0,0 +1,257 @@
+"""Sessões sintéticas no formato do experimento, de qualquer tamanho.
+
+Reproduz o que ``frontend/index.html`` grava:
+
+- ciclo de ``startStimulusCycle``: o triângulo fica ``STIMULUS_VISIBLE_MS``
+  na tela e some por ``STIMULUS_BLANK_MS``, com três cores distintas
+  sorteadas de ``COLORS`` a cada ciclo e ids sequenciais (três por ciclo, na
+  ordem de ``POSITIONS``);
+- ``timestamp`` em ms desde o início do WebGazer, a ``rate_hz`` com jitter
+  gaussiano e perdas ocasionais de rastreamento (intervalos longos);
+- olhar em fixações (duração gama, média ``FIXATION_MS``) sobre um dos
+  estímulos, escolhido com peso pela preferência de cor do participante
+  (``COLOR_PREFERENCE``), ou perto do centro com a tela vazia, mais o erro de
+  predição do WebGazer (gaussiano, ``NOISE_PX``);
+- ``nearestStimulusId``/``Color``/``Position`` do estímulo mais próximo
+  enquanto o triângulo está visível (nulos fora dele), como
+  ``findNearestStimulus``.
+
+Os padrões imitam a sessão de exemplo (~12 Hz). As amostras são geradas em
+blocos de ``CHUNK_SAMPLES``, então ``write_synthetic`` grava 10^8 amostras
+com memória constante. A mesma semente gera a mesma sessão.
+
+Pela linha de comando::
+
+    python -m eyetracking sintetico saida.npz -n 1000000 [--semente 0] [--taxa 12]
+"""
+
+import os
+import shutil
+import tempfile
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from eyetracking.aoi import NUM_CIRCLES, TRIANGLE_OFFSETS
+from eyetracking.columnar import CATEGORIES_SUFFIX
+from eyetracking.ingest import ID_COLUMN, POSITIONS, categorical_from_codes, nullable_ids
+
+# COLORS, STIMULUS_VISIBLE_MS e STIMULUS_BLANK_MS em frontend/index.html
+COLORS = ("red", "green", "blue", "yellow", "cyan", "magenta", "orange", "purple")
+STIMULUS_VISIBLE_MS = 5000.0
+STIMULUS_BLANK_MS = 2000.0
+CYCLE_MS = STIMULUS_VISIBLE_MS + STIMULUS_BLANK_MS
+# Calibração/carregamento do WebGazer antes do primeiro ciclo
+START_MS = 5600.0
+# Tamanho típico do iframe do experimento dentro do Streamlit
+WINDOW_PX = (1700.0, 650.0)
+
+RATE_HZ = 12.0
+JITTER_MS = 8.0
+NOISE_PX = 80.0
+FIXATION_MS = 350.0
+FIXATION_SPREAD_PX = 25.0
+# Com a tela vazia o olhar fica espalhado em volta do centro
+BLANK_SPREAD_PX = 150.0
+# Chance, por amostra, de o WebGazer perder o rosto, e duração média da falha
+DROPOUT_PROB = 0.002
+DROPOUT_MS = 800.0
+# Peso de cada cor na escolha do estímulo a fixar (define a "alta atenção")
+COLOR_PREFERENCE = {
+    "red": 3.0, "green": 1.0, "blue": 1.5, "yellow": 2.5,
+    "cyan": 1.0, "magenta": 0.8, "orange": 2.0, "purple": 0.6,
+}
+
+CHUNK_SAMPLES = 1 << 20
+
+_OFFSETS = np.array(list(TRIANGLE_OFFSETS.values()), dtype=np.float64)
+_PREFERENCE = np.array([COLOR_PREFERENCE[c] for c in COLORS])
+
+
+class _Generator:
+    """Estado do gerador entre um bloco e o seguinte."""
+
+    def __init__(self, seed, rate_hz, jitter_ms, noise_px, dropout_prob, window_px):
+        root = np.random.SeedSequence(seed)
+        self.rng_time, self.rng_cycle, self.rng_fix, self.rng_noise = (
+            np.random.default_rng(s) for s in root.spawn(4)
+        )
+        self.period_ms = 1000.0 / rate_hz
+        self.jitter_ms = jitter_ms
+        self.noise_px = noise_px
+        self.dropout_prob = dropout_prob
+        self.center = np.array(window_px) / 2.0
+        self.stimuli = self.center + _OFFSETS  # (3, 2): centro de cada círculo
+        self.t_last = 0.0
+        self.cycle_colors = np.empty((0, NUM_CIRCLES), dtype=np.int8)
+        # Fixação em andamento: fim (ms) e ponto fixado
+        self.fix_end = np.zeros(1)
+        self.fix_xy = np.array([self.center])
+
+    def _colors_until(self, cycle):
+        """Garante as cores sorteadas de todos os ciclos até ``cycle``."""
+        missing = int(cycle) + 1 - len(self.cycle_colors)
+        if missing > 0:
+            # pickDistinctColors: três cores distintas por ciclo
+            drawn = np.argsort(self.rng_cycle.random((max(missing, 1024), len(COLORS))), axis=1)
+            self.cycle_colors = np.concatenate([self.cycle_colors, drawn[:, :NUM_CIRCLES].astype(np.int8)])
+
+    @staticmethod
+    def _phase(t):
+        """Ciclo de cada instante e se o triângulo está visível nele."""
+        rel = t - START_MS
+        cycle = np.floor_divide(rel, CYCLE_MS).astype(np.int64)
+        visible = (rel >= 0) & (rel - cycle * CYCLE_MS < STIMULUS_VISIBLE_MS)
+        return cycle, visible
+
+    def _fixations_until(self, t_max):
+        """Acrescenta fixações até cobrir ``t_max``."""
+        ends, points = [self.fix_end], [self.fix_xy]
+        last = self.fix_end[-1]
+        while last < t_max:
+            k = max(int((t_max - last) / FIXATION_MS * 1.2), 64)
+            start = last + np.concatenate([[0.0], np.cumsum(self.rng_fix.gamma(2.0, FIXATION_MS / 2.0, k))])
+            cycle, visible = self._phase(start[:-1])
+            self._colors_until(cycle.max())
+            # Estímulo fixado, com peso pela preferência de cor
+            weights = _PREFERENCE[self.cycle_colors[np.maximum(cycle, 0)]]
+            cum = np.cumsum(weights, axis=1)
+            u = self.rng_fix.random(k) * cum[:, -1]
+            target = self.stimuli[(u[:, None] >= cum).sum(axis=1)]
+            spread = np.where(visible, FIXATION_SPREAD_PX, BLANK_SPREAD_PX)[:, None]
+            base = np.where(visible[:, None], target, self.center)
+            points.append(base + self.rng_fix.normal(0.0, 1.0, (k, 2)) * spread)
+            ends.append(start[1:])
+            last = start[-1]
+        self.fix_end = np.concatenate(ends)
+        self.fix_xy = np.concatenate(points)
+
+    def chunk(self, n):
+        """Próximas ``n`` amostras, como arrays (códigos ``-1`` = nulo)."""
+        dt = np.maximum(self.rng_time.normal(self.period_ms, self.jitter_ms, n), 1.0)
+        lost = self.rng_time.random(n) < self.dropout_prob
+        dt[lost] += self.rng_time.exponential(DROPOUT_MS, int(lost.sum()))
+        t = self.t_last + np.cumsum(dt)
+        self.t_last = t[-1]
+
+        self._fixations_until(t[-1])
+        fix = np.searchsorted(self.fix_end, t, side="right")
+        xy = self.fix_xy[fix] + self.rng_noise.normal(0.0, self.noise_px, (n, 2))
+        # A fixação em andamento continua no próximo bloco
+        self.fix_end = self.fix_end[fix[-1]:]
+        self.fix_xy = self.fix_xy[fix[-1]:]
+
+        cycle, visible = self._phase(t)
+        self._colors_until(max(int(cycle.max()), 0))
+        dist = ((xy[:, None, :] - self.stimuli[None]) ** 2).sum(axis=2)
+        position = np.where(visible, dist.argmin(axis=1), -1).astype(np.int8)
+        ids = np.where(visible, cycle * NUM_CIRCLES + position, -1).astype(np.int32)
+        color = np.where(visible, self.cycle_colors[np.maximum(cycle, 0), np.maximum(position, 0)], -1)
+        return {
+            "x": xy[:, 0].astype(np.float32),
+            "y": xy[:, 1].astype(np.float32),
+            "timestamp": t,
+            ID_COLUMN: ids,
+            "nearestStimulusColor": color.astype(np.int8),
+            "nearestPosition": position,
+        }
+
+
+def _chunks(
+    n_samples,
+    seed=0,
+    rate_hz=RATE_HZ,
+    jitter_ms=JITTER_MS,
+    noise_px=NOISE_PX,
+    dropout_prob=DROPOUT_PROB,
+    window_px=WINDOW_PX,
+):
+    gen = _Generator(seed, rate_hz, jitter_ms, noise_px, dropout_prob, window_px)
+    for lo in range(0, n_samples, CHUNK_SAMPLES):
+        yield gen.chunk(min(CHUNK_SAMPLES, n_samples - lo))
+
+
+def _frame(columns):
+    """DataFrame no formato de ``read_session`` a partir das colunas geradas."""
+    ids = columns[ID_COLUMN]
+    return pd.DataFrame({
+        "x": columns["x"],
+        "y": columns["y"],
+        "timestamp": columns["timestamp"],
+        ID_COLUMN: nullable_ids(ids, ids < 0),
+        "nearestStimulusColor": categorical_from_codes(columns["nearestStimulusColor"], COLORS)
+        .remove_unused_categories(),
+        "nearestPosition": categorical_from_codes(columns["nearestPosition"], POSITIONS),
+    }, copy=False)
+
+
+def synthetic_session(n_samples, seed=0, **params):
+    """Sessão sintética de ``n_samples`` amostras, em memória.
+
+    ``params``: ``rate_hz``, ``jitter_ms``, ``noise_px``, ``dropout_prob`` e
+    ``window_px`` (largura, altura). Devolve o mesmo DataFrame que
+    ``read_session`` produziria do JSON do experimento.
+    """
+    parts = list(_chunks(n_samples, seed, **params))
+    if not parts:
+        return pd.DataFrame()
+    return _frame({c: np.concatenate([p[c] for p in parts]) for c in parts[0]})
+
+
+def write_synthetic(dest, n_samples, seed=0, **params):
+    """Grava uma sessão sintética em ``dest`` (``.npz`` ou ``.json``), bloco a bloco.
+
+    O ``.npz`` tem o formato de ``eyetracking.columnar`` e o JSON, o do botão
+    "Baixar JSON" do experimento. Devolve ``dest``.
+    """
+    if dest.endswith(".json"):
+        _write_json(dest, _chunks(n_samples, seed, **params))
+    else:
+        _write_npz(dest, n_samples, _chunks(n_samples, seed, **params))
+    return dest
+
+
+def _write_npz(dest, n_samples, chunks):
+    # Cada coluna vai para um arquivo temporário e depois para o ZIP (sem
+    # compressão), precedida do cabeçalho .npy com o tamanho final
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(dest))) as tmpdir:
+        files, dtypes = {}, {}
+        try:
+            for columns in chunks:
+                for c, values in columns.items():
+                    if c not in files:
+                        files[c] = open(os.path.join(tmpdir, c), "wb")
+                        dtypes[c] = values.dtype
+                    values.tofile(files[c])
+        finally:
+            for f in files.values():
+                f.close()
+
+        with zipfile.ZipFile(dest, "w", zipfile.ZIP_STORED, allowZip64=True) as zf:
+            for c, dtype in dtypes.items():
+                header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (n_samples,)}
+                with zf.open(c + ".npy", "w", force_zip64=True) as member, open(os.path.join(tmpdir, c), "rb") as src:
+                    np.lib.format.write_array_header_1_0(member, header)
+                    shutil.copyfileobj(src, member, 1 << 20)
+            for c, categories in (("nearestStimulusColor", COLORS), ("nearestPosition", POSITIONS)):
+                with zf.open(c + CATEGORIES_SUFFIX + ".npy", "w") as member:
+                    np.lib.format.write_array(member, np.asarray(categories, dtype=str))
+
+
+def _write_json(dest, chunks):
+    with open(dest, "w", encoding="utf-8") as f:
+        f.write("[")
+        first = True
+        for columns in chunks:
+            records = _frame(columns).astype({"x": np.float64, "y": np.float64}).to_json(orient="records")
+            if records != "[]":
+                f.write(("" if first else ",") + records[1:-1])
+                first = False
+        f.write("]")
+
+
+def window_center(window_px=WINDOW_PX):
+    """Centro da janela da geração (para ``triangle_layout`` e ``sample_features``)."""
+    return window_px[0] / 2.0, window_px[1] / 2.0
+
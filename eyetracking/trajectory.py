@@ -0,0 +1,131 @@
+"""Trajetória do olhar (x(t), y(t) e caminho 2D) com redução de pontos.
+
+Uma sessão longa tem centenas de milhares de amostras, muito mais do que os
+pixels de um gráfico. ``Trajectory`` ordena a sessão por timestamp uma vez e,
+para cada janela de tempo pedida, devolve no máximo ``n_points`` amostras
+escolhidas por:
+
+- LTTB (*Largest-Triangle-Three-Buckets*): um ponto por balde, o que forma o
+  maior triângulo com o ponto escolhido no balde anterior e a média do
+  próximo; preserva a forma da curva.
+- mín/máx: o menor e o maior valor de cada balde; preserva picos.
+
+Os índices escolhidos para x(t) e para y(t) são unidos, então o caminho 2D
+usa as mesmas amostras. Os períodos com estímulo na tela (cada ciclo de três
+círculos) vêm dos ``nearestStimulusId`` das amostras.
+"""
+
+import numpy as np
+import pandas as pd
+
+from eyetracking.ingest import ID_COLUMN, POSITIONS
+from eyetracking.profiling import staged
+
+METHODS = ("lttb", "minmax")
+DEFAULT_POINTS = 1500
+NUM_CIRCLES = len(POSITIONS)
+
+
+def _bucket_edges(n, n_buckets):
+    """Limites de ``n_buckets`` baldes com o mesmo número de amostras em ``[1, n - 1)``."""
+    return (np.floor(np.arange(n_buckets + 1) * (n - 2) / n_buckets) + 1).astype(np.intp)
+
+
+def lttb_indices(t, v, n_out):
+    """Índices escolhidos pelo LTTB (sempre inclui o primeiro e o último)."""
+    n = len(t)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    edges = _bucket_edges(n, n_out - 2)
+
+    # Médias de cada balde por somas acumuladas; o "próximo" do último balde
+    # é a última amostra
+    ct = np.concatenate(([0.0], np.cumsum(t)))
+    cv = np.concatenate(([0.0], np.cumsum(v)))
+    next_lo = np.append(edges[1:-1], n - 1)
+    next_hi = np.append(edges[2:], n)
+    size = next_hi - next_lo
+    avg_t = (ct[next_hi] - ct[next_lo]) / size
+    avg_v = (cv[next_hi] - cv[next_lo]) / size
+
+    out = np.empty(n_out, dtype=np.intp)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        bt, bv = t[lo:hi], v[lo:hi]
+        area = np.abs((t[a] - avg_t[i]) * (bv - v[a]) - (t[a] - bt) * (avg_v[i] - v[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def minmax_indices(t, v, n_out):
+    """Índices do mínimo e do máximo de cada balde (``n_out // 2`` baldes)."""
+    n = len(t)
+    if n <= n_out or n_out < 4:
+        return np.arange(n)
+    n_buckets = (n_out - 2) // 2
+    edges = _bucket_edges(n, n_buckets)
+    width = int(np.diff(edges).max())
+
+    # Matriz (baldes x largura) preenchida com NaN onde o balde é menor
+    offsets = edges[:-1, None] + np.arange(width)
+    valid = offsets < edges[1:, None]
+    values = np.where(valid, v[np.minimum(offsets, n - 1)], np.nan)
+    rows = np.arange(n_buckets)
+    lo = offsets[rows, np.nanargmin(values, axis=1)]
+    hi = offsets[rows, np.nanargmax(values, axis=1)]
+    return np.unique(np.concatenate(([0, n - 1], lo, hi)))
+
+
+class Trajectory:
+    """Colunas da sessão ordenadas por tempo, para janelas reduzidas."""
+
+    @staged("trajetória: ordenação")
+    def __init__(self, df):
+        t = df["timestamp"].to_numpy(np.float64, na_value=np.nan)
+        x = df["x"].to_numpy(np.float64, na_value=np.nan)
+        y = df["y"].to_numpy(np.float64, na_value=np.nan)
+        keep = np.flatnonzero(np.isfinite(t) & np.isfinite(x) & np.isfinite(y))
+        order = keep[np.argsort(t[keep], kind="stable")]
+        self.t, self.x, self.y = t[order], x[order], y[order]
+        self.start = float(self.t[0]) if len(self.t) else 0.0
+        self.end = float(self.t[-1]) if len(self.t) else 0.0
+
+        # Períodos com estímulo: primeira e última amostra de cada ciclo
+        if ID_COLUMN in df.columns:
+            ids = df[ID_COLUMN].to_numpy(np.int64, na_value=-1)[order]
+        else:
+            ids = np.full(len(order), -1, dtype=np.int64)
+        on = ids >= 0
+        cycles = pd.DataFrame({"ciclo": ids[on] // NUM_CIRCLES, "t": self.t[on]})
+        spans = cycles.groupby("ciclo")["t"].agg(["min", "max"])
+        self.spans = spans.rename(columns={"min": "inicio", "max": "fim"}).reset_index()
+
+    def __len__(self):
+        return len(self.t)
+
+    @staged("trajetória: redução")
+    def window(self, t0=None, t1=None, n_points=DEFAULT_POINTS, method="lttb"):
+        """Amostras da janela ``[t0, t1]`` (ms) reduzidas a até ``2 * n_points``.
+
+        ``n_points`` é o orçamento de cada série (x e y); a união das duas
+        seleções alimenta os três gráficos.
+        """
+        lo = 0 if t0 is None else np.searchsorted(self.t, t0, side="left")
+        hi = len(self.t) if t1 is None else np.searchsorted(self.t, t1, side="right")
+        t, x, y = self.t[lo:hi], self.x[lo:hi], self.y[lo:hi]
+
+        select = {"lttb": lttb_indices, "minmax": minmax_indices}[method]
+        idx = np.union1d(select(t, x, n_points), select(t, y, n_points))
+        return pd.DataFrame({"timestamp": t[idx], "x": x[idx], "y": y[idx]})
+
+    def spans_in(self, t0=None, t1=None):
+        """Períodos com estímulo que cruzam a janela, cortados nas bordas."""
+        t0 = self.start if t0 is None else t0
+        t1 = self.end if t1 is None else t1
+        spans = self.spans[(self.spans["fim"] >= t0) & (self.spans["inicio"] <= t1)].copy()
+        spans["inicio"] = spans["inicio"].clip(lower=t0)
+        spans["fim"] = spans["fim"].clip(upper=t1)
+        return spans
@@ -0,0 +1,168 @@
+"""Ensaios (apresentações do triângulo) e métricas por ensaio.
+
+Cada ciclo de ``startStimulusCycle`` é um ensaio: três estímulos com ids
+consecutivos, então ``nearestStimulusId // 3`` é o número do ensaio.
+``TrialIndex`` guarda, em arrays ordenados, o início e o fim de cada ensaio
+(primeira e última amostra gravadas com um estímulo dele) e encontra o
+ensaio de qualquer timestamp com ``np.searchsorted``: O(log ensaios) por
+amostra, O(n log ensaios) na sessão inteira.
+
+``trial_metrics`` calcula, sem laços em Python, para cada ensaio e AOI
+(os valores de ``nearestPosition``):
+
+- latência até o primeiro olhar na AOI, em ms desde o início do ensaio;
+- permanência: soma dos intervalos até a amostra seguinte (cortados em
+  ``max_gap_ms``) das amostras na AOI;
+- se a AOI recebeu o primeiro olhar do ensaio;
+
+e, para cada ensaio, a posição e a cor do primeiro olhar e o número de
+trocas de AOI. Com as posições do estímulo mais próximo, toda amostra do
+ensaio está em alguma AOI e o primeiro olhar tem latência 0; com AOIs de
+raio limitado (``eyetracking.aoi.relabel``), a latência mede quanto o olhar
+demorou a chegar a um estímulo.
+"""
+
+import numpy as np
+import pandas as pd
+
+from eyetracking.analysis import COLOR, POSITION
+from eyetracking.aoi import NUM_CIRCLES
+from eyetracking.fixations import MAX_GAP_MS
+from eyetracking.ingest import ID_COLUMN
+from eyetracking.profiling import stage, staged
+
+TRIAL = "ensaio"
+
+
+class TrialIndex:
+    """Início e fim de cada ensaio de uma sessão, em ordem de tempo."""
+
+    def __init__(self, df):
+        with stage("índice de ensaios"):
+            t = df["timestamp"].to_numpy(np.float64, na_value=np.nan)
+            ids = df[ID_COLUMN].to_numpy(np.int64, na_value=-1) if ID_COLUMN in df.columns else np.full(len(df), -1)
+            keep = (ids >= 0) & np.isfinite(t)
+            trials, inverse = np.unique(ids[keep] // NUM_CIRCLES, return_inverse=True)
+            onset = np.full(len(trials), np.inf)
+            offset = np.full(len(trials), -np.inf)
+            np.minimum.at(onset, inverse, t[keep])
+            np.maximum.at(offset, inverse, t[keep])
+            order = np.argsort(onset, kind="stable")
+            self.trials = trials[order]
+            self.onset = onset[order]
+            self.offset = offset[order]
+
+    def __len__(self):
+        return len(self.trials)
+
+    def locate(self, t):
+        """Posição no índice do ensaio que contém cada timestamp (``-1`` fora de todos)."""
+        t = np.asarray(t, dtype=np.float64)
+        k = np.searchsorted(self.onset, t, side="right") - 1
+        inside = (k >= 0) & (t <= self.offset[np.maximum(k, 0)]) if len(self) else np.zeros(len(t), dtype=bool)
+        return np.where(inside, k, -1)
+
+    def frame(self):
+        """Uma linha por ensaio: número, início, fim e duração (ms)."""
+        return pd.DataFrame({
+            TRIAL: self.trials,
+            "inicio_ms": self.onset,
+            "fim_ms": self.offset,
+            "duracao_ms": self.offset - self.onset,
+        })
+
+
+@staged("métricas por ensaio")
+def trial_metrics(df, index=None, max_gap_ms=MAX_GAP_MS):
+    """Métricas por ensaio e por ensaio + AOI.
+
+    ``index`` é o ``TrialIndex`` da sessão (construído aqui se omitido).
+    Retorna ``(ensaios, estimulos)``:
+
+    - ``ensaios``: uma linha por ensaio, com início/fim, ``amostras``,
+      ``primeira_posicao``, ``primeira_cor``, ``latencia_primeiro_olhar_ms``
+      e ``trocas`` (mudanças de AOI entre amostras consecutivas em AOIs);
+    - ``estimulos``: uma linha por ensaio e AOI, com a cor, ``amostras``,
+      ``latencia_ms`` (nula se a AOI não foi olhada), ``permanencia_ms`` e
+      ``primeiro_olhar``.
+    """
+    index = TrialIndex(df) if index is None else index
+    order = np.argsort(df["timestamp"].to_numpy(np.float64), kind="stable")
+    t = df["timestamp"].to_numpy(np.float64, na_value=np.nan)[order]
+    position = pd.Categorical(df[POSITION]) if POSITION in df.columns else pd.Categorical([None] * len(df))
+    color = pd.Categorical(df[COLOR]) if COLOR in df.columns else pd.Categorical([None] * len(df))
+    aoi = position.codes[order].astype(np.int64)
+    color_code = color.codes[order].astype(np.int64)
+    names = list(position.categories)
+    n_trials, n_aois = len(index), max(len(names), 1)
+
+    # Duração de cada amostra: até a próxima, cortada em max_gap_ms
+    dt = np.minimum(np.diff(t, append=t[-1] if len(t) else 0.0), max_gap_ms)
+    k = index.locate(t)
+    on = (k >= 0) & (aoi >= 0)
+    k_on, aoi_on, t_on = k[on], aoi[on], t[on]
+    key = k_on * n_aois + aoi_on
+    size = n_trials * n_aois
+
+    first = np.full(size, np.inf)
+    np.minimum.at(first, key, t_on)
+    samples = np.bincount(key, minlength=size)
+    dwell = np.bincount(key, weights=dt[on], minlength=size)
+    cell_color = np.full(size, -1, dtype=np.int64)
+    cell_color[key] = color_code[on]
+
+    first = first.reshape(n_trials, n_aois)
+    looked = np.isfinite(first)
+    latency = np.where(looked, first - index.onset[:, None], np.nan)
+    first_aoi = np.where(looked.any(axis=1), np.argmin(first, axis=1), -1)
+    is_first = np.zeros((n_trials, n_aois), dtype=bool)
+    is_first[np.flatnonzero(first_aoi >= 0), first_aoi[first_aoi >= 0]] = True
+
+    # Trocas: amostras consecutivas em AOIs, no mesmo ensaio, com AOIs diferentes
+    change = (k_on[1:] == k_on[:-1]) & (aoi_on[1:] != aoi_on[:-1])
+    switches = np.bincount(k_on[1:][change], minlength=n_trials)
+
+    colors = np.asarray(list(color.categories) + [None], dtype=object)
+    cell_color = cell_color.reshape(n_trials, n_aois)
+    aoi_names = np.asarray(names + [None], dtype=object)
+    first_color = cell_color[np.arange(n_trials), np.maximum(first_aoi, 0)]
+
+    ensaios = index.frame()
+    ensaios["amostras"] = np.bincount(k[k >= 0], minlength=n_trials)
+    ensaios["primeira_posicao"] = aoi_names[first_aoi]
+    ensaios["primeira_cor"] = np.where(first_aoi >= 0, colors[first_color], None)
+    ensaios["latencia_primeiro_olhar_ms"] = np.where(
+        first_aoi >= 0, latency[np.arange(n_trials), np.maximum(first_aoi, 0)], np.nan
+    )
+    ensaios["trocas"] = switches
+
+    estimulos = pd.DataFrame({
+        TRIAL: np.repeat(index.trials, n_aois),
+        POSITION: np.tile(aoi_names[:n_aois], n_trials) if names else None,
+        COLOR: colors[cell_color.ravel()],
+        "amostras": samples,
+        "latencia_ms": latency.ravel(),
+        "permanencia_ms": dwell,
+        "primeiro_olhar": is_first.ravel(),
+    })
+    return ensaios, estimulos
+
+
+def trial_summary(estimulos, group_col):
+    """Médias por ``group_col`` (cor ou posição) sobre os ensaios em que ela foi olhada.
+
+    ``ensaios_olhados``, ``latencia_media_ms`` e ``permanencia_media_ms``
+    (só ensaios com amostras na AOI) e ``taxa_primeiro_olhar`` (fração
+    desses ensaios em que ela recebeu o primeiro olhar).
+    """
+    looked = estimulos[estimulos["amostras"] > 0]
+    return (
+        looked.groupby(group_col, observed=True)
+        .agg(
+            ensaios_olhados=(TRIAL, "nunique"),
+            latencia_media_ms=("latencia_ms", "mean"),
+            permanencia_media_ms=("permanencia_ms", "mean"),
+            taxa_primeiro_olhar=("primeiro_olhar", "mean"),
+        )
+        .reset_index()
+    )
@@ -0,0 +1,114 @@
+"""Índice em grade das AOIs contra o teste de cada AOI, uma a uma."""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from eyetracking.analysis import COLOR, POSITION, load_session
+from eyetracking.aoi import AOISet, relabel, triangle_layout
+from eyetracking.ingest import ID_COLUMN
+
+Path = pytest.importorskip("matplotlib.path").Path
+
+EXEMPLO = os.path.join(os.path.dirname(__file__), "..", "exemplo_gaze_data_experimento.json")
+
+# Centro da janela do piloto, deduzido dos rótulos gravados (a mediana do
+# olhar, usada pelo app, fica a ~70 px dele em x)
+CENTRO_EXEMPLO = (916.0, 398.0)
+
+
+def _aois(seed, n=40):
+    """Círculos, retângulos e polígonos (côncavos, com número variado de vértices) sobrepostos."""
+    rng = np.random.default_rng(seed)
+    specs = []
+    for i in range(n):
+        cx, cy = rng.uniform(0, 1000, 2)
+        size = rng.uniform(10, 200)
+        kind = i % 3
+        if kind == 0:
+            specs.append({"nome": f"c{i}", "forma": "circulo", "centro": [cx, cy], "raio": size})
+        elif kind == 1:
+            w, h = rng.uniform(0.2, 1.0, 2) * size
+            # Limites em qualquer ordem
+            specs.append({"nome": f"r{i}", "forma": "retangulo", "limites": [cx + w, cy - h, cx - w, cy + h]})
+        else:
+            k = int(rng.integers(3, 9))
+            angles = np.sort(rng.uniform(0, 2 * np.pi, k))
+            radii = size * rng.uniform(0.3, 1.0, k)
+            vertices = np.column_stack([cx + radii * np.cos(angles), cy + radii * np.sin(angles)])
+            specs.append({"nome": f"p{i}", "forma": "poligono", "vertices": vertices.tolist()})
+    return specs
+
+
+def _contem(spec, pontos):
+    if spec["forma"] == "circulo":
+        return np.hypot(*(pontos - spec["centro"]).T) <= spec["raio"]
+    if spec["forma"] == "retangulo":
+        x0, y0, x1, y1 = spec["limites"]
+        vertices = [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]
+    else:
+        vertices = spec["vertices"]
+    return Path(vertices).contains_points(pontos)
+
+
+def _centro(spec):
+    if spec["forma"] == "circulo":
+        return np.asarray(spec["centro"], dtype=np.float64)
+    if spec["forma"] == "retangulo":
+        x0, y0, x1, y1 = spec["limites"]
+        return np.array([(x0 + x1) / 2, (y0 + y1) / 2])
+    return np.mean(spec["vertices"], axis=0)
+
+
+def _forca_bruta(specs, x, y):
+    """Cada ponto contra cada AOI; nas sobreposições, a de centro mais próximo (empate: a primeira)."""
+    pontos = np.column_stack([x, y])
+    dentro = np.array([_contem(spec, pontos) for spec in specs])
+    dist = np.array([np.sum((pontos - _centro(spec)) ** 2, axis=1) for spec in specs])
+    dist = np.where(dentro, dist, np.inf)
+    return np.where(dentro.any(axis=0), dist.argmin(axis=0), -1)
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("cell_size", [None, 7.0, 2000.0])
+def test_grade_igual_a_forca_bruta(seed, cell_size):
+    specs = _aois(seed)
+    rng = np.random.default_rng(100 + seed)
+    x, y = rng.uniform(-100, 1100, (2, 20000))
+    x[:50] = np.nan
+
+    esperado = _forca_bruta(specs, x, y)
+    obtido = AOISet(specs, cell_size=cell_size).assign(x, y, chunk_samples=3001)
+
+    assert (esperado >= 0).sum() > 5000
+    np.testing.assert_array_equal(obtido, esperado)
+
+
+def test_sobreposicao_fica_com_o_centro_mais_proximo():
+    specs = [
+        {"nome": "grande", "forma": "retangulo", "limites": [0, 0, 100, 100]},
+        {"nome": "circulo", "forma": "circulo", "centro": [80, 80], "raio": 30},
+        {"nome": "triangulo", "forma": "poligono", "vertices": [[0, 0], [60, 0], [0, 60]]},
+    ]
+    # (60, 60) está no círculo, mas o centro do retângulo (50, 50) é mais próximo
+    x = np.array([79.0, 60.0, 55.0, 10.0, 200.0])
+    y = np.array([79.0, 60.0, 55.0, 10.0, 200.0])
+    obtido = AOISet(specs).assign(x, y)
+    np.testing.assert_array_equal(obtido, [1, 0, 0, 2, -1])
+    np.testing.assert_array_equal(obtido, _forca_bruta(specs, x, y))
+
+
+def test_raio_infinito_reproduz_os_rotulos_gravados():
+    """Com ``radius=np.inf`` vale a regra do navegador: o estímulo mais próximo."""
+    df, _ = load_session(EXEMPLO)
+    out = relabel(df, triangle_layout(*CENTRO_EXEMPLO, radius=np.inf))
+
+    visivel = df[ID_COLUMN].notna().to_numpy()
+    assert visivel.sum() > 100
+    for c in (POSITION, COLOR):
+        gravado = df[c].astype(object).to_numpy()
+        refeito = out[c].astype(object).to_numpy()
+        np.testing.assert_array_equal(refeito[visivel], gravado[visivel])
+        assert pd.isna(refeito[~visivel]).all()
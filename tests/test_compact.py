@@ -0,0 +1,32 @@
+"""Ida e volta do formato compacto (``.etz``)."""
+
+import io
+import json
+
+from eyetracking.compact import encode_compact, read_compact
+from eyetracking.ingest import ID_COLUMN, read_session
+
+
+def _session(records):
+    return read_session(io.BytesIO(json.dumps(records).encode("utf-8")))
+
+
+def test_ids_fora_do_int16():
+    records = [
+        {
+            "x": 100.0 + i,
+            "y": 200.0,
+            "timestamp": 1000.0 + 16 * i,
+            ID_COLUMN: 40000 + i // 3,
+            "nearestStimulusColor": "red",
+            "nearestPosition": "topo",
+        }
+        for i in range(6)
+    ]
+    records[2][ID_COLUMN] = None
+    df = _session(records)
+
+    out = read_compact(encode_compact(df))
+
+    assert out.dtypes.equals(df.dtypes)
+    assert out.equals(df)
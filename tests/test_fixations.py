@@ -0,0 +1,61 @@
+"""I-VT/I-DT contra implementações diretas (laço por amostra)."""
+
+import numpy as np
+import pytest
+
+from eyetracking.fixations import MAX_GAP_MS, _runs, idt, ivt
+
+
+def _idt_direto(x, y, t, dispersion_threshold, min_duration_ms, max_gap_ms=MAX_GAP_MS):
+    """I-DT varrendo cada janela inteira."""
+    n = len(t)
+    mask = np.zeros(n, dtype=bool)
+    for k in range(n):
+        candidates = np.flatnonzero(t <= t[k] - min_duration_ms)
+        if len(candidates) == 0:
+            continue
+        j = min(candidates[-1], k)
+        wx, wy = x[j:k + 1], y[j:k + 1]
+        if (wx.max() - wx.min()) + (wy.max() - wy.min()) <= dispersion_threshold:
+            mask[j:k + 1] = True
+    jump = np.zeros(n, dtype=bool)
+    jump[1:] = np.hypot(np.diff(x), np.diff(y)) > dispersion_threshold
+    return _runs(mask, t, max_gap_ms, min_duration_ms, breaks=jump)
+
+
+def _gaze(n, seed):
+    rng = np.random.default_rng(seed)
+    t = np.cumsum(rng.choice([0.0, 16.0, 33.0, 50.0, 400.0], size=n, p=[0.1, 0.4, 0.3, 0.15, 0.05]))
+    # Fixações em torno de alguns centros, com sacadas entre elas
+    centers = rng.uniform(0, 1500, size=(n // 20 + 1, 2))
+    which = np.repeat(np.arange(len(centers)), 20)[:n]
+    x = centers[which, 0] + rng.normal(0, 15, n)
+    y = centers[which, 1] + rng.normal(0, 15, n)
+    return x, y, t
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("min_duration_ms", [0.0, 50.0, 100.0, 300.0])
+def test_idt_igual_a_varredura_direta(seed, min_duration_ms):
+    x, y, t = _gaze(400, seed)
+    expected = _idt_direto(x, y, t, 80.0, min_duration_ms)
+    np.testing.assert_array_equal(idt(x, y, t, 80.0, min_duration_ms), expected)
+
+
+def test_idt_timestamps_repetidos_e_duracao_zero():
+    t = np.array([0.0, 10.0, 10.0, 20.0, 30.0])
+    x = np.array([100.0, 101.0, 102.0, 101.0, 100.0])
+    y = np.full(5, 200.0)
+    ids = idt(x, y, t, dispersion_threshold=10.0, min_duration_ms=0.0)
+    np.testing.assert_array_equal(ids, _idt_direto(x, y, t, 10.0, 0.0))
+    assert (ids == 0).all()
+
+
+def test_ivt_timestamps_repetidos():
+    t = np.array([0.0, 10.0, 10.0, 20.0, 30.0, 40.0])
+    x = np.array([100.0, 101.0, 102.0, 101.0, 100.0, 101.0])
+    y = np.full(6, 200.0)
+    # Intervalo 0 entre amostras: velocidade infinita, a fixação é interrompida ali
+    ids = ivt(x, y, t, velocity_threshold=1000.0, min_duration_ms=0.0)
+    assert ids[2] == -1
+    assert ids[0] == ids[1] >= 0
@@ -0,0 +1,132 @@
+"""Sessão incremental contra a releitura e a reagregação do arquivo inteiro."""
+
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from eyetracking.analysis import (
+    COLOR,
+    POSITION,
+    attention_tables,
+    estimate_dt_ms,
+    load_session,
+    sampling_stats,
+    valid_samples,
+)
+from eyetracking.columnar import write_columnar
+from eyetracking.compact import encode_compact
+from eyetracking.incremental import DT_BIN_MS, IncrementalSession
+from eyetracking.ingest import ID_COLUMN
+from eyetracking.synthetic import synthetic_session
+
+
+def _registros(df):
+    """Amostras de ``df`` como o navegador as exporta (``null`` nos nulos)."""
+    columns = {}
+    for c in df.columns:
+        if c == ID_COLUMN:
+            columns[c] = [None if pd.isna(v) else int(v) for v in df[c]]
+        elif isinstance(df[c].dtype, pd.CategoricalDtype):
+            columns[c] = [None if pd.isna(v) else str(v) for v in df[c]]
+        else:
+            columns[c] = [None if np.isnan(v) else float(v) for v in df[c].to_numpy(np.float64, na_value=np.nan)]
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+
+def _json(df):
+    return json.dumps(_registros(df), indent=2).encode("utf-8")
+
+
+def _npz(df):
+    buf = io.BytesIO()
+    write_columnar(df, buf)
+    return buf.getvalue()
+
+
+FORMATOS = {"json": _json, "npz": _npz, "etz": encode_compact}
+
+
+def _confere_com_recalculo(sessao, content):
+    """Estados combinados e DataFrame montado iguais aos da leitura completa."""
+    df, _ = load_session(content)
+    pd.testing.assert_frame_equal(sessao.frame(), df)
+
+    df_valid = valid_samples(df, require_position=False)
+    dt_ms = estimate_dt_ms(df_valid)
+    assert sessao.dt_ms() == pytest.approx(dt_ms)
+    esperado = attention_tables(df_valid, dt_ms / 1000.0)
+    obtido = sessao.attention_tables()
+    assert obtido.keys() == esperado.keys()
+    for nome, tabela in esperado.items():
+        tabela = tabela.astype({c: str for c in (COLOR, POSITION) if c in tabela.columns})
+        pd.testing.assert_frame_equal(obtido[nome].reset_index(drop=True), tabela, check_dtype=False)
+
+    stats = sessao.sampling_stats()
+    for chave, valor in sampling_stats(df).items():
+        if chave != "dt_p95_ms":
+            assert stats[chave] == pytest.approx(valor, rel=1e-9, abs=1e-6), chave
+    # p95 do histograma: entre os dois intervalos vizinhos do posto, com resolução DT_BIN_MS
+    dt = np.sort(np.diff(np.sort(df["timestamp"].to_numpy(np.float64))))
+    posto = 0.95 * (len(dt) - 1)
+    assert dt[int(np.floor(posto))] - DT_BIN_MS <= stats["dt_p95_ms"] <= dt[int(np.ceil(posto))] + DT_BIN_MS
+
+
+@pytest.mark.parametrize("formato", list(FORMATOS))
+def test_sessao_crescendo_igual_ao_recalculo(formato):
+    df = synthetic_session(600, seed=3)
+    sessao = IncrementalSession()
+    vistas = 0
+    for n, esperado in [(100, "completa"), (250, "incremental"), (600, "incremental")]:
+        content = FORMATOS[formato](df.iloc[:n].reset_index(drop=True))
+        assert sessao.update(content) == n - vistas
+        assert sessao.last_update == esperado
+        assert sessao.n_samples == n
+        _confere_com_recalculo(sessao, content)
+        vistas = n
+
+
+def test_json_com_inicio_alterado_le_tudo():
+    """Se o hash do início não confere, o envio é lido do zero."""
+    df = synthetic_session(400, seed=1)
+    sessao = IncrementalSession()
+    sessao.update(_json(df.iloc[:200]))
+
+    alterado = df.copy()
+    alterado.loc[10, "x"] += 50.0
+    content = _json(alterado)
+    assert sessao.update(content) == 400
+    assert sessao.last_update == "completa"
+    _confere_com_recalculo(sessao, content)
+
+
+@pytest.mark.parametrize("formato", ["npz", "etz"])
+def test_binario_com_ultima_linha_alterada_le_tudo(formato):
+    """No ``.npz``/``.etz`` a última linha já vista é a que confere a continuação."""
+    df = synthetic_session(400, seed=2)
+    sessao = IncrementalSession()
+    sessao.update(FORMATOS[formato](df.iloc[:200]))
+
+    alterado = df.copy()
+    alterado.loc[199, "timestamp"] += 5.0
+    content = FORMATOS[formato](alterado)
+    assert sessao.update(content) == 400
+    assert sessao.last_update == "completa"
+    _confere_com_recalculo(sessao, content)
+
+
+@pytest.mark.parametrize("formato", list(FORMATOS))
+def test_reenvio_sem_mudanca_zera_a_atualizacao(formato):
+    df = synthetic_session(300, seed=4)
+    sessao = IncrementalSession()
+    sessao.update(FORMATOS[formato](df.iloc[:100]))
+    content = FORMATOS[formato](df)
+    sessao.update(content)
+    assert (sessao.last_update, sessao.new_samples) == ("incremental", 200)
+
+    assert sessao.update(content) == 0
+    assert (sessao.last_update, sessao.new_samples) == (None, 0)
+    assert sessao.n_samples == 300
+    _confere_com_recalculo(sessao, content)
@@ -0,0 +1,149 @@
+"""Leitor incremental do JSON das sessões contra ``json.load`` + ``pd.DataFrame``."""
+
+import codecs
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from eyetracking.ingest import COLUMNS, ID_COLUMN, iter_batches, iter_samples, read_session
+
+EXEMPLO = os.path.join(os.path.dirname(__file__), "..", "exemplo_gaze_data_experimento.json")
+
+
+def _amostra(i, **campos):
+    sample = {
+        "x": 100.5 + i,
+        "y": 200.25 - i,
+        "timestamp": 1000.0 + 16.7 * i,
+        ID_COLUMN: i // 3,
+        "nearestStimulusColor": ["red", "yellow", "blue"][i % 3],
+        "nearestPosition": ["topo", "baixo-esquerda", "baixo-direita"][i % 3],
+    }
+    sample.update(campos)
+    return sample
+
+
+def _referencia(records, id_dtype="Int16"):
+    """O mesmo DataFrame pelo caminho ingênuo: ``pd.DataFrame`` da lista e conversão."""
+    df = pd.DataFrame(records)
+    df = df[[c for c in COLUMNS if c in df.columns]]
+    dtypes = {"x": np.float32, "y": np.float32, "timestamp": np.float64, ID_COLUMN: id_dtype}
+    dtypes.update({c: "category" for c in COLUMNS[4:]})
+    for c in df.columns:
+        if c in (ID_COLUMN, "x", "y", "timestamp"):
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+        df[c] = df[c].astype(dtypes[c])
+    return df
+
+
+def _ler(texto, **kwargs):
+    return read_session(io.BytesIO(texto.encode("utf-8")), **kwargs)
+
+
+def test_exemplo_igual_ao_json_load():
+    with open(EXEMPLO, "rb") as f:
+        df = read_session(f)
+    with open(EXEMPLO, encoding="utf-8") as f:
+        esperado = _referencia(json.load(f))
+    pd.testing.assert_frame_equal(df, esperado)
+
+
+@pytest.mark.parametrize(
+    "records",
+    [
+        [_amostra(0)],
+        [_amostra(0, nearestStimulusColor="}]", nearestPosition="a]}, {\"x\": 1}")],
+        [_amostra(i, nearestStimulusColor="açaí ✓", nearestPosition="posição 位置") for i in range(4)],
+        [_amostra(i, x=None, y=None) if i % 2 else _amostra(i) for i in range(6)],
+    ],
+    ids=["um_objeto", "texto_com_fechamentos", "nao_ascii", "xy_nulos"],
+)
+def test_casos_de_borda_iguais_ao_json_load(records):
+    texto = json.dumps(records, ensure_ascii=False)
+    pd.testing.assert_frame_equal(_ler(texto), _referencia(records))
+
+
+def test_array_vazio():
+    assert _ler("[]").empty
+    assert _ler("  [ \n ]  ").empty
+
+
+def test_xy_nulos_viram_nan():
+    df = _ler(json.dumps([_amostra(0, x=None), _amostra(1, y=None)]))
+    assert df["x"].dtype == np.float32
+    assert np.isnan(df["x"].iloc[0]) and not np.isnan(df["x"].iloc[1])
+    assert np.isnan(df["y"].iloc[1]) and not np.isnan(df["y"].iloc[0])
+
+
+def test_cortes_de_bloco_em_todas_as_posicoes():
+    """Cada tamanho de leitura corta o texto num ponto diferente (strings, números, espaços)."""
+    records = [
+        _amostra(0, nearestStimulusColor="a}b", nearestPosition="]"),
+        _amostra(1, timestamp=123456.789012345),
+        _amostra(2, nearestStimulusColor="ção}", x=None),
+    ]
+    texto = json.dumps(records, ensure_ascii=False, indent=1)
+    dados = codecs.BOM_UTF8 + texto.encode("utf-8")
+    for read_bytes in range(1, len(dados) + 2):
+        assert list(iter_samples(io.BytesIO(dados), read_bytes)) == records, read_bytes
+    for read_bytes in (1, 5, 17):
+        assert list(iter_samples(io.StringIO(texto), read_bytes)) == records, read_bytes
+
+
+def test_raw_decode_quando_o_corte_cai_numa_string(monkeypatch):
+    """Um ``}`` dentro de string no fim do bloco desvia para ``raw_decode``, objeto a objeto."""
+    decodificados = []
+
+    class Decoder(json.JSONDecoder):
+        def raw_decode(self, s, idx=0):
+            obj, end = super().raw_decode(s, idx)
+            decodificados.append(obj)
+            return obj, end
+
+    monkeypatch.setattr(json, "JSONDecoder", Decoder)
+    texto = '[{"c": "a"}, {"c": "b}c"}, {"c": "d"}]'
+    corte = texto.index("b}") + 2
+    lotes = list(iter_batches(io.StringIO(texto), read_bytes=corte))
+    assert [obj for lote in lotes for obj in lote] == json.loads(texto)
+    # O primeiro objeto sai do raw_decode; o bloco seguinte volta ao caminho rápido
+    assert decodificados == [{"c": "a"}]
+    assert lotes == [[{"c": "a"}], [{"c": "b}c"}, {"c": "d"}]]
+
+
+@pytest.mark.parametrize("chunk_samples", [1, 2, 3, 7, 64])
+def test_blocos_de_amostras(chunk_samples):
+    records = [_amostra(i) for i in range(20)]
+    records[5][ID_COLUMN] = None
+    df = _ler(json.dumps(records), chunk_samples=chunk_samples)
+    pd.testing.assert_frame_equal(df, _referencia(records))
+
+
+def test_ids_int16_e_promocao_para_int32():
+    pequenos = [_amostra(i) for i in range(4)]
+    assert _ler(json.dumps(pequenos))[ID_COLUMN].dtype == "Int16"
+
+    # O id grande só aparece no último bloco: a promoção vale para a coluna inteira
+    grandes = pequenos + [_amostra(4, nearestStimulusId=40000), _amostra(5, nearestStimulusId=None)]
+    df = _ler(json.dumps(grandes), chunk_samples=2)
+    assert df[ID_COLUMN].dtype == "Int32"
+    pd.testing.assert_frame_equal(df, _referencia(grandes, id_dtype="Int32"))
+
+
+def test_ids_todos_nulos():
+    records = [_amostra(i, nearestStimulusId=None) for i in range(3)]
+    df = _ler(json.dumps(records))
+    assert df[ID_COLUMN].dtype == "Int16"
+    assert df[ID_COLUMN].isna().all()
+
+
+def test_erros_de_formato():
+    with pytest.raises(ValueError):
+        _ler('{"x": 1}')
+    with pytest.raises(ValueError):
+        _ler('[{"x": 1}')
+    with pytest.raises(ValueError):
+        _ler("[1, 2]")
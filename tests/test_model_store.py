@@ -0,0 +1,32 @@
+"""Listagem e descarte dos modelos salvos."""
+
+import os
+
+from eyetracking.model_store import ModelStore
+
+
+def _grava(store, key, usado_em):
+    for ext in ("joblib", "json"):
+        with open(os.path.join(store.root, f"{key}.{ext}"), "w", encoding="utf-8") as f:
+            f.write("{}")
+    os.utime(os.path.join(store.root, f"{key}.joblib"), (usado_em, usado_em))
+
+
+def test_entrada_apagada_por_outra_sessao(tmp_path, monkeypatch):
+    """Um modelo descartado entre o ``listdir`` e o ``getmtime`` some da lista."""
+    store = ModelStore(str(tmp_path), max_models=1)
+    for i, key in enumerate(["a", "b", "c"]):
+        _grava(store, key, 1000 + i)
+
+    getmtime = os.path.getmtime
+
+    def descartado(path):
+        if path.endswith("b.joblib"):
+            os.remove(path)
+        return getmtime(path)
+
+    monkeypatch.setattr(os.path, "getmtime", descartado)
+    assert [e["chave"] for e in store.entries()] == ["c", "a"]
+
+    store.evict()
+    assert sorted(n for n in os.listdir(tmp_path) if n.endswith(".joblib")) == ["c.joblib"]
@@ -0,0 +1,73 @@
+"""Intervalo de tempo das consultas do banco de sessões."""
+
+import json
+import os
+import sqlite3
+
+import numpy as np
+
+from eyetracking.analysis import COLOR, load_session, valid_samples
+from eyetracking.session_store import SessionStore
+
+EXEMPLO = os.path.join(os.path.dirname(__file__), "..", "exemplo_gaze_data_experimento.json")
+
+
+def _sessao_deslocada(tmp_path):
+    """O exemplo com a página carregada 100 s antes da primeira amostra."""
+    with open(EXEMPLO, encoding="utf-8") as f:
+        records = json.load(f)
+    for r in records:
+        r["timestamp"] += 100000.0
+    caminho = tmp_path / "deslocada.json"
+    caminho.write_text(json.dumps(records), encoding="utf-8")
+    return str(caminho)
+
+
+def _contagens_diretas(caminho, start_ms, end_ms):
+    df, _ = load_session(caminho)
+    t = df["timestamp"].to_numpy(np.float64, na_value=np.nan)
+    df_valid = valid_samples(df)
+    rel = df_valid["timestamp"].to_numpy(np.float64) - np.nanmin(t)
+    dentro = df_valid[(rel >= start_ms) & (rel < end_ms)]
+    return dentro.groupby(COLOR, observed=True).size().sort_index()
+
+
+def _contagens_banco(banco, start_ms, end_ms):
+    tabela = banco.attention(by=[COLOR], start_ms=start_ms, end_ms=end_ms)
+    return tabela.set_index(COLOR)["num_samples"].sort_index()
+
+
+def test_intervalo_desde_o_primeiro_timestamp(tmp_path):
+    """Os limites contam desde o primeiro timestamp, não desde o carregamento da página."""
+    caminho = _sessao_deslocada(tmp_path)
+    with SessionStore(":memory:") as banco:
+        sessao, _ = banco.ingest(caminho)
+        for start_ms, end_ms in [(0, 10000), (8000, 15000), (0, 1e9)]:
+            esperado = _contagens_diretas(caminho, start_ms, end_ms)
+            assert len(esperado)
+            assert _contagens_banco(banco, start_ms, end_ms).to_dict() == esperado.to_dict()
+
+            amostras = banco.samples(sessao, start_ms=start_ms, end_ms=end_ms)
+            df, _ = load_session(caminho)
+            t = df["timestamp"].to_numpy(np.float64, na_value=np.nan)
+            rel = t - np.nanmin(t)
+            assert len(amostras) == int(((rel >= start_ms) & (rel < end_ms)).sum())
+
+
+def test_banco_antigo_ganha_t0(tmp_path):
+    """Bancos sem a coluna ``t0`` a recebem a partir das amostras gravadas."""
+    sessao = _sessao_deslocada(tmp_path)
+    caminho = str(tmp_path / "sessoes.sqlite")
+    with SessionStore(caminho) as banco:
+        banco.ingest(sessao)
+        (t0,) = banco.conn.execute("SELECT t0 FROM sessions").fetchone()
+    conn = sqlite3.connect(caminho)
+    conn.execute("ALTER TABLE sessions DROP COLUMN t0")
+    conn.commit()
+    conn.close()
+
+    with SessionStore(caminho) as banco:
+        assert banco.conn.execute("SELECT t0 FROM sessions").fetchone() == (t0,)
+        esperado = _contagens_diretas(sessao, 8000, 15000)
+        assert len(esperado)
+        assert _contagens_banco(banco, 8000, 15000).to_dict() == esperado.to_dict()